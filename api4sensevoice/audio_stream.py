@@ -0,0 +1,184 @@
+# api4sensevoice/audio_stream.py
+import math
+import struct
+
+import numpy as np
+import torch
+import torchaudio
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class WavStreamDecoder:
+    """增量解析WAV数据流
+
+    每次 feed() 传入任意长度的字节块，返回其中完整帧解码后的单声道float32样本。
+    内部只缓存不足一帧的残余字节和尚未解析完的头部，内存占用与文件大小无关。
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._riff_checked = False
+        self._skip = 0  # 需要跳过的非音频chunk剩余字节数
+        self._data_remaining = None
+        self.in_data = False
+        self.sample_rate = None
+        self.channels = None
+        self.sample_width = None
+        self.format_tag = None
+        self.frames_decoded = 0
+
+    def feed(self, data):
+        self._buffer.extend(data)
+        if not self.in_data:
+            self._parse_header()
+            if not self.in_data:
+                return np.zeros(0, dtype=np.float32)
+        return self._decode_frames()
+
+    def finish(self):
+        """数据流结束时调用，检查头部是否完整"""
+        if not self.in_data:
+            raise ValueError("WAV头部不完整或缺少data chunk")
+
+    def _parse_header(self):
+        if not self._riff_checked:
+            if len(self._buffer) < 12:
+                return
+            if self._buffer[:4] != b'RIFF' or self._buffer[8:12] != b'WAVE':
+                raise ValueError("不是有效的WAV数据流")
+            del self._buffer[:12]
+            self._riff_checked = True
+
+        while not self.in_data:
+            if self._skip:
+                skipped = min(self._skip, len(self._buffer))
+                del self._buffer[:skipped]
+                self._skip -= skipped
+                if self._skip:
+                    return
+
+            if len(self._buffer) < 8:
+                return
+            chunk_id = bytes(self._buffer[:4])
+            chunk_size = struct.unpack('<I', self._buffer[4:8])[0]
+
+            if chunk_id == b'fmt ':
+                if len(self._buffer) < 8 + chunk_size:
+                    return
+                self._parse_fmt(bytes(self._buffer[8:8 + chunk_size]))
+                del self._buffer[:8 + chunk_size + (chunk_size & 1)]
+            elif chunk_id == b'data':
+                if self.format_tag is None:
+                    raise ValueError("WAV缺少fmt chunk")
+                del self._buffer[:8]
+                # 流式写入的文件可能还没有回填长度，此时读到流结束为止
+                self._data_remaining = None if chunk_size in (0, 0xFFFFFFFF) else chunk_size
+                self.in_data = True
+            else:
+                del self._buffer[:8]
+                self._skip = chunk_size + (chunk_size & 1)
+
+    def _parse_fmt(self, fmt):
+        format_tag, channels, sample_rate, _, _, bits = struct.unpack('<HHIIHH', fmt[:16])
+        if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+            format_tag = struct.unpack('<H', fmt[24:26])[0]
+        if format_tag == WAVE_FORMAT_PCM and bits not in (16, 24, 32):
+            raise ValueError(f"不支持的PCM位深: {bits}")
+        if format_tag == WAVE_FORMAT_IEEE_FLOAT and bits != 32:
+            raise ValueError(f"不支持的浮点位深: {bits}")
+        if format_tag not in (WAVE_FORMAT_PCM, WAVE_FORMAT_IEEE_FLOAT):
+            raise ValueError(f"不支持的WAV编码: {format_tag:#x}")
+
+        self.format_tag = format_tag
+        self.channels = channels
+        self.sample_rate = sample_rate
+        self.sample_width = bits // 8
+
+    def _decode_frames(self):
+        frame_bytes = self.channels * self.sample_width
+        available = len(self._buffer)
+        if self._data_remaining is not None:
+            available = min(available, self._data_remaining)
+        usable = available - available % frame_bytes
+        if usable <= 0:
+            return np.zeros(0, dtype=np.float32)
+
+        raw = bytes(self._buffer[:usable])
+        del self._buffer[:usable]
+        if self._data_remaining is not None:
+            self._data_remaining -= usable
+
+        if self.format_tag == WAVE_FORMAT_IEEE_FLOAT:
+            samples = np.frombuffer(raw, dtype='<f4').astype(np.float32)
+        elif self.sample_width == 2:
+            samples = np.frombuffer(raw, dtype='<i2').astype(np.float32) / np.iinfo(np.int16).max
+        elif self.sample_width == 3:
+            b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+            value = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+            value = np.where(value & 0x800000, value - 0x1000000, value)
+            samples = value.astype(np.float32) / 0x7FFFFF
+        else:
+            samples = np.frombuffer(raw, dtype='<i4').astype(np.float32) / np.iinfo(np.int32).max
+
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels).mean(axis=1)
+        self.frames_decoded += len(samples)
+        return samples
+
+
+class StreamingResampler:
+    """分块重采样，结果与对整段音频一次性调用 torchaudio Resample 一致
+
+    每块左右各带一段上下文（不小于滤波器半宽，且为抽取周期的整数倍），
+    丢弃上下文对应的输出，因此块边界处没有失真；右侧上下文使输出延迟一个块。
+    """
+
+    def __init__(self, orig_freq, new_freq=16000, block_size=48000):
+        gcd = math.gcd(int(orig_freq), int(new_freq))
+        self.orig = int(orig_freq) // gcd
+        self.new = int(new_freq) // gcd
+        self.passthrough = self.orig == self.new
+
+        self.resampler = torchaudio.transforms.Resample(int(orig_freq), int(new_freq))
+        # torchaudio内部滤波器半宽（以输入样本计）
+        rolloff = 0.99
+        lowpass_filter_width = 6
+        width = math.ceil(lowpass_filter_width * self.orig / (min(self.orig, self.new) * rolloff))
+        self.context = self.orig * math.ceil((width + 1) / self.orig)
+        self.block = max(self.context, block_size - block_size % self.orig)
+
+        self._history = np.zeros(self.context, dtype=np.float32)  # 流开头等价于零填充
+        self._pending = np.zeros(0, dtype=np.float32)
+
+    def _resample(self, segment):
+        tensor = torch.from_numpy(np.ascontiguousarray(segment, dtype=np.float32))
+        return self.resampler(tensor[None, :])[0].numpy()
+
+    def process(self, samples):
+        if self.passthrough:
+            return samples
+        self._pending = np.concatenate([self._pending, samples])
+        outputs = []
+        ctx_out = self.context * self.new // self.orig
+        blk_out = self.block * self.new // self.orig
+        while len(self._pending) >= self.block + self.context:
+            segment = np.concatenate([self._history, self._pending[:self.block + self.context]])
+            outputs.append(self._resample(segment)[ctx_out:ctx_out + blk_out])
+            self._history = self._pending[self.block - self.context:self.block]
+            self._pending = self._pending[self.block:]
+        if not outputs:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(outputs)
+
+    def flush(self):
+        if self.passthrough or len(self._pending) == 0:
+            return np.zeros(0, dtype=np.float32)
+        tail_len = len(self._pending)
+        segment = np.concatenate([self._history, self._pending, np.zeros(self.context, dtype=np.float32)])
+        ctx_out = self.context * self.new // self.orig
+        out_len = math.ceil(tail_len * self.new / self.orig)
+        self._pending = np.zeros(0, dtype=np.float32)
+        return self._resample(segment)[ctx_out:ctx_out + out_len]
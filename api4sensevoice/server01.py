@@ -17,8 +17,10 @@ import soundfile as sf
 import argparse
 import uvicorn
 import time
+from typing import List
 # import logging
 from app.logging_config import get_logger
+from audio_stream import StreamingResampler, WavStreamDecoder
 
 # Set up logging
 # logging.basicConfig(level=logging.ERROR)
@@ -173,6 +175,57 @@ model = AutoModel(model="iic/SenseVoiceSmall",
                       )
 
 
+# 批量转录时一个填充批次的最大总样本数（按最长语音段×段数计，16kHz）；
+# 与单文件转录的 batch_size=64（秒）相同的显存预算，600 秒的批次在长录音时段会爆显存
+BATCH_MAX_SAMPLES = 16000 * 64
+
+
+def transcribe_batch_with_timing(wavs):
+    """多个音频一起转录：先逐个做VAD切分，再把所有文件的语音段按长度排序、
+    以填充批次送入SenseVoice，最后按文件和时间顺序拼回文本"""
+    start_time = time.time()
+    vad_results = model.inference(wavs, model=model.vad_model, kwargs=dict(model.vad_kwargs))
+
+    segments, owners = [], []
+    for index, (wav, vad_result) in enumerate(zip(wavs, vad_results)):
+        for beg_ms, end_ms in vad_result["value"]:
+            segments.append(wav[int(beg_ms * 16):int(end_ms * 16)])
+            owners.append(index)
+
+    # 按长度排序以减少填充；正常情况下一个时段的所有语音段只需一次前向计算
+    # 单个语音段超过上限（VAD最长切到300秒）时单独成一个批次，不再与其他段一起填充
+    order = sorted(range(len(segments)), key=lambda i: len(segments[i]))
+    batches, current = [], []
+    for i in order:
+        if len(segments[i]) > BATCH_MAX_SAMPLES:
+            if current:
+                batches.append(current)
+                current = []
+            batches.append([i])
+            continue
+        if current and len(segments[i]) * (len(current) + 1) > BATCH_MAX_SAMPLES:
+            batches.append(current)
+            current = []
+        current.append(i)
+    if current:
+        batches.append(current)
+
+    segment_texts = [""] * len(segments)
+    for batch in batches:
+        asr_kwargs = dict(model.kwargs, language="auto", use_itn=True, batch_size=len(batch))
+        results = model.inference([segments[i] for i in batch], model=model.model, kwargs=asr_kwargs)
+        for i, result in zip(batch, results):
+            segment_texts[i] = result["text"]
+
+    texts = [""] * len(wavs)
+    for i, text in enumerate(segment_texts):
+        texts[owners[i]] += text
+
+    elapsed_time = time.time() - start_time
+    print(f"批量转录耗时: {elapsed_time:.2f} 秒 ({len(wavs)} 个文件, {len(segments)} 个语音段, {len(batches)} 个批次)")
+    return texts, elapsed_time
+
+
 def transcribe_with_timing(*args, **kwargs):
     start_time = time.time()
     result = model.generate(*args, **kwargs)
@@ -215,6 +268,91 @@ class TranscriptionResponse(BaseModel):
     data: str
 
 
+class BatchItem(BaseModel):
+    filename: str
+    code: int
+    msg: str
+    text: str
+
+
+class BatchTranscriptionResponse(BaseModel):
+    code: int
+    msg: str
+    data: List[BatchItem]
+
+
+async def transcribe_array(input_wav):
+    """在线程中运行模型，返回 (格式化后的文本, 耗时)"""
+    resp, elapsed_time = await asyncio.to_thread(transcribe_with_timing,
+                                                 input=input_wav,
+                                                 cache={},
+                                                 language="auto",
+                                                 use_itn=True,
+                                                 batch_size=64)
+    print(f"[DEBUG] 转录的原始结果是 {resp}")
+    text = format_str_v3(resp[0]["text"])
+    print(f'[DEBUG] 格式化后的结果 res:{resp} text:{text}')
+    return text, elapsed_time
+
+
+def decode_audio(file_content):
+    """把上传的音频字节解码为16kHz单声道float32数组"""
+    if file_content.startswith(b'RIFF'):  # 如果文件以RIFF开头，说明是WAV格式
+        input_wav, sr = sf.read(io.BytesIO(file_content), dtype=np.int16)
+        bit_depth = sf.info(io.BytesIO(file_content)).subtype
+        is16 = True if bit_depth == 'PCM_16' else False
+        print(f"[DEBUG] 音频格式为wav")
+
+    elif file_content.startswith(b'fLaC') or file_content.startswith(b'OggS'):  # FLAC或Ogg(Opus)，libsndfile直接解码
+        input_wav, sr = sf.read(io.BytesIO(file_content), dtype=np.float32)
+        is16 = False
+        print(f"[DEBUG] 音频格式为{'flac' if file_content.startswith(b'fLaC') else 'ogg'}")
+
+    elif file_content.startswith(b'\x89\x50\x4E\x47\x0D\x0A\x1A\x0A'):  # 如果文件以89 50 4E 47 0D 0A 1A 0A开头，说明是WebM格式
+        input_wav, sr = torchaudio.load(io.BytesIO(file_content))  # 使用torchaudio库读取WebM文件内容和采样率
+        dtype = input_wav.dtype  # 获取音频数据类型
+        is16 = True if dtype == np.int16 else False  # 判断是否为16位音频
+        print(f"[DEBUG] 音频格式为webm")
+    elif file_content.startswith(b'\xFF\xF1') or file_content.startswith(b'\xFF\xF9') or file_content.startswith(
+            b'\xFF\xFA') or file_content.startswith(b'\xFFxFB'):  # 如果文件以FF F1开头，说明是AAC格式
+        audio_segment = AudioSegment.from_file(io.BytesIO(file_content), format="aac")  # 使用pydub库读取AAC文件内容
+        input_wav = np.array(audio_segment.get_array_of_samples()).astype(np.int16)  # 将音频数据转换为numpy数组并设置为16位格式
+        sr = audio_segment.frame_rate  # 获取音频的采样率
+        is16 = True  # 设置为16位音频
+        print(f"[DEBUG] 音频格式为aac")
+    elif file_content.startswith(b'ID3'):  # 如果文件以FF E2开头，说明是MP3格式
+        audio_segment = AudioSegment.from_file(io.BytesIO(file_content), format="mp3")  # 使用pydub库读取MP3文件内容
+        input_wav = np.array(audio_segment.get_array_of_samples()).astype(np.int16)  # 将音频数据转换为numpy数组并设置为16位格式
+        sr = audio_segment.frame_rate  # 获取音频的采样率
+        is16 = True  # 设置为16位音频
+        print(f"[DEBUG] 音频格式为mp3")
+    else:
+        raise HTTPException(status_code=400, detail="Unsupported audio format")
+
+    # filename = (file.filename if file.filename else "test") + "." + suffix
+    # with open(filename, "wb") as f:
+        # f.write(file_content)
+
+
+    if len(input_wav.shape) > 1:  # 如果音频是立体声，将其转换为单声道
+        input_wav = input_wav.mean(-1)
+
+    if is16:  # 如果音频数据不是浮点数类型，将其转换为浮点数类型并归一化到[-1, 1]范围
+        input_wav = input_wav.astype(np.float32) / np.iinfo(np.int16).max
+
+    if sr != 16000:  # 如果音频的采样率不是16000，将其重采样为16000
+        print(f"[DEBUG] 音频采样率是 {sr}  进行重采样")
+        start_time = time.time()
+        resampler = torchaudio.transforms.Resample(sr, 16000)  # 创建一个重采样器，将采样率从sr重采样为16000
+        input_wav_t = torch.from_numpy(input_wav).to(torch.float32)  # 将音频数据转换为PyTorch张量并设置为浮点数类型
+        input_wav = resampler(input_wav_t[None, :])[0, :].numpy()  # 使用重采样器进行重采样，并将结果转换回NumPy数组
+        end_time = time.time()
+        elapsed_time = end_time - start_time
+        print(f"重采样耗时: {elapsed_time:.2f} 秒")
+
+    return input_wav
+
+
 @app.post("/transcribe", response_model=TranscriptionResponse)
 async def transcribe_audio(file: UploadFile = File(...)):
     try:
@@ -222,68 +360,10 @@ async def transcribe_audio(file: UploadFile = File(...)):
         file_content = await file.read()  # 异步读取文件内容
         print(f"[DEBUG] UploadFile Object is {file}")
 
-        if file_content.startswith(b'RIFF'):  # 如果文件以RIFF开头，说明是WAV格式
-            input_wav, sr = sf.read(io.BytesIO(file_content), dtype=np.int16)
-            bit_depth = sf.info(io.BytesIO(file_content)).subtype
-            is16 = True if bit_depth == 'PCM_16' else False
-            print(f"[DEBUG] 音频格式为wav")
-
-        elif file_content.startswith(b'\x89\x50\x4E\x47\x0D\x0A\x1A\x0A'):  # 如果文件以89 50 4E 47 0D 0A 1A 0A开头，说明是WebM格式
-            input_wav, sr = torchaudio.load(io.BytesIO(file_content))  # 使用torchaudio库读取WebM文件内容和采样率
-            dtype = input_wav.dtype  # 获取音频数据类型
-            is16 = True if dtype == np.int16 else False  # 判断是否为16位音频
-            print(f"[DEBUG] 音频格式为webm")
-        elif file_content.startswith(b'\xFF\xF1') or file_content.startswith(b'\xFF\xF9') or file_content.startswith(
-                b'\xFF\xFA') or file_content.startswith(b'\xFFxFB'):  # 如果文件以FF F1开头，说明是AAC格式
-            audio_segment = AudioSegment.from_file(io.BytesIO(file_content), format="aac")  # 使用pydub库读取AAC文件内容
-            input_wav = np.array(audio_segment.get_array_of_samples()).astype(np.int16)  # 将音频数据转换为numpy数组并设置为16位格式
-            sr = audio_segment.frame_rate  # 获取音频的采样率
-            is16 = True  # 设置为16位音频
-            print(f"[DEBUG] 音频格式为aac")
-        elif file_content.startswith(b'ID3'):  # 如果文件以FF E2开头，说明是MP3格式
-            audio_segment = AudioSegment.from_file(io.BytesIO(file_content), format="mp3")  # 使用pydub库读取MP3文件内容
-            input_wav = np.array(audio_segment.get_array_of_samples()).astype(np.int16)  # 将音频数据转换为numpy数组并设置为16位格式
-            sr = audio_segment.frame_rate  # 获取音频的采样率
-            is16 = True  # 设置为16位音频
-            print(f"[DEBUG] 音频格式为mp3")
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported audio format")
-
-        # filename = (file.filename if file.filename else "test") + "." + suffix
-        # with open(filename, "wb") as f:
-            # f.write(file_content)
-
-
-        if len(input_wav.shape) > 1:  # 如果音频是立体声，将其转换为单声道
-            input_wav = input_wav.mean(-1)
-
-        if is16:  # 如果音频数据不是浮点数类型，将其转换为浮点数类型并归一化到[-1, 1]范围
-            input_wav = input_wav.astype(np.float32) / np.iinfo(np.int16).max
-
-        if sr != 16000:  # 如果音频的采样率不是16000，将其重采样为16000
-            print(f"[DEBUG] 音频采样率是 {sr}  进行重采样")
-            start_time = time.time()
-            resampler = torchaudio.transforms.Resample(sr, 16000)  # 创建一个重采样器，将采样率从sr重采样为16000
-            input_wav_t = torch.from_numpy(input_wav).to(torch.float32)  # 将音频数据转换为PyTorch张量并设置为浮点数类型
-            input_wav = resampler(input_wav_t[None, :])[0, :].numpy()  # 使用重采样器进行重采样，并将结果转换回NumPy数组
-            end_time = time.time()
-            elapsed_time = end_time - start_time
-            print(f"重采样耗时: {elapsed_time:.2f} 秒")
-
-
-        async def generate_text():
-            return await asyncio.to_thread(transcribe_with_timing,
-                                           input=input_wav,
-                                           cache={},
-                                           language="auto",
-                                           use_itn=True,
-                                           batch_size=64)
+        input_wav = decode_audio(file_content)
 
         # Run the asynchronous function
-        resp, elapsed_time = await generate_text()
-        print(f"[DEBUG] 转录的原始结果是 {resp}")
-        text = format_str_v3(resp[0]["text"])
-        print(f'[DEBUG] 格式化后的结果 res:{resp} text:{text}')
+        text, elapsed_time = await transcribe_array(input_wav)
 
         # Create the response
         response = TranscriptionResponse(
@@ -301,6 +381,88 @@ async def transcribe_audio(file: UploadFile = File(...)):
     return JSONResponse(content=response.model_dump())
 
 
+@app.post("/transcribe/batch", response_model=BatchTranscriptionResponse)
+async def transcribe_audio_batch(files: List[UploadFile] = File(...)):
+    """一次请求上传同一时段的多个文件：并发解码，合并为一次批量推理，逐文件返回结果"""
+    try:
+        contents = await asyncio.gather(*(f.read() for f in files))
+        decoded = await asyncio.gather(
+            *(asyncio.to_thread(decode_audio, content) for content in contents),
+            return_exceptions=True
+        )
+
+        items = [None] * len(files)
+        wavs, indices = [], []
+        for i, (f, result) in enumerate(zip(files, decoded)):
+            if isinstance(result, Exception):
+                message = result.detail if isinstance(result, HTTPException) else str(result)
+                items[i] = BatchItem(filename=f.filename or "", code=1, msg=message, text="")
+            else:
+                wavs.append(result)
+                indices.append(i)
+
+        elapsed_time = 0.0
+        if wavs:
+            texts, elapsed_time = await asyncio.to_thread(transcribe_batch_with_timing, wavs)
+            for i, raw_text in zip(indices, texts):
+                items[i] = BatchItem(filename=files[i].filename or "", code=0, msg="success",
+                                     text=format_str_v3(raw_text))
+
+        response = BatchTranscriptionResponse(
+            code=0,
+            msg=f"success, {len(wavs)}/{len(files)} 个文件, 转录的时间为: {elapsed_time:.2f} 秒",
+            data=items
+        )
+    except Exception as e:
+        logger.error("Exception occurred", exc_info=True)
+        response = BatchTranscriptionResponse(code=1, msg=str(e), data=[])
+    return JSONResponse(content=response.model_dump())
+
+
+@app.post("/transcribe/stream", response_model=TranscriptionResponse)
+async def transcribe_audio_stream(request: Request):
+    """流式上传：请求体为分块传输的WAV，边接收边解码、重采样到16kHz
+
+    服务端只保留16kHz的float32样本和一个网络块，不再缓存整个原始文件。
+    """
+    try:
+        decoder = WavStreamDecoder()
+        resampler = None
+        pieces = []
+        received = 0
+
+        async for chunk in request.stream():
+            received += len(chunk)
+            samples = decoder.feed(chunk)
+            if resampler is None and decoder.in_data:
+                print(f"[DEBUG] 流式WAV: {decoder.sample_rate}Hz, {decoder.channels}声道")
+                resampler = StreamingResampler(decoder.sample_rate, 16000)
+            if samples.size:
+                # torchaudio重采样在线程中执行，不阻塞事件循环上其他请求的接收
+                pieces.append(await asyncio.to_thread(resampler.process, samples))
+
+        decoder.finish()  # 头部不完整时抛出ValueError
+        pieces.append(await asyncio.to_thread(resampler.flush))
+        input_wav = np.concatenate(pieces)
+        print(f"[DEBUG] 流式接收 {received} 字节, 16kHz样本数 {len(input_wav)}")
+
+        text, elapsed_time = await transcribe_array(input_wav)
+
+        response = TranscriptionResponse(
+            code=0,
+            msg=f"success, 转录的时间为: {elapsed_time:.2f} 秒",
+            data=text
+        )
+    except Exception as e:
+        logger.error("Exception occurred", exc_info=True)
+        response = TranscriptionResponse(
+            code=1,
+            msg=str(e),
+            data=" "
+        )
+    return JSONResponse(content=response.model_dump())
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run the FastAPI app with a specified port.")
     parser.add_argument('--port', type=int, default=7000, help='Port number to run the FastAPI app on.')
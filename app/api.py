@@ -3,10 +3,13 @@ import os
 import sys
 import time
 import traceback
+from datetime import datetime, timedelta
 
 from PyQt5.QtCore import QObject, pyqtSignal, QProcess, QProcessEnvironment
 from PyQt5.QtGui import QTextCursor
 
+from gunradio.telemetry import channels_for_day, hourly, read_telemetry, summarize
+
 
 class RadioRecorderAPI:
     def __init__(self):
@@ -20,6 +23,7 @@ class RadioRecorderAPI:
         self.config = {
             "recordings_dir": "./media/recordings",
             "transcriptions_dir": "./media/transcriptions",
+            "telemetry_dir": "./media/telemetry",
             "duration": 360,
             "transcription_port": 7000  # 转录服务端口
         }
@@ -150,6 +154,17 @@ class RadioRecorderAPI:
         }
 
 
+    def get_telemetry(self, day):
+        """某天各通道的信号质量：{通道名: (全天汇总, [(小时, 汇总)])}，只读遥测文件"""
+        directory = self.config["telemetry_dir"]
+        start = datetime(day.year, day.month, day.day)
+        end = start + timedelta(days=1)
+        history = {}
+        for channel in channels_for_day(directory, start):
+            records = read_telemetry(directory, channel, start.timestamp(), end.timestamp())
+            history[channel] = (summarize(records), hourly(records))
+        return history
+
     def handle_stdout(self):
         data = self.process.readAllStandardOutput()
         self.output_emitter.text_written.emit(str(data, 'utf-8').strip())
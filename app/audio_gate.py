@@ -0,0 +1,217 @@
+# app/audio_gate.py
+import json
+import os
+import struct
+
+import numpy as np
+import soundfile as sf
+
+from app.logging_config import get_logger
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def open_wav_memmap(path):
+    """以内存映射方式打开WAV的data chunk，返回 (样本数组[帧, 通道], 采样率)
+
+    只解析头部，音频数据按需由操作系统分页读入，分析长录音时内存占用与文件大小无关。
+    """
+    with open(path, 'rb') as f:
+        header = f.read(12)
+        if len(header) < 12 or header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+            raise ValueError(f"不是有效的WAV文件: {path}")
+        fmt = None
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                raise ValueError(f"WAV缺少data chunk: {path}")
+            chunk_id, chunk_size = chunk[:4], struct.unpack('<I', chunk[4:])[0]
+            if chunk_id == b'fmt ':
+                fmt = f.read(chunk_size)
+                f.seek(chunk_size & 1, os.SEEK_CUR)
+            elif chunk_id == b'data':
+                offset = f.tell()
+                break
+            else:
+                f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+
+    if fmt is None:
+        raise ValueError(f"WAV缺少fmt chunk: {path}")
+    format_tag, channels, sample_rate, _, _, bits = struct.unpack('<HHIIHH', fmt[:16])
+    if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+        format_tag = struct.unpack('<H', fmt[24:26])[0]
+    if format_tag == WAVE_FORMAT_PCM and bits == 16:
+        dtype = np.dtype('<i2')
+    elif format_tag == WAVE_FORMAT_PCM and bits == 32:
+        dtype = np.dtype('<i4')
+    elif format_tag == WAVE_FORMAT_IEEE_FLOAT and bits == 32:
+        dtype = np.dtype('<f4')
+    else:
+        raise ValueError(f"不支持的WAV编码: format={format_tag:#x}, bits={bits}")
+
+    # 录制中断时data长度可能未回填，以文件实际大小为准
+    available = os.path.getsize(path) - offset
+    if chunk_size in (0, 0xFFFFFFFF) or chunk_size > available:
+        chunk_size = available
+    frames = chunk_size // (dtype.itemsize * channels)
+    if frames == 0:
+        return np.zeros((0, channels), dtype=dtype), sample_rate
+    samples = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(frames, channels))
+    return samples, sample_rate
+
+
+class SoundFileFrames:
+    """压缩格式（FLAC/Ogg Opus）的按需解码视图，按帧切片时才由libsndfile解码对应区段"""
+
+    dtype = np.dtype(np.float32)
+
+    def __init__(self, path):
+        self.path = path
+        info = sf.info(path)
+        self.frames = info.frames
+        self.channels = info.channels
+        self.samplerate = info.samplerate
+
+    def __len__(self):
+        return self.frames
+
+    def __getitem__(self, index):
+        start, stop, _ = index.indices(self.frames)
+        with sf.SoundFile(self.path) as f:
+            f.seek(start)
+            return f.read(max(stop - start, 0), dtype='float32', always_2d=True)
+
+
+def open_audio(path):
+    """返回 (样本[帧, 通道], 采样率)：WAV走内存映射，其他格式按块解码，不生成中间WAV文件"""
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+    if magic == b'RIFF':
+        return open_wav_memmap(path)
+    frames = SoundFileFrames(path)
+    return frames, frames.samplerate
+
+
+class AudioGate:
+    """转录前的静音/无载波过滤
+
+    按20ms一帧计算交流RMS、通带内的频谱平坦度和语音频段能量占比（整块矩阵运算），
+    "像语音"的帧占比低于阈值的录音（静电噪声、空播、载波丢失）不再送去转录。
+    """
+
+    BLOCK_FRAMES = 512  # 每次从内存映射中取出的帧数（48kHz下约10秒）
+    SMOOTH_FRAMES = 5  # 计算平坦度前功率谱平均的帧数（奇数）
+
+    def __init__(self, rms_threshold_db=-50.0, max_flatness=0.5, min_speech_ratio=0.5,
+                 min_speech_fraction=0.05, speech_band=(80, 4000), flatness_band=(300, 2000),
+                 frame_ms=20):
+        self.rms_threshold_db = rms_threshold_db  # 低于此电平的帧视为无声（dBFS）
+        self.max_flatness = max_flatness  # 平坦度接近1为白噪声，语音明显更"尖"
+        self.min_speech_ratio = min_speech_ratio
+        self.min_speech_fraction = min_speech_fraction  # 语音帧占比低于此值则跳过
+        self.speech_band = speech_band
+        # 平坦度只在flowgraph带通范围内计算，带外的阻带会把几何平均拉到接近0
+        self.flatness_band = flatness_band
+        self.frame_ms = frame_ms
+        self.logger = get_logger(__name__)
+
+    def analyze(self, path):
+        """分析录音，返回统计信息字典（含 passed 和 reason）"""
+        samples, sample_rate = open_audio(path)
+        scale = 1.0
+        if samples.dtype.kind == 'i':
+            scale = 1.0 / (np.iinfo(samples.dtype).max + 1)
+
+        frame_len = max(int(sample_rate * self.frame_ms / 1000), 16)
+        n_frames = len(samples) // frame_len
+        freqs = np.fft.rfftfreq(frame_len, 1.0 / sample_rate)
+        speech_bins = (freqs >= self.speech_band[0]) & (freqs <= self.speech_band[1])
+        flat_bins = (freqs >= self.flatness_band[0]) & (freqs <= self.flatness_band[1])
+        window = np.hanning(frame_len).astype(np.float32)
+
+        rms_db = np.empty(n_frames, dtype=np.float32)
+        flatness = np.empty(n_frames, dtype=np.float32)
+        speech_ratio = np.empty(n_frames, dtype=np.float32)
+
+        for start in range(0, n_frames, self.BLOCK_FRAMES):
+            count = min(self.BLOCK_FRAMES, n_frames - start)
+            block = np.asarray(samples[start * frame_len:(start + count) * frame_len], dtype=np.float32)
+            if block.shape[1] > 1:
+                block = block.mean(axis=1)
+            else:
+                block = block[:, 0]
+            frames = block.reshape(count, frame_len) * scale
+            # 去掉每帧的直流（包络检波后的载波电平），只看调制内容
+            frames = frames - frames.mean(axis=1, keepdims=True)
+
+            rms = np.sqrt(np.mean(frames * frames, axis=1))
+            rms_db[start:start + count] = 20 * np.log10(rms + 1e-10)
+
+            power = np.abs(np.fft.rfft(frames * window, axis=1)).astype(np.float64) ** 2 + 1e-20
+            power = self._smooth(power)
+            band = power[:, flat_bins]
+            flatness[start:start + count] = np.exp(np.mean(np.log(band), axis=1)) / np.mean(band, axis=1)
+            speech_ratio[start:start + count] = power[:, speech_bins].sum(axis=1) / power[:, 1:].sum(axis=1)
+
+        active = rms_db > self.rms_threshold_db
+        speech = active & (flatness < self.max_flatness) & (speech_ratio > self.min_speech_ratio)
+
+        stats = {
+            "duration": round(len(samples) / sample_rate, 3),
+            "sample_rate": sample_rate,
+            "frames": int(n_frames),
+            "rms_db_median": self._round(np.median(rms_db)) if n_frames else None,
+            "rms_db_p95": self._round(np.percentile(rms_db, 95)) if n_frames else None,
+            "active_fraction": self._round(active.mean()) if n_frames else 0.0,
+            "flatness_median": self._round(np.median(flatness[active])) if active.any() else None,
+            "speech_ratio_median": self._round(np.median(speech_ratio[active])) if active.any() else None,
+            "speech_fraction": self._round(speech.mean()) if n_frames else 0.0,
+        }
+        stats["passed"], stats["reason"] = self._verdict(stats)
+        return stats
+
+    def _smooth(self, power):
+        """相邻若干帧的功率谱取滑动平均：单帧周期图方差太大，白噪声的平坦度会被低估"""
+        half = self.SMOOTH_FRAMES // 2
+        n = len(power)
+        padded = np.zeros((n + 2 * half, power.shape[1]), dtype=power.dtype)
+        padded[half:half + n] = power
+        total = sum(padded[i:i + n] for i in range(2 * half + 1))
+        # 块首尾只平均实际存在的帧
+        index = np.arange(n)
+        counts = np.minimum(index + half, n - 1) - np.maximum(index - half, 0) + 1
+        return total / counts[:, None]
+
+    def _verdict(self, stats):
+        if stats["frames"] == 0:
+            return False, "录音为空"
+        if stats["active_fraction"] < self.min_speech_fraction:
+            return False, f"几乎无声（有声帧 {stats['active_fraction']:.1%}）"
+        if stats["speech_fraction"] < self.min_speech_fraction:
+            return False, f"语音帧过少（{stats['speech_fraction']:.1%}，平坦度中位数 {stats['flatness_median']}）"
+        return True, "ok"
+
+    @staticmethod
+    def _round(value):
+        return round(float(value), 4)
+
+    @staticmethod
+    def stats_path(audio_path):
+        return os.path.splitext(audio_path)[0] + ".gate.json"
+
+    def save_stats(self, audio_path, stats):
+        """统计信息保存为录音旁边的 <文件名>.gate.json"""
+        stats_path = self.stats_path(audio_path)
+        with open(stats_path, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, ensure_ascii=False, indent=2)
+        return stats_path
+
+    def load_stats(self, audio_path):
+        """读取 save_stats 保存的统计信息；没有或无法解析时返回None"""
+        try:
+            with open(self.stats_path(audio_path), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
@@ -0,0 +1,174 @@
+# app/flowgraph.py
+import json
+import os
+import platform
+import queue
+import signal
+import subprocess
+import threading
+
+from app.logging_config import get_logger
+
+
+class FlowgraphError(Exception):
+    """flowgraph进程未运行、未应答或命令执行失败"""
+
+
+class FlowgraphService:
+    """长驻的GNU Radio进程
+
+    sdr.py 以 --control 模式启动一次，SDR设备、滤波器和数据流一直运行；
+    每个时段只通过stdin发送 open/close 命令切换输出文件，时段开始的延迟为毫秒级，
+    不再因为重新导入PyQt5/gnuradio、重新打开设备而丢失开头几秒的音频。
+
+    控制协议：每行一个JSON命令；进程以 "@" 开头的JSON行应答，
+    带 "event" 字段的行是进程主动上报的事件，交给 on_event 处理。
+    """
+
+    READY_TIMEOUT = 60
+    COMMAND_TIMEOUT = 10
+
+    def __init__(self, script, extra_args=None, on_event=None):
+        self.script = script
+        self.extra_args = list(extra_args or [])
+        self.on_event = on_event
+        self.process = None
+        self.logger = get_logger(__name__)
+        self._replies = queue.Queue()
+        self._command_lock = threading.Lock()
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        """启动进程并等待其完成初始化"""
+        if self.alive:
+            return
+        working_dir = os.path.dirname(self.script)
+        command = ["python", os.path.basename(self.script), "--control"] + self.extra_args
+        self.logger.info(f"启动常驻GNU Radio进程 (工作目录: {working_dir})")
+
+        kwargs = {}
+        if platform.system() == "Windows":
+            kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+        self._replies = queue.Queue()
+        self.process = subprocess.Popen(
+            command,
+            cwd=working_dir,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            encoding='utf-8',
+            bufsize=1,
+            **kwargs
+        )
+        # stdout和stderr分别读取，避免一个管道写满阻塞子进程
+        threading.Thread(target=self._read_stdout, args=(self.process,), daemon=True).start()
+        threading.Thread(target=self._read_stderr, args=(self.process,), daemon=True).start()
+
+        try:
+            self._wait_reply("ready", self.READY_TIMEOUT)
+        except FlowgraphError:
+            self.stop()
+            raise
+        self.logger.info("GNU Radio进程已就绪")
+
+    def open(self, output_dir, file_prefix):
+        """开始写入一组新文件，返回 ({通道: 路径}, 文件开头的预录秒数)"""
+        reply = self.command({"cmd": "open", "output_dir": output_dir, "file_prefix": file_prefix})
+        return reply.get("paths", {}), float(reply.get("pre_roll", 0.0))
+
+    def close(self):
+        """关闭当前文件；返回时WAV头已经写完，文件可以直接交给后处理"""
+        self.command({"cmd": "close"})
+
+    def command(self, message, timeout=None):
+        with self._command_lock:
+            if not self.alive:
+                raise FlowgraphError("GNU Radio进程未运行")
+            self._discard_stale_replies()
+            try:
+                self.process.stdin.write(json.dumps(message, ensure_ascii=False) + "\n")
+                self.process.stdin.flush()
+            except OSError as e:
+                raise FlowgraphError(f"发送命令失败: {e}")
+            return self._wait_reply(message["cmd"], timeout or self.COMMAND_TIMEOUT)
+
+    def stop(self, timeout=10):
+        """关闭stdin让进程自行停止flowgraph，超时后再发送信号/强制结束"""
+        process = self.process
+        self.process = None
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            try:
+                if platform.system() == "Windows":
+                    process.send_signal(signal.CTRL_BREAK_EVENT)
+                else:
+                    process.send_signal(signal.SIGINT)
+                process.wait(timeout=timeout)
+            except Exception as e:
+                self.logger.error(f"停止Flowgraph出错: {e}")
+                process.kill()
+        self.logger.info("常驻GNU Radio进程已停止")
+
+    def _discard_stale_replies(self):
+        # 之前超时的命令可能在之后才应答，丢弃这些应答以免与本次命令错位
+        while True:
+            try:
+                reply = self._replies.get_nowait()
+            except queue.Empty:
+                return
+            if reply is None:
+                self._replies.put(None)
+                return
+
+    def _wait_reply(self, cmd, timeout):
+        try:
+            reply = self._replies.get(timeout=timeout)
+        except queue.Empty:
+            raise FlowgraphError(f"等待命令应答超时: {cmd}")
+        if reply is None:
+            raise FlowgraphError(f"GNU Radio进程已退出: {cmd}")
+        if not reply.get("ok"):
+            raise FlowgraphError(f"命令 {cmd} 执行失败: {reply.get('error')}")
+        if reply.get("cmd") != cmd:
+            raise FlowgraphError(f"命令应答不匹配: 期望 {cmd}, 收到 {reply.get('cmd')}")
+        return reply
+
+    def _read_stdout(self, process):
+        for line in process.stdout:
+            line = line.strip()
+            if not line.startswith("@"):
+                if line:
+                    self.logger.debug(f"[GNU Radio] {line}")
+                continue
+            try:
+                message = json.loads(line[1:])
+            except ValueError:
+                self.logger.warning(f"无法解析的控制输出: {line}")
+                continue
+            if "event" in message:
+                if self.on_event:
+                    try:
+                        self.on_event(message)
+                    except Exception as e:
+                        self.logger.error(f"处理flowgraph事件出错 {message}: {e}", exc_info=True)
+            else:
+                self._replies.put(message)
+        # 进程退出：唤醒正在等待应答的调用者
+        self._replies.put(None)
+        self.logger.warning(f"GNU Radio进程输出结束 (退出码: {process.poll()})")
+
+    def _read_stderr(self, process):
+        for line in process.stderr:
+            if line.strip():
+                self.logger.error(f"[GNU Radio ERR] {line.strip()}")
@@ -0,0 +1,238 @@
+# app/jobs.py
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from app.logging_config import get_logger
+from app.pipeline import Recording
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+SKIPPED = "skipped"  # 内容检查未通过（静音、噪声），不转录
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    path        TEXT NOT NULL UNIQUE,
+    channel     TEXT,
+    started_at  TEXT,
+    slot_name   TEXT,
+    state       TEXT NOT NULL DEFAULT 'queued',
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    last_error  TEXT,
+    not_before  REAL NOT NULL DEFAULT 0,
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs (state, not_before);
+"""
+
+# 后续版本新增的列：(列名, 定义)；打开旧数据库时自动补齐
+_COLUMNS = [
+    ("priority", "REAL NOT NULL DEFAULT 0"),
+]
+
+
+class JobStore:
+    """SQLite持久化的后处理任务表
+
+    每个录音文件对应一条任务，状态为 queued/running/done/failed，记录尝试次数和时间戳。
+    进程重启后 running 的任务回到 queued，因此重启只会带来延迟而不会丢失数据。
+    """
+
+    def __init__(self, db_path, max_attempts=5, retry_delay=60, retry_delay_max=3600, priority_aging=600):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.retry_delay_max = retry_delay_max
+        # 排队每满 priority_aging 秒优先级加1（优先级在0~1之间），低优先级的任务不会一直等下去
+        self.priority_aging = priority_aging
+        self.logger = get_logger(__name__)
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        # 多个工作线程共用一个连接，由 _lock 串行化
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        existing = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for name, definition in _COLUMNS:
+            if name not in existing:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {definition}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def enqueue(self, recording):
+        """新增任务；同一路径已存在时不重复添加，返回任务id"""
+        return self.enqueue_many([recording])[0]
+
+    def enqueue_many(self, recordings):
+        """在一个事务中登记多个文件（如同一时段的各通道），工作线程能一次取到整组"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for recording in recordings:
+                    started_at = recording.started_at.isoformat() if recording.started_at else None
+                    self._conn.execute(
+                        "INSERT OR IGNORE INTO jobs "
+                        "(path, channel, started_at, slot_name, state, priority, created_at, updated_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (recording.path, recording.channel, started_at, recording.slot_name, QUEUED,
+                         recording.priority, now, now)
+                    )
+                    row = self._conn.execute("SELECT id FROM jobs WHERE path = ?", (recording.path,)).fetchone()
+                    recording.job_id = row["id"]
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [recording.job_id for recording in recordings]
+
+    def requeue_failed(self, path):
+        """把已放弃的任务重新排队（启动时回放积压用）"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET state = ?, attempts = 0, not_before = 0, updated_at = ? "
+                "WHERE path = ? AND state = ?",
+                (QUEUED, time.time(), path, FAILED)
+            )
+        return cursor.rowcount > 0
+
+    def state_of(self, path):
+        """某个文件对应任务的状态；没有任务时返回None"""
+        with self._lock:
+            row = self._conn.execute("SELECT state FROM jobs WHERE path = ?", (path,)).fetchone()
+        return row["state"] if row else None
+
+    def claim(self):
+        """原子地取出一个可执行的任务并置为running，按随排队时间增长的优先级先后取；没有时返回None"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT * FROM jobs WHERE state = ? AND not_before <= ? "
+                    "ORDER BY priority + (? - created_at) / ? DESC, id LIMIT 1",
+                    (QUEUED, now, now, float(self.priority_aging))
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET state = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (RUNNING, now, row["id"])
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self._to_recording(row)
+
+    def claim_siblings(self, recording, limit):
+        """再取出与recording同一时段（开始时间相同）的其他可执行任务，用于批量转录"""
+        if recording.started_at is None or limit <= 0:
+            return []
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT * FROM jobs WHERE state = ? AND not_before <= ? AND started_at = ? AND id != ? "
+                    "ORDER BY id LIMIT ?",
+                    (QUEUED, now, recording.started_at.isoformat(), recording.job_id, limit)
+                ).fetchall()
+                for row in rows:
+                    self._conn.execute(
+                        "UPDATE jobs SET state = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                        (RUNNING, now, row["id"])
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [self._to_recording(row) for row in rows]
+
+    def next_due(self):
+        """最近一个排队任务可执行的时间（time.time()），没有排队任务时返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(not_before) AS t FROM jobs WHERE state = ?", (QUEUED,)
+            ).fetchone()
+        return row["t"]
+
+    def update_path(self, job_id, path):
+        """归档后更新任务指向的文件；该路径已属于另一条任务时返回False"""
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "UPDATE jobs SET path = ?, updated_at = ? WHERE id = ?", (path, time.time(), job_id)
+                )
+            except sqlite3.IntegrityError:
+                return False
+        return True
+
+    def complete(self, job_id):
+        self._set_state(job_id, DONE, None)
+
+    def skip(self, job_id, reason):
+        self._set_state(job_id, SKIPPED, str(reason))
+
+    def fail(self, job_id, error):
+        """记录失败；未超过最大尝试次数时按指数退避重新排队"""
+        with self._lock:
+            row = self._conn.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            attempts = row["attempts"]
+            if attempts >= self.max_attempts:
+                state, not_before = FAILED, 0
+            else:
+                delay = min(self.retry_delay_max, self.retry_delay * (2 ** (attempts - 1)))
+                state, not_before = QUEUED, time.time() + delay
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, last_error = ?, not_before = ?, updated_at = ? WHERE id = ?",
+                (state, str(error), not_before, time.time(), job_id)
+            )
+        if state == FAILED:
+            self.logger.error(f"任务 {job_id} 已失败 {attempts} 次，放弃: {error}")
+
+    def recover(self):
+        """启动时把上次中断的running任务放回队列"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET state = ?, updated_at = ? WHERE state = ?", (QUEUED, time.time(), RUNNING)
+            )
+        return cursor.rowcount
+
+    def counts(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) AS n FROM jobs GROUP BY state").fetchall()
+        return {row["state"]: row["n"] for row in rows}
+
+    def _set_state(self, job_id, state, error):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, last_error = ?, updated_at = ? WHERE id = ?",
+                (state, error, time.time(), job_id)
+            )
+
+    @staticmethod
+    def _to_recording(row):
+        started_at = datetime.fromisoformat(row["started_at"]) if row["started_at"] else None
+        recording = Recording(row["path"], row["channel"], started_at, row["slot_name"])
+        recording.job_id = row["id"]
+        recording.attempts = row["attempts"] + 1
+        recording.priority = row["priority"]
+        return recording
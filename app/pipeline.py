@@ -0,0 +1,206 @@
+# app/pipeline.py
+import os
+import threading
+import time
+
+from app.logging_config import get_logger
+
+
+class Skipped(Exception):
+    """handler主动放弃的任务（如录音中没有语音），记为skipped，不再重试"""
+
+
+class Recording:
+    """一个待后处理的录音文件"""
+
+    def __init__(self, path, channel, started_at, slot_name=None, buffer=None):
+        self.path = path
+        self.channel = channel
+        self.started_at = started_at  # 录制开始时间，用于归档命名
+        self.slot_name = slot_name
+        self.buffer = buffer  # 所属的采集缓冲区，处理完后释放
+        self.job_id = None  # 持久化任务表中的id
+        self.attempts = 0
+        self.priority = 0.0  # 越大越先处理（信号遥测中可用秒数的占比），没有遥测时为0
+
+    def __repr__(self):
+        return f"Recording({self.channel!r}, {self.path!r})"
+
+
+class CaptureBuffer:
+    """采集环中的一个槽位：一个临时目录 + 本时段的文件名前缀"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.prefix = ""
+        self.capturing = False
+        self.pending = 0  # 尚未处理完的录音数
+
+    @property
+    def free(self):
+        return not self.capturing and self.pending == 0
+
+    def path_for(self, channel, ext=".wav"):
+        return os.path.join(self.directory, f"{self.prefix}{channel}{ext}")
+
+    def __repr__(self):
+        return f"CaptureBuffer({self.directory!r}, prefix={self.prefix!r})"
+
+
+class CaptureRing:
+    """固定大小的采集缓冲环
+
+    每个时段写入独立的槽位和唯一文件名，上一时段的文件仍在归档/转录时，
+    新时段可以在另一个槽位中开始采集。
+    """
+
+    def __init__(self, base_dir, size=4):
+        self.buffers = [CaptureBuffer(os.path.join(base_dir, f"ring{i}")) for i in range(size)]
+        self._next = 0
+        self._lock = threading.Lock()
+        self.logger = get_logger(__name__)
+        for buffer in self.buffers:
+            os.makedirs(buffer.directory, exist_ok=True)
+
+    def acquire(self, prefix):
+        """取一个空闲槽位开始采集；全部占用时返回None"""
+        with self._lock:
+            for i in range(len(self.buffers)):
+                index = (self._next + i) % len(self.buffers)
+                buffer = self.buffers[index]
+                if buffer.free:
+                    buffer.prefix = prefix
+                    buffer.capturing = True
+                    self._next = (index + 1) % len(self.buffers)
+                    return buffer
+        self.logger.error(f"采集缓冲环已满({len(self.buffers)})，后处理跟不上录制")
+        return None
+
+    def hold(self, buffer):
+        """登记一个从该槽位交给后处理的录音"""
+        with self._lock:
+            buffer.pending += 1
+
+    def seal(self, buffer):
+        """采集结束；没有待处理录音时槽位立即空闲"""
+        with self._lock:
+            buffer.capturing = False
+
+    def release(self, buffer):
+        """一个录音处理完毕"""
+        with self._lock:
+            buffer.pending = max(buffer.pending - 1, 0)
+
+    def in_flight(self):
+        with self._lock:
+            return sum(1 for buffer in self.buffers if not buffer.free)
+
+
+class PostProcessor:
+    """后台后处理阶段：持久化任务表 + 工作线程池
+
+    录制线程只调用 submit() 把文件登记到任务表，归档和转录在工作线程中完成，
+    不会拖延下一个录制时段。handler 抛出异常时任务按任务表的策略重试。
+
+    batch_size > 1 时工作线程一次取出同一时段的多个任务，handler 接收列表并返回
+    与之对应的异常列表（成功为None）。
+    """
+
+    # 没有可执行任务时的最长等待，之后重新检查任务表
+    IDLE_WAIT = 60.0
+
+    def __init__(self, handler, store, workers=2, batch_size=1):
+        self.handler = handler  # handler(recording) 或 handler(recordings)，在工作线程中调用
+        self.store = store
+        self.worker_count = workers
+        self.batch_size = batch_size
+        self.threads = []
+        self._cond = threading.Condition()
+        self._stopping = False
+        self.logger = get_logger(__name__)
+
+    def start(self):
+        if self.threads:
+            return
+        self._stopping = False
+        for i in range(self.worker_count):
+            thread = threading.Thread(target=self._worker, name=f"postprocess-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        self.logger.info(f"后处理线程池已启动 ({self.worker_count} 个线程)")
+
+    def submit(self, recording):
+        """登记到任务表并唤醒一个工作线程"""
+        return self.submit_many([recording])
+
+    def submit_many(self, recordings):
+        """一次登记多个文件（同一时段的各通道）"""
+        try:
+            self.store.enqueue_many(recordings)
+        except Exception as e:
+            self.logger.error(f"登记后处理任务失败 {recordings}: {e}")
+            return False
+        with self._cond:
+            self._cond.notify()
+        return True
+
+    def wake(self):
+        """任务表有新任务（如启动回放）时唤醒所有工作线程"""
+        with self._cond:
+            self._cond.notify_all()
+
+    def stop(self, timeout=None):
+        """停止工作线程；未完成的任务留在任务表中，下次启动继续"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for thread in self.threads:
+            thread.join(timeout)
+        self.threads = []
+        self.logger.info("后处理线程池已停止")
+
+    def _idle_timeout(self):
+        next_due = self.store.next_due()
+        if next_due is None:
+            return self.IDLE_WAIT
+        return min(max(next_due - time.time(), 0.1), self.IDLE_WAIT)
+
+    def _worker(self):
+        while not self._stopping:
+            recording = self.store.claim()
+            if recording is None:
+                with self._cond:
+                    if not self._stopping:
+                        self._cond.wait(self._idle_timeout())
+                continue
+
+            if self.batch_size > 1:
+                self._run_batch([recording] + self.store.claim_siblings(recording, self.batch_size - 1))
+                continue
+
+            try:
+                self.handler(recording)
+                self.store.complete(recording.job_id)
+            except Skipped as e:
+                self.logger.info(f"跳过 {recording}: {e}")
+                self.store.skip(recording.job_id, e)
+            except Exception as e:
+                self.logger.error(f"后处理 {recording} 出错（第{recording.attempts}次）: {e}", exc_info=True)
+                self.store.fail(recording.job_id, e)
+
+    def _run_batch(self, recordings):
+        try:
+            errors = self.handler(recordings)
+        except Exception as e:
+            self.logger.error(f"批量后处理 {recordings} 出错: {e}", exc_info=True)
+            errors = [e] * len(recordings)
+
+        for recording, error in zip(recordings, errors):
+            if error is None:
+                self.store.complete(recording.job_id)
+            elif isinstance(error, Skipped):
+                self.logger.info(f"跳过 {recording}: {error}")
+                self.store.skip(recording.job_id, error)
+            else:
+                self.logger.error(f"后处理 {recording} 出错（第{recording.attempts}次）: {error}")
+                self.store.fail(recording.job_id, error)
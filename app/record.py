@@ -1,14 +1,25 @@
 
+import glob
 import subprocess
 import time
 import os
-import requests
 import signal
 import platform
 import threading
 from datetime import datetime, timedelta
-import shutil
+
+import soundfile as sf
+
+from app.audio_gate import AudioGate
+from app.flowgraph import FlowgraphService
+from app.jobs import SKIPPED, JobStore
 from app.logging_config import get_logger
+from app.pipeline import CaptureRing, PostProcessor, Recording, Skipped
+from app.scheduler import Slot, SlotScheduler
+from app.storage import atomic_move
+from app.transcription_client import TranscriptionClient
+from gunradio.channel_plan import ASR_SUFFIX, AUDIO_FORMATS, DEFAULT_PLAN, load_plan
+from gunradio.telemetry import read_telemetry, summarize
 
 
 class RadioRecorder:
@@ -17,20 +28,103 @@ class RadioRecorder:
         self.FLOWGRAPH_SCRIPT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../gunradio/sdr.py"))
         self.RECORD_DURATION = 360  # 恢复6分钟录制
         self.API_ENDPOINT = "http://localhost:7000/transcribe"
+        self.API_TIMEOUT = 60
+        self.API_MAX_RETRIES = 3
+        self.UPLOAD_MODE = "multipart"  # "stream": 分块流式上传到 /transcribe/stream
+        # "batch": 同一时段的各通道一次请求上传到 /transcribe/batch，服务端一次批量推理
+        self.TRANSCRIBE_MODE = "single"
         self.BASE_DIR = os.path.dirname(os.path.abspath(__file__))
         self.running = False
         self.process = None
+        # "persistent": GNU Radio进程常驻，每个时段只切换输出文件；"per_slot": 每个时段启动一次sdr.py
+        self.FLOWGRAPH_MODE = "persistent"
+        # 无人值守录制不需要频谱/瀑布图界面，省去Qt渲染开销和显示服务器
+        self.FLOWGRAPH_HEADLESS = True
+        self.FLOWGRAPH_WATCHDOG = 30  # 连续模式下检查GNU Radio进程是否存活的间隔（秒）
+        # "slots": 按 SLOTS 定时录制；"continuous": 全天连续录制，按 SEGMENT_SECONDS 滚动分段，分段之间不丢样本
+        self.RECORD_MODE = "slots"
+        self.SEGMENT_SECONDS = 1800
+        # 常驻flowgraph始终缓存最近N秒音频，每个时段的文件从触发前N秒开始
+        self.PRE_ROLL_SECONDS = 10
+        # 信道规划（电台频率、带宽、增益、输出名），flowgraph和录制程序共用同一个文件
+        self.CHANNEL_PLAN = DEFAULT_PLAN
+        self.channel_plan = load_plan(self.CHANNEL_PLAN)
+        self.CHANNELS = self.channel_plan.names()
+
+        # 录制时段（类cron规则：分 时 日 月 周），可为不同通道配置多个独立时段
+        self.SLOTS = [
+            Slot("整点/半点", "0,30 * * * *", self.RECORD_DURATION),
+        ]
+        self.scheduler = None
+        self.active_slot = None
+
+        self.POSTPROCESS_WORKERS = 2
+        # 转录前的内容检查："mark" 只保存统计（<文件名>.gate.json）照常转录；"skip" 跳过静音/噪声/无载波的录音；None 关闭。
+        # 阈值只在合成信号上测试过，还没有用真实录音校验，默认不丢弃录音；校验前不要改为 "skip"
+        self.AUDIO_GATE = "mark"
+        self.audio_gate = AudioGate()
+        self.JOB_MAX_ATTEMPTS = 5
 
         # 关键路径配置
         self.TEMP_DIR = os.path.join(self.BASE_DIR, "../media", "temp")
         self.RECORDINGS_DIR = os.path.join(self.BASE_DIR, "../media", "recordings")
         self.TRANSCRIPTIONS_DIR = os.path.join(self.BASE_DIR, "../media", "transcriptions")
+        self.JOBS_DB = os.path.join(self.BASE_DIR, "../media", "jobs.sqlite3")
+        self.CONTINUOUS_DIR = os.path.join(self.TEMP_DIR, "continuous")
+        # 常驻flowgraph同时保存原始IQ（2 Msps 约16 MB/秒），用 sdr.py --replay 离线重新解调；None 关闭
+        self.IQ_CAPTURE_DIR = None  # 如 os.path.join(self.BASE_DIR, "../media", "iq")
+        self.IQ_SEGMENT_SECONDS = 60
+        self.IQ_KEEP_SEGMENTS = 10
+        # flowgraph每秒记录各电台的载波电平、载噪比等；None 关闭
+        self.TELEMETRY_DIR = os.path.join(self.BASE_DIR, "../media", "telemetry")
+        # 按遥测处理录音："priority" 只调整转录顺序；"skip" 另外跳过几乎没有信号的录音，
+        # 载噪比估计还没有用真实采集校验过，弱而可懂的电台可能被误判，校验前不要打开；None 不使用
+        self.TELEMETRY_GATE = "priority"
+        self.TELEMETRY_MIN_SNR_DB = 6.0  # 载噪比不低于此值的秒才算有信号
+        self.TELEMETRY_MIN_GOOD_FRACTION = 0.1  # 有信号的秒数占比低于此值时跳过
+
+        self.flowgraph = FlowgraphService(
+            self.FLOWGRAPH_SCRIPT,
+            extra_args=self.flowgraph_args() + self.service_args(),
+            on_event=self.on_flowgraph_event
+        )
 
         # 确保目录存在
         os.makedirs(self.TEMP_DIR, exist_ok=True)
         os.makedirs(self.RECORDINGS_DIR, exist_ok=True)
         os.makedirs(self.TRANSCRIPTIONS_DIR, exist_ok=True)
 
+        # 所有通道和时段共用的转录客户端（连接池 + 重试）
+        self.transcription_client = TranscriptionClient(
+            self.API_ENDPOINT,
+            timeout=self.API_TIMEOUT,
+            max_retries=self.API_MAX_RETRIES,
+            pool_size=self.POSTPROCESS_WORKERS,
+            upload_mode=self.UPLOAD_MODE
+        )
+
+        # 采集缓冲环：每个时段写入独立槽位，与上一时段的后处理互不干扰
+        self.CAPTURE_RING_SIZE = 4
+        self.capture_ring = CaptureRing(self.TEMP_DIR, self.CAPTURE_RING_SIZE)
+        self._buffer_jobs = {}  # 任务id -> 采集槽位，文件离开槽位后释放
+        self._buffer_lock = threading.Lock()
+
+        # 后处理（归档+转录）由持久化任务表驱动，在后台线程池中进行，不阻塞录制
+        self.job_store = JobStore(self.JOBS_DB, max_attempts=self.JOB_MAX_ATTEMPTS)
+        if self.TRANSCRIBE_MODE == "batch":
+            self.postprocessor = PostProcessor(
+                self.process_recording_batch,
+                self.job_store,
+                workers=self.POSTPROCESS_WORKERS,
+                batch_size=len(self.CHANNELS)
+            )
+        else:
+            self.postprocessor = PostProcessor(
+                self.process_recording,
+                self.job_store,
+                workers=self.POSTPROCESS_WORKERS
+            )
+
         self.debug_countdown = True  # 设为False可关闭详细倒计时
 
         # self.setup_logging()
@@ -44,11 +138,50 @@ class RadioRecorder:
             return False
 
         self.running = True
+        self.replay_backlog()
+        self.postprocessor.start()
+        self.scheduler = SlotScheduler()
+        if self.RECORD_MODE == "continuous":
+            self.start_flowgraph_service()
+            self.scheduler.call_later(self.FLOWGRAPH_WATCHDOG, self.watch_flowgraph)
+        else:
+            if self.FLOWGRAPH_MODE == "persistent":
+                # 失败时第一个时段开始时会再次尝试启动
+                self.start_flowgraph_service()
+            for slot in self.SLOTS:
+                self.scheduler.add_slot(slot, self.on_slot_triggered)
+
         self.recording_thread = threading.Thread(target=self._run, daemon=True)
         self.recording_thread.start()
-        self.logger.info("主程序启动成功，将等待整点/半点自动录制")
+        if self.RECORD_MODE == "continuous":
+            self.logger.info(f"主程序启动成功，连续录制中（每 {self.SEGMENT_SECONDS} 秒一个分段）")
+        else:
+            self.logger.info("主程序启动成功，将等待整点/半点自动录制")
         return True
 
+    def start_flowgraph_service(self):
+        try:
+            self.flowgraph.start()
+            return True
+        except Exception as e:
+            self.logger.error(f"启动常驻GNU Radio进程失败: {e}")
+            return False
+
+    def watch_flowgraph(self):
+        """连续模式：GNU Radio进程意外退出时重新启动（在调度线程中定期执行）"""
+        if not self.running:
+            return
+        if not self.flowgraph.alive:
+            self.logger.warning("常驻GNU Radio进程已退出，重新启动")
+            self.start_flowgraph_service()
+        self.scheduler.call_later(self.FLOWGRAPH_WATCHDOG, self.watch_flowgraph)
+
+    def on_flowgraph_event(self, message):
+        """处理GNU Radio进程上报的事件（在其输出读取线程中执行）"""
+        if message.get("event") == "segment":
+            started_at = datetime.fromtimestamp(message["started_at"])
+            self.process_segment(message["path"], message["channel"], started_at)
+
     def stop(self):
         """停止主程序"""
         if not self.running:
@@ -56,150 +189,371 @@ class RadioRecorder:
             return False
 
         self.running = False
+        if self.scheduler:
+            self.scheduler.stop()
         if self.process:
             self.stop_flowgraph(self.process)
+            self.process = None
+        self.flowgraph.stop()
+        self.postprocessor.stop(timeout=10)
+        self.transcription_client.close()
         self.logger.info("主程序已停止")
         return True
 
     def _run(self):
-        """主运行循环"""
+        """主运行循环：由调度器在下一个时段到达时触发录制"""
         try:
-            while self.running:
-                # 等待下一个整点或半点
-                self.wait_until_trigger_time()
-
-                if not self.running:
-                    break
-
-                # 执行录制流程
-                self.execute_recording_cycle()
-
+            self.scheduler.run()
         except Exception as e:
             self.logger.error(f"主循环出错: {e}", exc_info=True)
         finally:
             self.running = False
 
+    def on_slot_triggered(self, slot, fire_time):
+        """时段触发回调（在调度线程中执行）"""
+        self.logger.info(f"到达触发时间: {fire_time.strftime('%H:%M:%S')} ({slot.name})")
 
-    def wait_until_trigger_time(self):
-        """等待直到整点或半点（修复时间计算错误版）"""
-        while self.running:
-            now = datetime.now()
-            current_minute = now.minute
+        if self.active_slot is not None:
+            # flowgraph只有一组输出文件，时段不能重叠（即使通道不同），见 Slot
+            self.logger.warning(f"时段 {self.active_slot.name} 仍在录制中，跳过本次触发: {slot.name}")
+        else:
+            self.execute_recording_cycle(slot)
 
-            # 判断是否到达触发时间（00或30分钟）
-            if current_minute % 30 == 0:
-                self.logger.info(f"到达触发时间: {now.strftime('%H:%M:%S')}")
-                return
+        next_time = self.scheduler.next_fire_time()
+        if next_time:
+            self.logger.info(f"下次录制时间: {next_time.strftime('%Y-%m-%d %H:%M:%S')}")
 
-            try:
-                # 计算下一个触发时间
-                if current_minute < 30:
-                    next_trigger_time = now.replace(minute=30, second=0, microsecond=0)
-                else:
-                    # 处理跨小时情况
-                    next_trigger_time = (now.replace(minute=0, second=0, microsecond=0)
-                                         + timedelta(hours=1))
-
-                # 初始提示
-                remaining = (next_trigger_time - now).total_seconds()
-                self.logger.info(
-                    f"下次录制时间: {next_trigger_time.strftime('%H:%M:%S')} | "
-                    f"剩余等待: {int(remaining // 60)}分{int(remaining % 60)}秒"
-                )
-
-                # 等待循环（优化日志频率）
-                last_log_minute = None
-                while self.running:
-                    now = datetime.now()
-                    if now >= next_trigger_time:
-                        break
-
-                    remaining = (next_trigger_time - now).total_seconds()
-                    current_minute = now.minute
-
-                    # 智能日志输出
-                    if remaining > 300 and current_minute % 5 == 0 and current_minute != last_log_minute:
-                        self.logger.info(f"剩余等待: {int(remaining // 60)}分{int(remaining % 60)}秒")
-                        last_log_minute = current_minute
-                    elif remaining <= 5:
-                        self.logger.debug(f"触发倒计时: {int(remaining)}秒")
-
-                    time.sleep(1)
+    def execute_recording_cycle(self, slot):
+        """开始一个录制周期，录制结束由调度器定时回调 finish_recording_cycle"""
+        self.logger.info(f"=== 开始新的录制周期: {slot.name} ===")
 
-            except Exception as e:
-                self.logger.error(f"时间计算错误: {e}", exc_info=True)
-                time.sleep(10)  # 防止错误循环
+        # 1. 分配采集槽位，文件名带本时段时间戳
+        started_at = datetime.now()
+        buffer = self.capture_ring.acquire(started_at.strftime('%Y%m%d_%H%M%S_'))
+        if buffer is None:
+            self.logger.error(f"没有空闲的采集槽位，跳过本时段: {slot.name}")
+            return
 
-    def execute_recording_cycle(self):
-        """执行完整的录制周期"""
         try:
-            self.logger.info("=== 开始新的录制周期 ===")
+            # 2. 启动录制
+            if self.FLOWGRAPH_MODE == "persistent":
+                # 文件以预录音频开头，录音的实际开始时间要提前相应秒数（归档命名、遥测窗口都按它算）
+                started_at -= timedelta(seconds=self.open_capture(buffer))
+            else:
+                self.process = self.run_flowgraph(buffer)
+            self.active_slot = slot
 
-            # 1. 启动录制
-            self.process = self.run_flowgraph()
-            start_time = time.time()
+            # 3. 录制时长到达后停止（不再每秒轮询）
+            self.scheduler.call_later(slot.duration, self.finish_recording_cycle, slot, started_at, buffer)
 
-            # 2. 等待录制完成
-            while time.time() - start_time < self.RECORD_DURATION and self.running:
-                time.sleep(1)
+        except Exception as e:
+            self.active_slot = None
+            self.capture_ring.seal(buffer)
+            self.logger.error(f"录制周期出错: {e}", exc_info=True)
 
-            # 3. 停止录制
-            if self.process:
+    def finish_recording_cycle(self, slot, started_at, buffer):
+        """停止录制并把文件交给后处理线程"""
+        try:
+            # 4. 停止录制
+            if self.FLOWGRAPH_MODE == "persistent":
+                self.close_capture()
+            elif self.process:
                 self.stop_flowgraph(self.process)
+                self.process = None
                 time.sleep(2)  # 确保文件完全写入
 
-            # 4. 处理录制的文件
+            # 5. 交出录制的文件，立即回到等待状态
             if self.running:
-                self.process_recorded_files()
+                self.process_recorded_files(buffer, slot.channels, started_at, slot.name)
 
             self.logger.info("=== 录制周期完成 ===")
 
         except Exception as e:
             self.logger.error(f"录制周期出错: {e}", exc_info=True)
+        finally:
+            self.capture_ring.seal(buffer)
+            self.active_slot = None
+
+    def open_capture(self, buffer):
+        """让常驻flowgraph开始写入采集槽位；进程不在运行（首次或崩溃后）时先启动
+
+        返回实际写入的预录秒数（进程刚启动时不足 PRE_ROLL_SECONDS）
+        """
+        if not self.flowgraph.alive:
+            self.logger.warning("常驻GNU Radio进程未运行，重新启动")
+            self.flowgraph.start()
+        _, pre_roll = self.flowgraph.open(os.path.abspath(buffer.directory), buffer.prefix)
+        self.logger.info(f"开始写入: {buffer.path_for('*')}（预录 {pre_roll:.1f} 秒）")
+        return pre_roll
+
+    def close_capture(self):
+        """关闭当前文件，flowgraph继续运行等待下一个时段"""
+        try:
+            self.flowgraph.close()
+        except Exception as e:
+            # 进程异常退出时文件可能不完整，仍交给后处理（由大小检查过滤）
+            self.logger.error(f"关闭录音文件失败: {e}")
 
-    def process_recorded_files(self):
-        """处理录制的音频文件"""
-        # 定义预期的文件路径
-        file_paths = [
-            os.path.join(self.TEMP_DIR, "ch1.wav"),
-            os.path.join(self.TEMP_DIR, "ch2.wav"),
-            os.path.join(self.TEMP_DIR, "ch3.wav")
-        ]
+    def process_recorded_files(self, buffer, channels=None, started_at=None, slot_name=None):
+        """将录制的音频文件提交到后处理队列"""
+        started_at = started_at or datetime.now()
 
-        for file_path in file_paths:
-            if not self.running:
-                break
+        recordings = []
+        for channel in (channels or self.CHANNELS):
+            file_path = buffer.path_for(channel, self.channel_plan.extension(channel))
 
             if os.path.exists(file_path):
                 file_size = os.path.getsize(file_path)
                 if file_size > 1024:  # 文件大小至少1KB
-                    try:
-                        # 1. 归档录音文件
-                        archived_path = self.archive_recording(file_path)
-
-                        # 2. 发送转录
-                        if archived_path:
-                            self.send_for_transcription(archived_path)
-                    except Exception as e:
-                        self.logger.error(f"处理文件 {file_path} 出错: {e}")
+                    recordings.append(Recording(file_path, channel, started_at, slot_name, buffer))
                 else:
                     self.logger.warning(f"文件过小可能无效: {file_path} ({file_size}字节)")
             else:
                 self.logger.warning(f"文件不存在: {file_path}")
 
-    def archive_recording(self, src_path):
+        if not recordings:
+            return
+        self.prioritize(recordings)
+        # 同一时段的文件一次登记，批量模式下可以被一个工作线程整组取走
+        with self._buffer_lock:
+            for _ in recordings:
+                self.capture_ring.hold(buffer)
+            if self.postprocessor.submit_many(recordings):
+                for recording in recordings:
+                    self._buffer_jobs[recording.job_id] = buffer
+            else:
+                for _ in recordings:
+                    self.capture_ring.release(buffer)
+
+    def process_segment(self, path, channel, started_at):
+        """连续模式下一个分段写完，直接登记为后处理任务"""
+        if not os.path.exists(path) or os.path.getsize(path) <= 1024:
+            self.logger.warning(f"分段文件不存在或过小: {path}")
+            return
+        recording = Recording(path, channel, started_at, "连续录制")
+        self.prioritize([recording])
+        self.postprocessor.submit(recording)
+
+    def process_recording(self, recording):
+        """后处理单个录音（在后处理线程中执行），失败时抛出异常由任务表安排重试"""
+        if not self.prepare_recording(recording):
+            return
+        self.check_telemetry(recording)
+        self.check_audio(recording)
+
+        # 2. 发送转录
+        if not self.send_for_transcription(recording.path):
+            raise RuntimeError(f"转录失败: {recording.path}")
+
+    def process_recording_batch(self, recordings):
+        """批量模式：同一时段的各通道一起归档，一次请求转录；返回每个文件的异常（成功为None）"""
+        errors = [None] * len(recordings)
+        ready = []
+        for i, recording in enumerate(recordings):
+            try:
+                if self.prepare_recording(recording):
+                    self.check_telemetry(recording)
+                    self.check_audio(recording)
+                    ready.append(i)
+            except Exception as e:
+                errors[i] = e
+
+        if ready:
+            try:
+                results = self.transcription_client.transcribe_batch(
+                    [self.transcription_path(recordings[i].path) for i in ready])
+            except Exception as e:
+                self.logger.error(f"批量转录失败: {e}")
+                results = [e] * len(ready)
+
+            for i, result in zip(ready, results):
+                if isinstance(result, Exception):
+                    errors[i] = result
+                else:
+                    self.save_transcription(recordings[i].path, result)
+        return errors
+
+    def prepare_recording(self, recording):
+        """归档录音；返回False表示该文件已由其他任务负责"""
+        with self._buffer_lock:
+            buffer = self._buffer_jobs.pop(recording.job_id, None)
+
+        try:
+            # 1. 归档录音文件（回放的已归档任务跳过这一步）
+            if not self.is_archived(recording.path):
+                companion = self.asr_companion(recording.path)
+                archived_path = self.archive_recording(recording.path, recording.started_at, recording.channel)
+                if not archived_path:
+                    raise RuntimeError(f"归档失败: {recording.path}")
+                if os.path.exists(companion):
+                    # 16 kHz转录文件跟随收听文件归档，命名保持 <归档名>_asr.wav
+                    self.archive_recording(companion, recording.started_at, recording.channel + ASR_SUFFIX)
+                if not self.job_store.update_path(recording.job_id, archived_path):
+                    self.logger.info(f"已有其他任务负责转录: {archived_path}")
+                    return False
+                recording.path = archived_path
+        finally:
+            # 文件已离开采集槽位（或留待重试，文件名唯一不会被覆盖）
+            if buffer is not None:
+                self.capture_ring.release(buffer)
+        return True
+
+    def telemetry_summary(self, recording):
+        """录音时段内该电台的遥测汇总；没有遥测时返回None"""
+        if not self.TELEMETRY_GATE or not self.TELEMETRY_DIR or recording.started_at is None:
+            return None
+        try:
+            start = recording.started_at.timestamp()
+            end = start + sf.info(recording.path).duration
+            records = read_telemetry(self.TELEMETRY_DIR, recording.channel, start, end)
+        except Exception as e:
+            self.logger.warning(f"读取遥测失败 {recording.path}: {e}")
+            return None
+        return summarize(records, self.TELEMETRY_MIN_SNR_DB)
+
+    def prioritize(self, recordings):
+        """登记前按遥测设置优先级：信号好的录音先转录"""
+        for recording in recordings:
+            summary = self.telemetry_summary(recording)
+            if summary is not None:
+                recording.priority = summary["good_fraction"]
+
+    def check_telemetry(self, recording):
+        """几乎全程没有载波的录音不再分析音频和转录；配置为skip时抛出 Skipped"""
+        if self.TELEMETRY_GATE != "skip":
+            return
+        summary = self.telemetry_summary(recording)
+        if summary is None or summary["good_fraction"] >= self.TELEMETRY_MIN_GOOD_FRACTION:
+            return
+        raise Skipped(f"信号过弱（载噪比中位数 {summary['snr_db']} dB，可用 {summary['good_fraction']:.0%}）")
+
+    def check_audio(self, recording):
+        """分析录音内容，统计保存在归档文件旁；没有语音且配置为skip时抛出 Skipped"""
+        if not self.AUDIO_GATE:
+            return
+        try:
+            stats = self.audio_gate.analyze(self.transcription_path(recording.path))
+            self.audio_gate.save_stats(recording.path, stats)
+        except Exception as e:
+            # 分析失败不能导致录音被丢弃
+            self.logger.warning(f"音频分析失败，照常转录 {recording.path}: {e}")
+            return
+
+        if stats["passed"]:
+            return
+        if self.AUDIO_GATE == "skip":
+            raise Skipped(stats["reason"])
+        self.logger.info(f"录音可能没有语音内容（仍然转录）{recording.path}: {stats['reason']}")
+
+    @staticmethod
+    def asr_companion(path):
+        """录音对应的16 kHz转录文件：<文件名>_asr.wav"""
+        root, ext = os.path.splitext(path)
+        return root + ASR_SUFFIX + ext
+
+    @staticmethod
+    def is_asr_companion(path):
+        return os.path.splitext(path)[0].endswith(ASR_SUFFIX)
+
+    def transcription_path(self, path):
+        """送去转录的文件：有16 kHz的转录文件时用它（服务端不必重采样），否则用录音本身"""
+        if self.channel_plan.asr_output == "alongside":
+            companion = self.asr_companion(path)
+            if os.path.exists(companion):
+                return companion
+        return path
+
+    def is_archived(self, path):
+        recordings_dir = os.path.abspath(self.RECORDINGS_DIR)
+        return os.path.commonpath([os.path.abspath(path), recordings_dir]) == recordings_dir
+
+    def replay_backlog(self):
+        """启动时回放积压：中断的任务、采集目录中未归档的文件、已归档但没有转录文本的录音"""
+        recovered = self.job_store.recover()
+
+        pending = self.find_audio(self.TEMP_DIR) + self.find_audio(os.path.join(self.TEMP_DIR, "*"))
+        # 转录文件随对应的录音一起处理
+        pending = [path for path in pending if not self.is_asr_companion(path)]
+        for path in pending:
+            if os.path.getsize(path) > 1024:
+                self.job_store.enqueue(self.recording_from_path(path))
+
+        transcribed = {
+            os.path.splitext(name)[0]
+            for _, _, files in os.walk(self.TRANSCRIPTIONS_DIR)
+            for name in files if name.endswith(".txt")
+        }
+        untranscribed = skipped = 0
+        for path in self.find_audio(os.path.join(self.RECORDINGS_DIR, "*")):
+            if self.is_asr_companion(path):
+                continue
+            if os.path.splitext(os.path.basename(path))[0] in transcribed:
+                continue
+            if self.was_skipped(path):
+                skipped += 1
+                continue
+            self.job_store.enqueue(self.recording_from_path(path))
+            self.job_store.requeue_failed(path)
+            untranscribed += 1
+
+        counts = self.job_store.counts()
+        self.logger.info(
+            f"积压回放: 恢复中断任务 {recovered} 个, 未归档文件 {len(pending)} 个, "
+            f"未转录录音 {untranscribed} 个（另有已跳过 {skipped} 个）, 当前排队 {counts.get('queued', 0)} 个"
+        )
+
+    def was_skipped(self, path):
+        """内容检查跳过的录音没有转录文本，但已处理完，回放积压时不再登记
+
+        以任务表为准；任务表中没有记录（如数据库被删除）且配置为skip时，看内容检查保存的统计
+        （"mark" 时未通过的录音照常转录，没有文本说明还没有转录）。
+        """
+        state = self.job_store.state_of(path)
+        if state is not None:
+            return state == SKIPPED
+        if self.AUDIO_GATE != "skip":
+            return False
+        stats = self.audio_gate.load_stats(path)
+        return stats is not None and not stats.get("passed", True)
+
+    @staticmethod
+    def find_audio(directory):
+        """目录（可含通配符）下所有录音文件：WAV、FLAC、Ogg Opus"""
+        extensions = sorted({extension for extension, _, _ in AUDIO_FORMATS.values()})
+        return [path for extension in extensions for path in glob.glob(os.path.join(directory, "*" + extension))]
+
+    @staticmethod
+    def recording_from_path(path):
+        """从文件名（YYYYmmdd_HHMMSS_通道.wav）还原录音信息，旧格式按修改时间处理"""
+        name = os.path.splitext(os.path.basename(path))[0]
+        try:
+            started_at = datetime.strptime(name[:15], '%Y%m%d_%H%M%S')
+            channel = name[16:] or name
+        except ValueError:
+            started_at = datetime.fromtimestamp(os.path.getmtime(path))
+            channel = name
+        return Recording(path, channel, started_at)
+
+    def archive_recording(self, src_path, started_at=None, channel=None):
         """归档录音文件到日期目录"""
         try:
             # 创建日期分类目录
-            dated_dir = self.get_dated_subfolder(self.RECORDINGS_DIR)
+            started_at = started_at or datetime.now()
+            dated_dir = self.get_dated_subfolder(self.RECORDINGS_DIR, started_at)
 
             # 生成带时间戳的文件名
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"{timestamp}_{os.path.basename(src_path)}"
+            timestamp = started_at.strftime('%Y%m%d_%H%M%S')
+            name, ext = os.path.splitext(os.path.basename(src_path))
+            filename = f"{timestamp}_{channel or name}{ext}"
             dest_path = os.path.join(dated_dir, filename)
 
-            # 复制文件
-            shutil.copy(src_path, dest_path)
+            # 上次已移动成功但未来得及记录（进程中断）
+            if not os.path.exists(src_path) and os.path.exists(dest_path):
+                self.logger.info(f"录音文件此前已归档: {dest_path}")
+                return dest_path
+
+            # 移动文件（同一文件系统内为原子rename，不产生额外的磁盘写入）
+            dest_path = atomic_move(src_path, dest_path)
             self.logger.info(f"录音文件已归档: {dest_path}")
             return dest_path
         except Exception as e:
@@ -209,47 +563,43 @@ class RadioRecorder:
     def send_for_transcription(self, audio_path):
         """发送音频到转录API"""
         try:
-            # 准备转录结果路径
-            dated_dir = self.get_dated_subfolder(self.TRANSCRIPTIONS_DIR)
-            base_name = os.path.splitext(os.path.basename(audio_path))[0]
-            text_path = os.path.join(dated_dir, f"{base_name}.txt")
-
-            # 发送API请求
-            with open(audio_path, 'rb') as audio_file:
-                response = requests.post(
-                    self.API_ENDPOINT,
-                    files={'file': (os.path.basename(audio_path), audio_file, 'audio/wav')},
-                    timeout=60
-                )
-
-            # 处理响应
-            if response.status_code == 200:
-                result = response.json()
-                if result.get('code') == 0:
-                    with open(text_path, 'w', encoding='utf-8') as f:
-                        f.write(result.get('data', ''))
-                    self.logger.info(f"转录结果已保存: {text_path}")
-                else:
-                    self.logger.error(f"API业务错误: {result.get('msg')}")
-            else:
-                self.logger.error(f"API请求失败: {response.status_code}")
+            # 通过共享的连接池发送（失败自动重试）
+            text = self.transcription_client.transcribe(self.transcription_path(audio_path))
+            self.save_transcription(audio_path, text)
+            return True
 
         except Exception as e:
             self.logger.error(f"转录失败: {e}")
+            return False
+
+    def save_transcription(self, audio_path, text):
+        """保存转录结果到日期目录"""
+        dated_dir = self.get_dated_subfolder(self.TRANSCRIPTIONS_DIR)
+        base_name = os.path.splitext(os.path.basename(audio_path))[0]
+        text_path = os.path.join(dated_dir, f"{base_name}.txt")
+        with open(text_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        self.logger.info(f"转录结果已保存: {text_path}")
+        return text_path
 
     # 保留之前定义的辅助方法：
     # get_dated_subfolder(), run_flowgraph(),
     # stop_flowgraph(), _redirect_output() 等
-    def run_flowgraph(self):
-        """启动GNU Radio进程（不修改sdr.py的版本）"""
+    def run_flowgraph(self, buffer):
+        """启动GNU Radio进程，输出写入指定的采集槽位"""
         # 在脚本所在目录运行
         working_dir = os.path.dirname(self.FLOWGRAPH_SCRIPT)
+        command = [
+            "python", os.path.basename(self.FLOWGRAPH_SCRIPT),
+            "--output-dir", os.path.abspath(buffer.directory),
+            "--file-prefix", buffer.prefix,
+        ] + self.flowgraph_args()
 
-        self.logger.info(f"启动GNU Radio (工作目录: {working_dir})")
+        self.logger.info(f"启动GNU Radio (工作目录: {working_dir}, 输出: {buffer.path_for('*')})")
 
         if platform.system() == "Windows":
             process = subprocess.Popen(
-                ["python", os.path.basename(self.FLOWGRAPH_SCRIPT)],
+                command,
                 cwd=working_dir,
                 creationflags=subprocess.CREATE_NEW_PROCESS_GROUP,
                 stdout=subprocess.PIPE,
@@ -259,7 +609,7 @@ class RadioRecorder:
             )
         else:
             process = subprocess.Popen(
-                ["python", os.path.basename(self.FLOWGRAPH_SCRIPT)],
+                command,
                 cwd=working_dir,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
@@ -276,6 +626,29 @@ class RadioRecorder:
 
         return process
 
+    def flowgraph_args(self):
+        args = ["--channel-plan", os.path.abspath(self.CHANNEL_PLAN)]
+        if self.TELEMETRY_DIR:
+            args += ["--telemetry-dir", os.path.abspath(self.TELEMETRY_DIR)]
+        return args + (["--headless"] if self.FLOWGRAPH_HEADLESS else [])
+
+    def service_args(self):
+        """常驻flowgraph进程的专用参数：连续分段或预录，以及可选的原始IQ保存"""
+        args = []
+        if self.IQ_CAPTURE_DIR:
+            args += [
+                "--iq-dir", os.path.abspath(self.IQ_CAPTURE_DIR),
+                "--iq-segment-seconds", str(self.IQ_SEGMENT_SECONDS),
+                "--iq-keep", str(self.IQ_KEEP_SEGMENTS),
+            ]
+        if self.RECORD_MODE != "continuous":
+            return args + (["--pre-roll", str(self.PRE_ROLL_SECONDS)] if self.PRE_ROLL_SECONDS else [])
+        return args + [
+            "--continuous",
+            "--segment-seconds", str(self.SEGMENT_SECONDS),
+            "--output-dir", os.path.abspath(self.CONTINUOUS_DIR),
+        ]
+
     def _redirect_output(self, process):
         """捕获子进程输出"""
         while True:
@@ -305,9 +678,9 @@ class RadioRecorder:
             self.logger.error(f"停止Flowgraph出错: {e}")
             process.kill()
 
-    def get_dated_subfolder(self, base_dir):
+    def get_dated_subfolder(self, base_dir, when=None):
         """获取按日期分类的子目录"""
-        date_str = datetime.now().strftime('%Y-%m-%d')
+        date_str = (when or datetime.now()).strftime('%Y-%m-%d')
         dated_dir = os.path.join(base_dir, date_str)
         os.makedirs(dated_dir, exist_ok=True)
         return dated_dir
@@ -0,0 +1,255 @@
+# app/scheduler.py
+import heapq
+import itertools
+import threading
+import time
+from datetime import datetime, timedelta
+
+from app.logging_config import get_logger
+
+
+class CronSpec:
+    """类cron的时间规则（分 时 日 月 周），例如 "0,30 * * * *" 表示每个整点和半点"""
+
+    FIELD_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+    def __init__(self, expr):
+        fields = expr.split()
+        if len(fields) != 5:
+            raise ValueError(f"cron表达式需要5个字段: {expr!r}")
+
+        self.expr = expr
+        self.minutes, self.hours, self.days, self.months, self.weekdays = [
+            self._parse_field(field, low, high)
+            for field, (low, high) in zip(fields, self.FIELD_RANGES)
+        ]
+        # 周字段允许用7表示周日
+        self.weekdays = frozenset(v % 7 for v in self.weekdays)
+        # 与cron一致：日、周字段都被限定时任一匹配即可
+        self.day_any = fields[2] == "*"
+        self.weekday_any = fields[4] == "*"
+
+    @staticmethod
+    def _parse_field(field, low, high):
+        """解析单个字段，支持 * , - / 语法"""
+        values = set()
+        for part in field.split(","):
+            step = 1
+            if "/" in part:
+                part, step_str = part.split("/", 1)
+                step = int(step_str)
+                if step <= 0:
+                    raise ValueError(f"无效的步长: {field!r}")
+
+            if part == "*":
+                start, end = low, high
+            elif "-" in part:
+                start_str, end_str = part.split("-", 1)
+                start, end = int(start_str), int(end_str)
+            else:
+                start = int(part)
+                end = high if step > 1 else start
+
+            if start < low or end > high or start > end:
+                raise ValueError(f"字段超出范围 [{low}, {high}]: {field!r}")
+            values.update(range(start, end + 1, step))
+        return frozenset(values)
+
+    def _day_matches(self, dt):
+        weekday = (dt.weekday() + 1) % 7  # cron中0表示周日
+        day_ok = dt.day in self.days
+        weekday_ok = weekday in self.weekdays
+        if self.day_any or self.weekday_any:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def matches(self, dt):
+        return (dt.minute in self.minutes and dt.hour in self.hours
+                and dt.month in self.months and self._day_matches(dt))
+
+    def next_after(self, dt):
+        """返回严格晚于dt的下一个触发时刻（精确到分钟）"""
+        candidate = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # 最多向后搜索约5年，防止不可满足的规则（如2月31日）导致死循环
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate <= limit:
+            if candidate.month not in self.months:
+                year = candidate.year + (candidate.month == 12)
+                month = candidate.month % 12 + 1
+                candidate = candidate.replace(year=year, month=month, day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+                continue
+            if candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+                continue
+            return candidate
+        raise ValueError(f"cron表达式没有可触发的时间: {self.expr!r}")
+
+    def __repr__(self):
+        return f"CronSpec({self.expr!r})"
+
+
+class Slot:
+    """录制时段定义：触发规则 + 时长 + 参与的通道
+
+    同一时刻只录制一个时段：flowgraph 只有一组输出文件，所有通道同时打开和关闭，
+    前一个时段还在录制时触发的时段会被跳过。channels 只决定录完后交给后处理的通道，
+    不能让不同通道的时段重叠录制；需要重叠时把它们合并成一个时段。
+    """
+
+    def __init__(self, name, cron, duration, channels=None):
+        self.name = name
+        self.cron = cron if isinstance(cron, CronSpec) else CronSpec(cron)
+        self.duration = duration
+        self.channels = list(channels) if channels else None  # None表示全部通道
+
+    def __repr__(self):
+        return f"Slot({self.name!r}, {self.cron.expr!r}, duration={self.duration})"
+
+
+class _Timer:
+    """定时器堆中的条目"""
+
+    __slots__ = ("deadline", "seq", "wall_time", "callback", "args", "slot", "cancelled")
+
+    def __init__(self, deadline, seq, wall_time, callback, args, slot=None):
+        self.deadline = deadline
+        self.seq = seq
+        self.wall_time = wall_time
+        self.callback = callback
+        self.args = args
+        self.slot = slot
+        self.cancelled = False
+
+    def __lt__(self, other):
+        return (self.deadline, self.seq) < (other.deadline, other.seq)
+
+
+class SlotScheduler:
+    """基于单调时钟定时器堆的事件驱动调度器
+
+    所有时段和一次性定时器共用一个堆，调用 run() 的线程每次只睡眠到最近的截止时间，
+    不会为每个时段额外创建线程或轮询循环。回调在调度线程中执行，应尽快返回。
+    """
+
+    # 最长单次睡眠时间。时段按本地墙上时间触发，而等待用的是单调时钟：NTP校时、手动改时间、
+    # 夏令时切换都不会反映到单调时钟上，Linux的单调时钟在系统休眠期间也不走。只睡到按入堆时换算的
+    # 截止时间，时间跳变后就会提前或推迟整段跳变量才触发。距离截止时间超过该值时每隔60秒醒来一次，
+    # 按当前墙上时间重新换算（_resync，一次堆重建），误差不超过60秒、即在 MISFIRE_GRACE 之内；
+    # 最后一次睡眠仍然精确睡到截止时间，触发本身不受影响
+    MAX_SLEEP = 60.0
+    # 错过触发时间超过该值则跳过本次，直接安排下一次
+    MISFIRE_GRACE = 60.0
+
+    def __init__(self):
+        self.logger = get_logger(__name__)
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._running = True  # 调度器为一次性对象，stop() 之后不再复用
+
+    def add_slot(self, slot, callback):
+        """注册周期时段，callback(slot, fire_time) 在每次触发时调用"""
+        with self._cond:
+            fire_time = slot.cron.next_after(datetime.now())
+            timer = self._push_wall(fire_time, callback, (), slot)
+            self._cond.notify()
+        self.logger.info(f"时段 {slot.name} 下次触发: {fire_time.strftime('%Y-%m-%d %H:%M:%S')}")
+        return timer
+
+    def call_later(self, delay, callback, *args):
+        """在delay秒后调用一次callback(*args)"""
+        with self._cond:
+            timer = _Timer(time.monotonic() + delay, next(self._seq), None, callback, args)
+            heapq.heappush(self._heap, timer)
+            self._cond.notify()
+        return timer
+
+    def cancel(self, timer):
+        """取消定时器（惰性删除，出堆时跳过）"""
+        with self._cond:
+            timer.cancelled = True
+            self._cond.notify()
+
+    def next_fire_time(self):
+        """返回最近一个时段的墙上时间，没有时返回None"""
+        with self._cond:
+            times = [t.wall_time for t in self._heap if t.slot is not None and not t.cancelled]
+        return min(times) if times else None
+
+    def run(self):
+        """在当前线程中运行调度循环，直到 stop() 被调用"""
+        while True:
+            with self._cond:
+                due = self._wait_for_due()
+                if due is None:
+                    break
+
+            try:
+                if due.slot is not None:
+                    due.callback(due.slot, due.wall_time)
+                else:
+                    due.callback(*due.args)
+            except Exception as e:
+                self.logger.error(f"调度回调出错: {e}", exc_info=True)
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._heap.clear()
+            self._cond.notify_all()
+
+    def _push_wall(self, wall_time, callback, args, slot):
+        """按墙上时间入堆，截止时间换算到单调时钟"""
+        delay = (wall_time - datetime.now()).total_seconds()
+        timer = _Timer(time.monotonic() + delay, next(self._seq), wall_time, callback, args, slot)
+        heapq.heappush(self._heap, timer)
+        return timer
+
+    def _resync(self):
+        """墙上时钟可能被调整过，按当前时间重新换算所有时段的截止时间"""
+        now_wall = datetime.now()
+        now_mono = time.monotonic()
+        for timer in self._heap:
+            if timer.wall_time is not None:
+                timer.deadline = now_mono + (timer.wall_time - now_wall).total_seconds()
+        heapq.heapify(self._heap)
+
+    def _wait_for_due(self):
+        """持锁等待下一个到期的定时器；周期时段在此处安排下一次触发"""
+        while self._running:
+            while self._heap and self._heap[0].cancelled:
+                heapq.heappop(self._heap)
+
+            if not self._heap:
+                self._cond.wait()
+                continue
+
+            timeout = self._heap[0].deadline - time.monotonic()
+            if timeout > 0:
+                self._cond.wait(min(timeout, self.MAX_SLEEP))
+                self._resync()
+                continue
+
+            timer = heapq.heappop(self._heap)
+            if timer.slot is None:
+                return timer
+
+            # 周期时段：先安排下一次，再判断本次是否已错过太久
+            next_time = timer.slot.cron.next_after(max(timer.wall_time, datetime.now()))
+            self._push_wall(next_time, timer.callback, timer.args, timer.slot)
+
+            lateness = (datetime.now() - timer.wall_time).total_seconds()
+            if lateness > self.MISFIRE_GRACE:
+                self.logger.warning(
+                    f"时段 {timer.slot.name} 错过触发时间 {timer.wall_time.strftime('%H:%M:%S')} "
+                    f"({int(lateness)}秒)，跳过本次"
+                )
+                continue
+            return timer
+        return None
@@ -0,0 +1,69 @@
+# app/storage.py
+import errno
+import os
+import shutil
+
+from app.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def _fsync_dir(path):
+    """刷新目录项，保证rename在断电后仍然有效（Windows不支持打开目录，直接跳过）"""
+    if os.name == "nt":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _same_device(src_path, dest_dir):
+    return os.stat(src_path).st_dev == os.stat(dest_dir).st_dev
+
+
+def _copy_then_replace(src_path, dest_path):
+    """跨设备时：先复制到目标目录的临时文件并fsync，再原子替换为最终文件名"""
+    tmp_path = dest_path + ".part"
+    try:
+        with open(src_path, "rb") as src, open(tmp_path, "wb") as dst:
+            shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+            dst.flush()
+            os.fsync(dst.fileno())
+        shutil.copystat(src_path, tmp_path)
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.remove(src_path)
+
+
+def atomic_move(src_path, dest_path):
+    """把文件原子地移动到dest_path并返回最终路径
+
+    同一文件系统内直接 os.replace（只改目录项，不复制数据）；
+    跨设备时退化为 复制+fsync+rename。两种方式下读者都不会看到写了一半的文件。
+    """
+    dest_dir = os.path.dirname(os.path.abspath(dest_path))
+    os.makedirs(dest_dir, exist_ok=True)
+
+    moved = False
+    if _same_device(src_path, dest_dir):
+        try:
+            os.replace(src_path, dest_path)
+            moved = True
+        except OSError as e:
+            # 绑定挂载等情况下st_dev可能相同但仍无法rename
+            if e.errno != errno.EXDEV:
+                raise
+            logger.debug(f"rename跨设备失败，改为复制: {src_path}")
+
+    if not moved:
+        _copy_then_replace(src_path, dest_path)
+
+    _fsync_dir(dest_dir)
+    return dest_path
@@ -0,0 +1,174 @@
+# app/transcription_client.py
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.logging_config import get_logger
+
+
+class TranscriptionError(Exception):
+    """转录失败（重试耗尽或服务端返回业务错误）"""
+
+
+class TranscriptionClient:
+    """共享的转录HTTP客户端
+
+    所有通道、所有时段共用一个连接池，避免每次上传都重新建立TCP连接；
+    对连接错误（含连接超时）和5xx/429响应做有限次数的指数退避重试（带随机抖动）。
+    读超时不在这里重试：服务端可能仍在转录，整段重新上传只会加重它的负担，
+    失败交给任务表按更长的间隔重试，两层的重试次数不会相乘。
+    """
+
+    RETRY_STATUS = {429, 500, 502, 503, 504}
+    CONTENT_TYPES = {".wav": "audio/wav", ".flac": "audio/flac", ".ogg": "audio/ogg"}
+    STREAM_CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, endpoint, timeout=60, max_retries=3, backoff_base=1.0,
+                 backoff_max=30.0, pool_size=4, upload_mode="multipart"):
+        self.endpoint = endpoint
+        self.stream_endpoint = endpoint.rstrip('/') + "/stream"
+        self.batch_endpoint = endpoint.rstrip('/') + "/batch"
+        self.upload_mode = upload_mode  # "multipart" 或 "stream"（分块传输，服务端边收边解码）
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.logger = get_logger(__name__)
+
+        self.session = requests.Session()
+        # 重试由本类自己控制，adapter层不再重试
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "attempts": 0, "failures": 0, "total_time": 0.0}
+
+    def transcribe(self, audio_path):
+        """上传音频并返回转录文本"""
+        filename = os.path.basename(audio_path)
+        content_type = self.content_type(audio_path)
+
+        def send():
+            with open(audio_path, 'rb') as audio_file:
+                # 流式接口边收边解析WAV头，压缩格式整体上传
+                if self.upload_mode == "stream" and content_type == "audio/wav":
+                    # 生成器作为请求体时requests使用chunked传输，文件不会整体读入内存
+                    return self.session.post(
+                        self.stream_endpoint,
+                        data=self._iter_file(audio_file),
+                        headers={'Content-Type': 'audio/wav'},
+                        timeout=self.timeout
+                    )
+                return self.session.post(
+                    self.endpoint,
+                    files={'file': (filename, audio_file, content_type)},
+                    timeout=self.timeout
+                )
+
+        response = self._request_with_retry(send, filename)
+        result = response.json()
+        if result.get('code') != 0:
+            raise TranscriptionError(f"API业务错误: {result.get('msg')}")
+        return result.get('data', '')
+
+    def transcribe_batch(self, audio_paths):
+        """一次请求上传多个文件（同一时段的各通道）
+
+        返回与 audio_paths 一一对应的列表，元素为转录文本或 TranscriptionError。
+        """
+        label = f"批量({len(audio_paths)}个文件)"
+
+        def send():
+            handles = [open(path, 'rb') for path in audio_paths]
+            try:
+                return self.session.post(
+                    self.batch_endpoint,
+                    files=[('files', (os.path.basename(path), handle, self.content_type(path)))
+                           for path, handle in zip(audio_paths, handles)],
+                    timeout=self.timeout * len(audio_paths)
+                )
+            finally:
+                for handle in handles:
+                    handle.close()
+
+        response = self._request_with_retry(send, label)
+        result = response.json()
+        if result.get('code') != 0:
+            raise TranscriptionError(f"API业务错误: {result.get('msg')}")
+
+        items = result.get('data') or []
+        if len(items) != len(audio_paths):
+            raise TranscriptionError(f"批量结果数量不符: {len(items)} != {len(audio_paths)}")
+        return [
+            item.get('text', '') if item.get('code') == 0 else TranscriptionError(f"API业务错误: {item.get('msg')}")
+            for item in items
+        ]
+
+    def content_type(self, audio_path):
+        return self.CONTENT_TYPES.get(os.path.splitext(audio_path)[1].lower(), "application/octet-stream")
+
+    def _iter_file(self, audio_file):
+        while True:
+            chunk = audio_file.read(self.STREAM_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+    def _backoff_delay(self, attempt):
+        """全抖动指数退避：在 [0, min(上限, 基数*2^attempt)] 内均匀取值"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _request_with_retry(self, send, label):
+        """执行请求，失败时按退避策略重试，记录每次尝试的耗时"""
+        with self._stats_lock:
+            self.stats["requests"] += 1
+
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            start_time = time.monotonic()
+            try:
+                response = send()
+                elapsed = time.monotonic() - start_time
+                self._record(elapsed)
+                self.logger.debug(
+                    f"转录请求 {label} 第{attempt + 1}次尝试: HTTP {response.status_code}, 耗时 {elapsed:.2f}秒"
+                )
+                if response.status_code == 200:
+                    return response
+                last_error = TranscriptionError(f"API请求失败: {response.status_code}")
+                if response.status_code not in self.RETRY_STATUS:
+                    break
+            except requests.ConnectionError as e:
+                # ConnectTimeout 也是 ConnectionError：请求还没有发出，可以立即重试
+                elapsed = time.monotonic() - start_time
+                self._record(elapsed)
+                self.logger.warning(f"转录请求 {label} 第{attempt + 1}次尝试失败 ({elapsed:.2f}秒): {e}")
+                last_error = TranscriptionError(str(e))
+            except requests.Timeout as e:
+                elapsed = time.monotonic() - start_time
+                self._record(elapsed)
+                self.logger.warning(f"转录请求 {label} 读超时 ({elapsed:.2f}秒)，不再重新上传: {e}")
+                last_error = TranscriptionError(str(e))
+                break
+
+            if attempt < self.max_retries:
+                delay = self._backoff_delay(attempt)
+                self.logger.info(f"{delay:.1f}秒后重试转录: {label}")
+                time.sleep(delay)
+
+        with self._stats_lock:
+            self.stats["failures"] += 1
+        raise last_error
+
+    def _record(self, elapsed):
+        with self._stats_lock:
+            self.stats["attempts"] += 1
+            self.stats["total_time"] += elapsed
+
+    def close(self):
+        self.session.close()
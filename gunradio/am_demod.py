@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# gunradio/am_demod.py
+"""不依赖GNU Radio的AM批量解调：对存档的IQ文件重新解调
+
+与 frontend.build_xlating_channel 相同的信道链（频率搬移 → 多级抽取 → 音频带通 → 包络检波 → 增益），
+按大块向量化处理内存映射的IQ，各文件、各电台由进程池并行：
+
+    python am_demod.py ../media/iq/*.cf32 --output-dir ../media/temp/redemod --workers 8
+    python am_demod.py ../media/iq/synth.cf32 --bench --json
+    python am_demod.py ../media/iq/synth.cf32 --compare-gnuradio --seconds 2
+"""
+import copy
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import soundfile as sf
+from scipy import signal
+
+try:
+    from gunradio.channel_plan import load_plan
+    from gunradio.decimation import plan_decimation
+    from gunradio.iq_capture import read_iq
+    from gunradio.synth import oscillator
+except ImportError:
+    # 在 gunradio 目录下作为脚本运行（与 sdr.py 相同的同级导入）
+    from channel_plan import load_plan
+    from decimation import plan_decimation
+    from iq_capture import read_iq
+    from synth import oscillator
+
+BAND_PASS_TRANSITION = 5e3  # 与 frontend.build_audio_tail 的音频带通相同
+HAMMING_ATTENUATION = 53  # firdes 按窗函数的最大衰减估算抽头数，Hamming 为 53 dB
+
+
+def lowpass_taps(stage):
+    """与 firdes.low_pass_2(插值倍数, ..., WIN_BLACKMAN_hARRIS) 相同的抽头数、窗函数和直流增益"""
+    ntaps = int(stage.attenuation * stage.filter_rate / (22.0 * stage.transition)) | 1
+    taps = signal.firwin(ntaps, stage.cutoff, window='blackmanharris', fs=stage.filter_rate)
+    return (taps * stage.interpolation).astype(np.float32)
+
+
+def band_pass_taps(plan):
+    """与 firdes.band_pass(1, audio_rate, 低, 高, 5e3, WIN_HAMMING) 相同的音频带通"""
+    ntaps = int(HAMMING_ATTENUATION * plan.audio_rate / (22.0 * BAND_PASS_TRANSITION)) | 1
+    return signal.firwin(ntaps, plan.audio_band, pass_zero=False, window='hamming',
+                         fs=plan.audio_rate).astype(np.float32)
+
+
+class ChannelDemodulator:
+    """一路电台的解调链，无状态：每次处理一段从 start 开始的IQ
+
+    每一级都用 upfirdn（多相实现，只计算保留下来的输出）。分块处理时每块前面带上 context 个样本的历史，
+    丢掉对应的输出，结果与整段一次处理完全相同。
+    """
+
+    def __init__(self, plan, channel):
+        self.channel = channel
+        self.sample_rate = plan.sample_rate
+        self.audio_rate = plan.audio_rate
+        self.offset = plan.offset(channel)
+        self.gain = np.float32(channel.gain)
+        self.stages = plan_decimation(plan.sample_rate, plan.audio_rate, channel.bandwidth / 2, channel.transition)
+        self.stage_taps = [lowpass_taps(stage) for stage in self.stages]
+        self.band_pass = band_pass_taps(plan)
+        self.interpolation = math.prod(stage.interpolation for stage in self.stages)
+        self.decimation = math.prod(stage.decimation for stage in self.stages)
+
+        # 各级滤波器的记忆长度换算成IQ样本数，取整到总抽取倍数，分块边界上各级的相位都对齐
+        memory = 0.0
+        for stage, taps in zip(self.stages, self.stage_taps):
+            memory += len(taps) / stage.interpolation * self.sample_rate / stage.input_rate
+        memory += len(self.band_pass) * self.sample_rate / self.audio_rate
+        self.context = int(math.ceil(memory / self.decimation)) * self.decimation
+
+    def output_length(self, n):
+        return n * self.interpolation // self.decimation
+
+    def process(self, iq, start):
+        """iq 从第 start 个样本开始，长度和 start 都须是 decimation 的整数倍；返回float32音频"""
+        x = oscillator(-self.offset, self.sample_rate, start, len(iq))
+        x *= iq
+        for stage, taps in zip(self.stages, self.stage_taps):
+            n = len(x) * stage.interpolation // stage.decimation
+            x = signal.upfirdn(taps, x, stage.interpolation, stage.decimation)[:n]
+        x = signal.upfirdn(self.band_pass, x)[:len(x)]
+        audio = np.abs(x).astype(np.float32)
+        audio *= self.gain
+        return audio
+
+    def blocks(self, iq, block_samples):
+        """分块解调整段IQ（可为np.memmap），逐块产出音频"""
+        block = max(block_samples // self.decimation, 1) * self.decimation
+        for a in range(0, len(iq), block):
+            b = min(a + block, len(iq))
+            c = max(a - self.context, 0)
+            x = np.asarray(iq[c:b], dtype=np.complex64)
+            pad = -len(x) % self.decimation
+            if pad:
+                # 文件末尾不足一个抽取周期：补零后丢掉多出的输出
+                x = np.concatenate([x, np.zeros(pad, dtype=np.complex64)])
+            audio = self.process(x, c)
+            skip = self.output_length(a - c)
+            yield audio[skip:skip + self.output_length(b - a)]
+
+
+def output_path(output_dir, plan, meta, channel_name):
+    """与录制程序相同的命名：YYYYmmdd_HHMMSS_通道.扩展名（按IQ文件的录制开始时间）"""
+    started_at = datetime.fromtimestamp(meta.get('started_at') or time.time())
+    return os.path.join(output_dir, started_at.strftime('%Y%m%d_%H%M%S_') + channel_name + plan.extension(channel_name))
+
+
+def demodulate_file(path, plan, channel_name, output_dir, block_seconds=2.0):
+    """解调一个IQ文件中的一路电台并写出音频文件，返回 (输出路径, IQ秒数)"""
+    iq, meta = read_iq(path)
+    if meta['sample_rate'] != plan.sample_rate:
+        raise ValueError(f"{path} 的采样率 {meta['sample_rate']} 与信道规划不符")
+    plan = copy.deepcopy(plan)
+    plan.center_freq = float(meta['center_freq'])
+    channel = next(channel for channel in plan.channels if channel.name == channel_name)
+    demod = ChannelDemodulator(plan, channel)
+
+    os.makedirs(output_dir, exist_ok=True)
+    target = output_path(output_dir, plan, meta, channel_name)
+    _, format, subtype = plan.audio_format(channel_name)
+    with sf.SoundFile(target, 'w', samplerate=plan.audio_rate, channels=1, format=format, subtype=subtype) as f:
+        for audio in demod.blocks(iq, int(plan.sample_rate * block_seconds)):
+            # 与 recording_sink 相同，写整数格式前先限幅
+            f.write(np.clip(audio, -1.0, 1.0))
+    return target, len(iq) / plan.sample_rate
+
+
+def _demodulate_task(args):
+    return demodulate_file(*args)
+
+
+def demodulate_files(paths, plan, channels=None, output_dir='.', workers=None, block_seconds=2.0):
+    """每个 (文件, 电台) 一个任务，由进程池并行执行；返回 [(输出路径, IQ秒数)]"""
+    channels = channels or plan.names()
+    tasks = [(path, plan, name, output_dir, block_seconds) for path in paths for name in channels]
+    if workers == 1:
+        return [_demodulate_task(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_demodulate_task, tasks))
+
+
+def gnuradio_reference(path, plan, channel_name, seconds):
+    """用 frontend 的GNU Radio信道链处理同一段IQ，返回float32音频（等价性检查用）"""
+    from gnuradio import blocks, gr
+    try:
+        from gunradio.frontend import build_xlating_channel
+    except ImportError:
+        from frontend import build_xlating_channel
+
+    iq, meta = read_iq(path)
+    plan = copy.deepcopy(plan)
+    plan.center_freq = float(meta['center_freq'])
+    channel = next(channel for channel in plan.channels if channel.name == channel_name)
+    samples = np.asarray(iq[:int(plan.sample_rate * seconds)], dtype=np.complex64)
+
+    tb = gr.top_block()
+    source = blocks.vector_source_c(samples.tolist(), False)
+    chain = build_xlating_channel(tb, source, plan, channel)
+    sink = blocks.vector_sink_f()
+    tb.connect((chain['gain'], 0), (sink, 0))
+    tb.run()
+    return np.array(sink.data(), dtype=np.float32), samples, plan, channel
+
+
+def compare_with_gnuradio(path, plan, channel_name, seconds=2.0):
+    """NumPy链与GNU Radio链的输出对比：按互相关对齐后计算误差（相对RMS，dB）"""
+    reference, samples, plan, channel = gnuradio_reference(path, plan, channel_name, seconds)
+    demod = ChannelDemodulator(plan, channel)
+    ours = np.concatenate(list(demod.blocks(samples, len(samples))))
+    n = min(len(ours), len(reference))
+    # 两边的有理数重采样输出相位约定可能差几个样本，在 ±32 个样本内搜索最佳对齐
+    best = None
+    for lag in range(-32, 33):
+        a = ours[max(lag, 0):n + min(lag, 0)]
+        b = reference[max(-lag, 0):n - max(lag, 0)]
+        m = min(len(a), len(b))
+        error = np.sqrt(np.mean((a[:m] - b[:m]) ** 2) / max(np.mean(b[:m] ** 2), 1e-20))
+        if best is None or error < best[1]:
+            best = (lag, error)
+    lag, error = best
+    return {
+        "channel": channel_name,
+        "samples": int(n),
+        "lag": lag,
+        "relative_error_db": round(20 * math.log10(max(error, 1e-12)), 1),
+    }
+
+
+def main(argv=None):
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="iq_capture / synth 写出的 .cf32 文件")
+    parser.add_argument("--channel-plan", default=None)
+    parser.add_argument("--channels", nargs="+", default=None, help="只解调这些电台（默认全部）")
+    parser.add_argument("--output-dir", default="../media/temp/redemod")
+    parser.add_argument("--workers", type=int, default=None, help="进程数，默认CPU核数")
+    parser.add_argument("--block-seconds", type=float, default=2.0, help="每次向量化处理的IQ时长")
+    parser.add_argument("--bench", action="store_true", help="只测吞吐：1个进程和 --workers 个进程各跑一遍")
+    parser.add_argument("--compare-gnuradio", action="store_true", help="与GNU Radio信道链逐样本对比")
+    parser.add_argument("--seconds", type=float, default=2.0, help="--compare-gnuradio 对比的IQ时长")
+    parser.add_argument("--json", action="store_true", help="以JSON输出结果")
+    options = parser.parse_args(argv)
+
+    plan = load_plan(options.channel_plan)
+    channels = options.channels or plan.names()
+
+    if options.compare_gnuradio:
+        results = [compare_with_gnuradio(options.paths[0], plan, name, options.seconds) for name in channels]
+    elif options.bench:
+        results = []
+        for workers in sorted({1, options.workers or os.cpu_count()}):
+            with tempfile.TemporaryDirectory() as output_dir:
+                wall_start = time.perf_counter()
+                done = demodulate_files(options.paths, plan, channels, output_dir, workers, options.block_seconds)
+                wall = time.perf_counter() - wall_start
+            iq_seconds = sum(seconds for _, seconds in done) / len(channels)
+            results.append({
+                "workers": workers,
+                "files": len(options.paths),
+                "channels": len(channels),
+                "iq_seconds": round(iq_seconds, 3),
+                "wall_seconds": round(wall, 3),
+                "samples_per_second": round(iq_seconds * plan.sample_rate / wall),
+                "realtime_factor": round(iq_seconds / wall, 2),
+                "channel_realtime_factor": round(iq_seconds * len(channels) / wall, 2),
+            })
+    else:
+        results = [{"path": path, "iq_seconds": round(seconds, 3)}
+                   for path, seconds in demodulate_files(options.paths, plan, channels, options.output_dir,
+                                                         options.workers, options.block_seconds)]
+
+    if options.json:
+        json.dump(results, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        for result in results:
+            print("  ".join(f"{key}={value}" for key, value in result.items()))
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# gunradio/bench.py
+"""离线DSP基准：与 sdr.py 相同的信道链，不限速地处理合成IQ或录下的IQ文件
+
+信号源换成合成宽带噪声（或 --iq 指定的 iq_capture 分段文件），文件输出换成 null sink，
+统计每组配置的吞吐（样本/秒）、实时倍数、进程CPU时间和各类block的work耗时：
+
+    python bench.py --channels 1 3 10 20 --seconds 10
+    python bench.py --front-end xlating --filter direct fft --channels 3
+    python bench.py --iq ../media/iq/*.cf32 --json --output results.json
+"""
+import os
+
+# 各block的work耗时来自GNU Radio性能计数器，必须在导入gnuradio之前打开
+os.environ.setdefault("GR_CONF_PERFCOUNTERS_ON", "True")
+
+import json
+import sys
+import time
+from argparse import ArgumentParser
+from collections import defaultdict
+
+import numpy as np
+from gnuradio import blocks
+from gnuradio import gr
+
+from channel_plan import Channel, ChannelPlan, load_plan
+from frontend import build_front_end, build_recording_outputs
+from iq_capture import iq_file_source, read_iq
+
+
+def am_stations(plan, count):
+    """在采集带宽内的中波频道栅格上均匀选出 count 个电台"""
+    margin = plan.raster * 2
+    low = max(525e3, plan.center_freq - plan.sample_rate / 2 + margin)
+    high = min(1605e3, plan.center_freq + plan.sample_rate / 2 - margin)
+    raster = np.arange(np.ceil(low / plan.raster), np.floor(high / plan.raster) + 1) * plan.raster
+    if count > len(raster):
+        raise ValueError(f"采集带宽内只有 {len(raster)} 个栅格频点")
+    picks = raster[np.linspace(0, len(raster) - 1, count).round().astype(int)]
+    return [Channel(f"ch{i + 1}", freq, bandwidth=plan.raster) for i, freq in enumerate(picks)]
+
+
+# --filter 对应的 fft_threshold：direct 从不用FFT，fft 所有纯抽取级都用FFT，auto 沿用信道规划
+FILTER_THRESHOLDS = {"direct": None, "fft": 0}
+
+
+def make_plan(base, front_end, count, filter_mode="auto"):
+    return ChannelPlan(
+        base.center_freq, base.sample_rate, am_stations(base, count),
+        rf_gain=base.rf_gain, audio_rate=base.audio_rate,
+        audio_band=base.audio_band, front_end=front_end, raster=base.raster,
+        fft_threshold=FILTER_THRESHOLDS.get(filter_mode, base.fft_threshold),
+        asr_output=base.asr_output,
+    )
+
+
+def make_source(iq_paths=None):
+    """合成噪声源（循环播放一段预生成的IQ），或按顺序回放IQ文件"""
+    if iq_paths:
+        return iq_file_source(iq_paths)
+    noise = (np.random.default_rng(0).normal(size=(1 << 16, 2)) * 0.1).astype(np.float32)
+    return blocks.vector_source_c(noise.view(np.complex64)[:, 0].tolist(), True)
+
+
+def block_kind(name):
+    # decimator1/decimator2 等按类型合并，asr_decimator1 → asr_decimator
+    return name.rstrip("0123456789")
+
+
+def run_front_end(plan, samples, iq_paths=None):
+    """处理 samples 个IQ样本，返回墙钟秒、CPU秒和各类block的work秒数"""
+    tb = gr.top_block()
+    source = make_source(iq_paths)
+    head = blocks.head(gr.sizeof_gr_complex*1, samples)
+    tb.connect((source, 0), (head, 0))
+    chains = build_front_end(tb, head, plan)
+    for output, _ in build_recording_outputs(tb, plan, chains).values():
+        tb.connect((output, 0), (blocks.null_sink(gr.sizeof_float*1), 0))
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    tb.run()
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    named = [("source", source), ("head", head)]
+    named += list(getattr(tb, "front_end_blocks", {}).items())
+    named += [(name, block) for chain in chains.values() for name, block in chain.items()]
+    ticks = gr.high_res_timer_tps()
+    block_seconds = defaultdict(float)
+    counted = set()
+    for name, block in named:
+        # 同一个block可能以多个名字出现在信道链中（如 tap['asr'] 指向最后一级 asr_decimator），只计一次
+        if id(block) in counted:
+            continue
+        counted.add(id(block))
+        block_seconds[block_kind(name)] += block.pc_work_time_total() / ticks
+    return {
+        "wall_seconds": wall,
+        "cpu_seconds": cpu,
+        "block_seconds": {name: round(value, 4) for name, value in sorted(block_seconds.items())},
+    }
+
+
+def iq_info(paths):
+    """IQ文件的 (总样本数, 采样率, 中心频率)"""
+    total, rate, center = 0, None, None
+    for path in paths:
+        samples, meta = read_iq(path)
+        total += len(samples)
+        rate, center = meta["sample_rate"], meta["center_freq"]
+    return total, rate, center
+
+
+def main(argv=None):
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--channels", type=int, nargs="+", default=[1, 3, 10, 20])
+    parser.add_argument("--front-end", nargs="+", default=["xlating", "channelizer"],
+                        choices=["xlating", "channelizer"])
+    parser.add_argument("--filter", nargs="+", default=["auto"], choices=["auto", "direct", "fft"],
+                        help="逐电台前端抽取滤波器的实现方式")
+    parser.add_argument("--seconds", type=float, default=10, help="每次运行处理的IQ时长（IQ文件不足时以文件为准）")
+    parser.add_argument("--iq", nargs="+", default=None, help="用 iq_capture 录下的IQ分段代替合成噪声")
+    parser.add_argument("--channel-plan", default=None, help="取采集中心频率、采样率和栅格的信道规划")
+    parser.add_argument("--json", action="store_true", help="以JSON输出结果")
+    parser.add_argument("--output", default=None, help="结果另存为JSON文件，便于比较不同机器/版本")
+    options = parser.parse_args(argv)
+
+    base = load_plan(options.channel_plan)
+    samples = int(base.sample_rate * options.seconds)
+    source_name = "synthetic"
+    if options.iq:
+        available, rate, center = iq_info(options.iq)
+        if rate != base.sample_rate:
+            raise ValueError(f"IQ文件采样率 {rate} 与信道规划 {base.sample_rate} 不符")
+        base.center_freq = float(center)
+        samples = min(samples, available)
+        source_name = "iq"
+    seconds = samples / base.sample_rate
+
+    results = []
+    for front_end in options.front_end:
+        # 信道化前端不经过抽取级，滤波器实现方式对它没有影响
+        filter_modes = options.filter if front_end == "xlating" else ["auto"]
+        for filter_mode in filter_modes:
+            for count in options.channels:
+                plan = make_plan(base, front_end, count, filter_mode)
+                run = run_front_end(plan, samples, options.iq)
+                wall, cpu = run["wall_seconds"], run["cpu_seconds"]
+                results.append({
+                    "source": source_name,
+                    "front_end": front_end,
+                    "filter": filter_mode,
+                    "channels": count,
+                    "iq_seconds": round(seconds, 3),
+                    "wall_seconds": round(wall, 3),
+                    "cpu_seconds": round(cpu, 3),
+                    "samples_per_second": round(samples / wall),
+                    # 每路电台每秒IQ消耗的CPU秒数；<1/核数 才能实时运行
+                    "cpu_per_channel": round(cpu / seconds / count, 4),
+                    "realtime_factor": round(seconds / wall, 2),
+                    "block_seconds": run["block_seconds"],
+                })
+                if not options.json:
+                    r = results[-1]
+                    print(f"{front_end:12s} {filter_mode:6s} {count:3d} 路  墙钟 {r['wall_seconds']:7.2f}s  "
+                          f"CPU {r['cpu_seconds']:7.2f}s  {r['samples_per_second'] / 1e6:6.2f} MS/s  "
+                          f"每路CPU {r['cpu_per_channel']:.4f}  实时倍数 {r['realtime_factor']:.1f}x")
+                    busiest = sorted(r["block_seconds"].items(), key=lambda item: -item[1])[:4]
+                    print("    " + "  ".join(f"{name} {value:.2f}s" for name, value in busiest))
+    if options.json:
+        json.dump(results, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+# gunradio/channel_plan.py
+import json
+import os
+from fractions import Fraction
+
+DEFAULT_PLAN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "channel_plan.json")
+ASR_RATE = 16000  # 转录模型的输入采样率
+ASR_SUFFIX = "_asr"  # 转录专用输出的文件名后缀：<前缀>ch1_asr.wav
+# 每个电台的输出格式 → (扩展名, libsndfile格式, 子类型)；FLAC无损，Opus只适合收听用的副本
+AUDIO_FORMATS = {
+    "wav": (".wav", "WAV", "PCM_16"),
+    "flac": (".flac", "FLAC", "PCM_16"),
+    "opus": (".ogg", "OGG", "OPUS"),
+}
+OPUS_RATES = (8000, 12000, 16000, 24000, 48000)  # Opus只支持这些采样率
+
+
+class Channel:
+    """信道规划中的一个电台"""
+
+    def __init__(self, name, freq, bandwidth=10000, transition=None, gain=1.0, enabled=True, format="wav"):
+        self.name = name  # 输出文件名中的通道名，如 ch1 → <前缀>ch1.wav
+        self.freq = float(freq)  # 电台载波频率（Hz，绝对频率）
+        self.bandwidth = float(bandwidth)  # 信道滤波器双边带宽（Hz）
+        self.transition = float(transition if transition is not None else bandwidth * 0.3)
+        self.gain = float(gain)  # 检波后的音频增益
+        self.enabled = enabled
+        self.format = format  # 输出文件格式，见 AUDIO_FORMATS
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "freq": self.freq,
+            "bandwidth": self.bandwidth,
+            "transition": self.transition,
+            "gain": self.gain,
+            "format": self.format,
+        }
+
+    def __repr__(self):
+        return f"Channel({self.name!r}, {self.freq / 1e3:g} kHz)"
+
+
+class ChannelizerLayout:
+    """多相滤波器组信道化的参数：把采集带宽均分为 numchans 个信道，每个电台取最近的一个"""
+
+    def __init__(self, numchans, spacing, oversample, bins, residuals):
+        self.numchans = numchans
+        self.spacing = spacing  # 相邻信道中心的间隔（Hz）
+        self.oversample = oversample
+        self.output_rate = spacing * oversample  # 每个信道输出的采样率
+        self.bins = bins  # {通道名: 信道编号}，负频率在上半部分（编号 mod numchans）
+        self.residuals = residuals  # {通道名: 电台频率 - 信道中心（Hz）}，由每通道的旋转器补偿
+
+
+class ChannelPlan:
+    """一次宽带采集中同时录制的全部电台
+
+    flowgraph按它逐个生成信道链，录制程序按它确定要处理的输出文件，两边共用同一个文件。
+    """
+
+    # 信道化时电台偏离信道中心的上限（相对栅格间隔），超过后电台边带会落到原型滤波器过渡带
+    MAX_RESIDUAL = 1 / 6
+
+    def __init__(self, center_freq, sample_rate, channels, rf_gain=25,
+                 audio_rate=48000, audio_band=(300, 2000), front_end="xlating", raster=9000,
+                 fft_threshold=None, asr_output=None):
+        self.center_freq = float(center_freq)
+        self.sample_rate = float(sample_rate)
+        self.rf_gain = rf_gain
+        self.audio_rate = int(audio_rate)  # 输出WAV的采样率
+        self.audio_band = tuple(audio_band)
+        # "xlating": 每个电台一个全速率的频率搬移滤波器；"channelizer": 一个多相滤波器组供所有电台共用
+        self.front_end = front_end
+        self.raster = float(raster)  # 中波频道栅格（9 kHz 或 10 kHz）
+        # 可选：抽头数超过此值的纯抽取级（包括2 Msps的第一级）改用FFT快速卷积；None（默认）始终用直接形式FIR。
+        # 默认规划的纯抽取级只有13~19个抽头，直接形式更快，FFT要到三四十个抽头以上才划算
+        self.fft_threshold = fft_threshold
+        # 转录用的16 kHz输出：None 不输出；"alongside" 与收听用的WAV同时写 <通道名>_asr.wav；
+        # "only" 只写16 kHz的WAV。重采样在DSP链中完成，转录服务端不必再重采样
+        self.asr_output = asr_output
+        self.channels = [channel for channel in channels if channel.enabled]
+        self.validate()
+
+    def names(self):
+        return [channel.name for channel in self.channels]
+
+    def audio_format(self, name):
+        """输出通道名（可带 _asr 后缀）对应的 (扩展名, libsndfile格式, 子类型)"""
+        base = name[:-len(ASR_SUFFIX)] if name.endswith(ASR_SUFFIX) else name
+        for channel in self.channels:
+            if channel.name == base:
+                return AUDIO_FORMATS[channel.format]
+        raise KeyError(f"信道规划中没有 {name}")
+
+    def extension(self, name):
+        return self.audio_format(name)[0]
+
+    def offset(self, channel):
+        """电台相对采集中心频率的偏移（送给频率搬移滤波器）"""
+        return channel.freq - self.center_freq
+
+    def channelizer_layout(self):
+        """按频道栅格划分信道：信道数取 采样率/栅格 的最近偶数（2倍过采样要求能整除）"""
+        numchans = int(round(self.sample_rate / self.raster))
+        numchans += numchans % 2
+        spacing = self.sample_rate / numchans
+        bins, residuals = {}, {}
+        for channel in self.channels:
+            offset = self.offset(channel)
+            index = int(round(offset / spacing))
+            bins[channel.name] = index % numchans
+            residuals[channel.name] = offset - index * spacing
+        return ChannelizerLayout(numchans, spacing, 2, bins, residuals)
+
+    def resample_ratio(self, input_rate):
+        """input_rate → audio_rate 的有理数比 (插值, 抽取)"""
+        ratio = Fraction(self.audio_rate) / Fraction(input_rate).limit_denominator(10 ** 6)
+        return ratio.numerator, ratio.denominator
+
+    def validate(self):
+        if not self.channels:
+            raise ValueError("信道规划中没有启用的电台")
+        names = self.names()
+        duplicates = {name for name in names if names.count(name) > 1}
+        if duplicates:
+            raise ValueError(f"信道名重复: {sorted(duplicates)}")
+        nyquist = self.sample_rate / 2
+        for channel in self.channels:
+            edge = abs(self.offset(channel)) + channel.bandwidth / 2
+            if edge > nyquist:
+                raise ValueError(
+                    f"{channel} 超出采集带宽: 中心 {self.center_freq / 1e3:g} kHz ± {nyquist / 1e3:g} kHz"
+                )
+            if channel.format not in AUDIO_FORMATS:
+                raise ValueError(f"{channel} 的输出格式未知: {channel.format}")
+            if channel.format == "opus" and self.audio_rate not in OPUS_RATES:
+                raise ValueError(f"Opus不支持 {self.audio_rate} Hz，可选 {OPUS_RATES}")
+            if channel.bandwidth / 2 + channel.transition > self.audio_rate / 2:
+                raise ValueError(f"{channel} 的信道滤波器超出音频采样率 {self.audio_rate} Hz 的奈奎斯特频率")
+        if self.asr_output not in (None, "alongside", "only"):
+            raise ValueError(f"未知的转录输出模式: {self.asr_output}")
+        if self.front_end not in ("xlating", "channelizer"):
+            raise ValueError(f"未知的前端类型: {self.front_end}")
+        if self.front_end == "channelizer":
+            layout = self.channelizer_layout()
+            bins = list(layout.bins.values())
+            if len(set(bins)) != len(bins):
+                raise ValueError("多个电台落在同一个信道中，信道化前端无法区分")
+            for channel in self.channels:
+                if abs(layout.residuals[channel.name]) > self.raster * self.MAX_RESIDUAL:
+                    raise ValueError(f"{channel} 不在 {self.raster / 1e3:g} kHz 频道栅格上")
+
+    def to_dict(self):
+        return {
+            "center_freq": self.center_freq,
+            "sample_rate": self.sample_rate,
+            "rf_gain": self.rf_gain,
+            "audio_rate": self.audio_rate,
+            "audio_band": list(self.audio_band),
+            "front_end": self.front_end,
+            "raster": self.raster,
+            "fft_threshold": self.fft_threshold,
+            "asr_output": self.asr_output,
+            "channels": [channel.to_dict() for channel in self.channels],
+        }
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+
+def load_plan(path=None):
+    """读取信道规划文件（JSON）"""
+    with open(path or DEFAULT_PLAN, encoding='utf-8') as f:
+        data = json.load(f)
+    channels = [Channel(**item) for item in data.pop("channels", [])]
+    return ChannelPlan(channels=channels, **data)
@@ -0,0 +1,100 @@
+# gunradio/decimation.py
+import math
+from fractions import Fraction
+
+
+class Stage:
+    """多级抽取中的一级：先插值 interpolation 倍，滤波，再抽取 decimation 倍"""
+
+    def __init__(self, input_rate, interpolation, decimation, passband, stopband, attenuation):
+        self.input_rate = input_rate
+        self.interpolation = interpolation
+        self.decimation = decimation
+        self.output_rate = input_rate * interpolation / decimation
+        self.passband = passband  # 需要无失真保留的频率上限（Hz）
+        self.stopband = stopband  # 从这里开始衰减到 attenuation（Hz）
+        self.attenuation = attenuation
+
+    @property
+    def filter_rate(self):
+        """滤波器工作的采样率（插值之后）"""
+        return self.input_rate * self.interpolation
+
+    @property
+    def cutoff(self):
+        return (self.passband + self.stopband) / 2
+
+    @property
+    def transition(self):
+        return self.stopband - self.passband
+
+    @property
+    def estimated_taps(self):
+        """窗函数法的抽头数估计：N ≈ A / (22 · Δf/fs)"""
+        return int(math.ceil(self.attenuation / (22 * self.transition / self.filter_rate)))
+
+    @property
+    def macs_per_second(self):
+        """多相实现下每秒乘加次数：每个输出样本只计算 N/插值倍数 个抽头"""
+        return self.estimated_taps / self.interpolation * self.output_rate
+
+    def __repr__(self):
+        ratio = f"{self.interpolation}/{self.decimation}" if self.interpolation != 1 else f"/{self.decimation}"
+        return (f"Stage({self.input_rate:g} Hz {ratio} → {self.output_rate:g} Hz, "
+                f"通带 {self.passband:g} Hz, 阻带 {self.stopband:g} Hz, ~{self.estimated_taps} taps)")
+
+
+def _prime_factors(n):
+    factors = []
+    p = 2
+    while p * p <= n:
+        while n % p == 0:
+            factors.append(p)
+            n //= p
+        p += 1
+    if n > 1:
+        factors.append(n)
+    return factors
+
+
+def plan_decimation(input_rate, output_rate, passband, transition, attenuation=60, max_stage=10):
+    """设计从 input_rate 到 output_rate（必须是有理数比且不升采样）的多级抽取
+
+    抽取倍数按质因数分解，大因子在前、相邻因子合并到不超过 max_stage；插值因子放在最后一级。
+    中间级只需保证混叠不落入最终通带（阻带从 输出采样率-通带 开始），过渡带很宽、抽头很少；
+    信道选择性（通带 + transition）只在采样率最低的最后一级实现。
+    返回 Stage 列表，最后一级输出采样率严格等于 output_rate。
+    """
+    ratio = Fraction(output_rate).limit_denominator(10 ** 6) / Fraction(input_rate).limit_denominator(10 ** 6)
+    if ratio > 1:
+        raise ValueError(f"只支持降采样: {input_rate} → {output_rate}")
+    interpolation, decimation = ratio.numerator, ratio.denominator
+    if passband + transition > output_rate / 2:
+        raise ValueError(f"通带+过渡带 {passband + transition} Hz 超过输出奈奎斯特频率 {output_rate / 2} Hz")
+
+    factors = []
+    for factor in sorted(_prime_factors(decimation), reverse=True):
+        if factors and factors[-1] * factor <= max_stage:
+            factors[-1] *= factor
+        else:
+            factors.append(factor)
+    if not factors:
+        factors = [1]
+
+    stages = []
+    rate = Fraction(input_rate).limit_denominator(10 ** 6)
+    for i, factor in enumerate(factors):
+        last = i == len(factors) - 1
+        up = interpolation if last else 1
+        out_rate = rate * up / factor
+        if last:
+            stopband = passband + transition
+        else:
+            stopband = max(float(out_rate) - passband, passband + transition)
+        stages.append(Stage(float(rate), up, factor, passband, stopband, attenuation))
+        rate = out_rate
+    return stages
+
+
+def total_macs(stages):
+    return sum(stage.macs_per_second for stage in stages)
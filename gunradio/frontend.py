@@ -0,0 +1,213 @@
+# gunradio/frontend.py
+import math
+
+from gnuradio import blocks
+from gnuradio import filter
+from gnuradio import gr
+from gnuradio.fft import window
+from gnuradio.filter import firdes
+
+try:
+    from gunradio.channel_plan import ASR_RATE, ASR_SUFFIX
+    from gunradio.decimation import plan_decimation
+    from gunradio.telemetry import channel_probe
+except ImportError:
+    # 在 gunradio 目录下作为脚本运行（sdr.py、bench.py 的同级导入）
+    from channel_plan import ASR_RATE, ASR_SUFFIX
+    from decimation import plan_decimation
+    from telemetry import channel_probe
+
+
+def build_audio_tail(tb, plan, channel, head):
+    """信道复基带 → 音频带通 → 包络检波 → 增益；返回 (带通, 增益) 两端的block
+
+    两种前端共用同一段尾部，输入采样率均已是 plan.audio_rate。
+    """
+    band_pass = filter.interp_fir_filter_ccf(
+        1,
+        firdes.band_pass(
+            1,
+            plan.audio_rate,
+            plan.audio_band[0],
+            plan.audio_band[1],
+            5e3,
+            window.WIN_HAMMING,
+            6.76))
+    mag = blocks.complex_to_mag(1)
+    gain = blocks.multiply_const_ff(channel.gain)
+    tb.connect((head, 0), (band_pass, 0))
+    tb.connect((band_pass, 0), (mag, 0))
+    tb.connect((mag, 0), (gain, 0))
+    return {'band_pass': band_pass, 'mag': mag, 'gain': gain}
+
+
+def design_taps(stage):
+    """按抽取级的通带/阻带设计低通抽头；插值级的增益补偿插零造成的幅度损失"""
+    return firdes.low_pass_2(stage.interpolation, stage.filter_rate, stage.cutoff, stage.transition,
+                             stage.attenuation, window.WIN_BLACKMAN_hARRIS)
+
+
+def use_fft(plan, taps):
+    return plan.fft_threshold is not None and len(taps) > plan.fft_threshold
+
+
+def decimation_block(plan, stage):
+    """抽取级：抽头数超过 plan.fft_threshold 的纯抽取级用FFT快速卷积（overlap-save），其余用多相FIR"""
+    taps = design_taps(stage)
+    if stage.interpolation != 1:
+        return filter.rational_resampler_ccf(stage.interpolation, stage.decimation, taps)
+    if use_fft(plan, taps):
+        return filter.fft_filter_ccf(stage.decimation, taps)
+    return filter.fir_filter_ccf(stage.decimation, taps)
+
+
+def build_xlating_channel(tb, source, plan, channel):
+    """逐电台前端：频率搬移 → 多级抽取到 plan.audio_rate → 音频尾部
+
+    第一级抽取合并在频率搬移滤波器中，只需要很宽的过渡带；信道选择性放在采样率最低的最后一级。
+    规划中设置了 fft_threshold 且第一级抽头超过它时，第一级改为 旋转器 + FFT滤波器。
+    输出采样率严格等于 plan.audio_rate，由硬件时钟驱动，不需要throttle。
+    """
+    stages = plan_decimation(plan.sample_rate, plan.audio_rate, channel.bandwidth / 2, channel.transition)
+    chain = {}
+    first = stages[0]
+    if first.interpolation == 1:
+        stages = stages[1:]
+        taps = design_taps(first)
+        if use_fft(plan, taps):
+            chain['rotator'] = blocks.rotator_cc(-2 * math.pi * plan.offset(channel) / plan.sample_rate)
+            chain['fft_filter'] = filter.fft_filter_ccf(first.decimation, taps)
+            tb.connect((source, 0), (chain['rotator'], 0))
+            tb.connect((chain['rotator'], 0), (chain['fft_filter'], 0))
+            head = chain['fft_filter']
+        else:
+            chain['xlating'] = filter.freq_xlating_fir_filter_ccf(
+                first.decimation, taps, plan.offset(channel), plan.sample_rate)
+            tb.connect((source, 0), (chain['xlating'], 0))
+            head = chain['xlating']
+    else:
+        # 只有一级有理数重采样时，频率搬移滤波器只做旋转
+        chain['xlating'] = filter.freq_xlating_fir_filter_ccf(1, [1.0], plan.offset(channel), plan.sample_rate)
+        tb.connect((source, 0), (chain['xlating'], 0))
+        head = chain['xlating']
+    for i, stage in enumerate(stages):
+        chain[f'decimator{i + 1}'] = decimation_block(plan, stage)
+        tb.connect((head, 0), (chain[f'decimator{i + 1}'], 0))
+        head = chain[f'decimator{i + 1}']
+    chain.update(build_audio_tail(tb, plan, channel, head))
+    return chain
+
+
+def retune(chain, plan, channel):
+    """中心频率改变后更新逐电台前端的搬移量"""
+    if 'rotator' in chain:
+        chain['rotator'].set_phase_inc(-2 * math.pi * plan.offset(channel) / plan.sample_rate)
+    else:
+        chain['xlating'].set_center_freq(plan.offset(channel))
+
+
+def build_channelizer(tb, source, plan):
+    """共用前端：一个多相滤波器组把整个采集带宽分成 numchans 个信道，只输出规划中的电台
+
+    滤波器组的计算量与电台数无关，每增加一个电台只增加一条低速率的尾部
+    （残余频偏旋转 → 有理数重采样到音频采样率 → 音频尾部）。
+    返回 (前端block字典, {通道名: 信道链字典})。
+    """
+    layout = plan.channelizer_layout()
+    # 原型低通：通带覆盖电台带宽加上残余频偏，阻带从一个栅格间隔开始（2倍过采样下不混叠）
+    passband = plan.raster * 2 / 3
+    stopband = plan.raster
+    taps = firdes.low_pass_2(1, plan.sample_rate, (passband + stopband) / 2, stopband - passband, 80,
+                             window.WIN_BLACKMAN_hARRIS)
+
+    front = {}
+    front['split'] = blocks.stream_to_streams(gr.sizeof_gr_complex*1, layout.numchans)
+    front['channelizer'] = filter.pfb_channelizer_ccf(layout.numchans, taps, layout.oversample)
+    names = [channel.name for channel in plan.channels]
+    front['channelizer'].set_channel_map([layout.bins[name] for name in names])
+    tb.connect((source, 0), (front['split'], 0))
+    for i in range(layout.numchans):
+        tb.connect((front['split'], i), (front['channelizer'], i))
+
+    interpolation, decimation = plan.resample_ratio(layout.output_rate)
+    chains = {}
+    for i, channel in enumerate(plan.channels):
+        chain = {}
+        head = (front['channelizer'], i)
+        residual = layout.residuals[channel.name]
+        if residual:
+            chain['rotator'] = blocks.rotator_cc(-2 * math.pi * residual / layout.output_rate)
+            tb.connect(head, (chain['rotator'], 0))
+            head = (chain['rotator'], 0)
+        chain['resampler'] = filter.rational_resampler_ccc(
+                interpolation=interpolation,
+                decimation=decimation,
+                taps=[],
+                fractional_bw=0)
+        tb.connect(head, (chain['resampler'], 0))
+        chain.update(build_audio_tail(tb, plan, channel, chain['resampler']))
+        chains[channel.name] = chain
+    return front, chains
+
+
+def build_front_end(tb, source, plan):
+    """按 plan.front_end 生成全部信道链，返回 {通道名: 信道链字典}，音频输出为 chain['gain']"""
+    if plan.front_end == "channelizer":
+        tb.front_end_blocks, chains = build_channelizer(tb, source, plan)
+        return chains
+    return {
+        channel.name: build_xlating_channel(tb, source, plan, channel)
+        for channel in plan.channels
+    }
+
+
+def build_asr_tap(tb, plan, head):
+    """检波后的音频 → 16 kHz：带通之后音频只到 audio_band[1]，抗混叠滤波器只需几十个抽头"""
+    stages = plan_decimation(plan.audio_rate, ASR_RATE, plan.audio_band[1], ASR_RATE / 2 - plan.audio_band[1])
+    tap = {}
+    for i, stage in enumerate(stages):
+        taps = design_taps(stage)
+        if stage.interpolation == 1:
+            block = filter.fir_filter_fff(stage.decimation, taps)
+        else:
+            block = filter.rational_resampler_fff(stage.interpolation, stage.decimation, taps)
+        tap[f'asr_decimator{i + 1}'] = block
+        tb.connect((head, 0), (block, 0))
+        head = block
+    tap['asr'] = head
+    return tap
+
+
+def build_recording_outputs(tb, plan, chains):
+    """返回要写入文件的输出 {文件中的通道名: (block, 采样率)}
+
+    plan.asr_output 为 "alongside" 时每个电台多一路 <通道名>_asr（16 kHz），
+    为 "only" 时只写16 kHz的输出，文件名不变。
+    """
+    outputs = {}
+    for name, chain in chains.items():
+        if plan.asr_output:
+            chain.update(build_asr_tap(tb, plan, chain['gain']))
+        if plan.asr_output == "only":
+            outputs[name] = (chain['asr'], ASR_RATE)
+            continue
+        outputs[name] = (chain['gain'], plan.audio_rate)
+        if plan.asr_output == "alongside":
+            outputs[name + ASR_SUFFIX] = (chain['asr'], ASR_RATE)
+    return outputs
+
+
+def baseband_output(chain):
+    """音频尾部之前的信道复基带（采样率为 plan.audio_rate）：信道链字典按连接顺序排列，取带通前一个block"""
+    names = list(chain)
+    return chain[names[names.index('band_pass') - 1]]
+
+
+def build_telemetry(tb, plan, chains, directory, clock=None):
+    """每条信道链挂一个遥测探针（复基带 + 写入文件的音频），返回 {通道名: 探针}"""
+    probes = {}
+    for name, chain in chains.items():
+        probes[name] = channel_probe(name, plan.audio_rate, directory, clock=clock)
+        tb.connect((baseband_output(chain), 0), (probes[name], 0))
+        tb.connect((chain['gain'], 0), (probes[name], 1))
+    return probes
@@ -0,0 +1,240 @@
+# gunradio/iq_capture.py
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+try:
+    from gnuradio import gr
+except ImportError:
+    # 只读写IQ文件（am_demod 离线解调）时不需要GNU Radio
+    gr = None
+
+IQ_DTYPE = np.complex64
+IQ_EXTENSION = '.cf32'  # 与GNU Radio的file_source/inspectrum等工具通用的裸complex64格式
+# 正在写的分段带这个后缀，写完才改名为 .cf32，*.cf32 通配符不会选中还没写完的分段；
+# 进程中断留下的 .part 样本数以旁边定期更新的元数据为准，可以显式传给 read_iq / --replay，
+# 下次启动 iq_sink 时截掉空白并改名为正常分段
+PART_SUFFIX = '.part'
+METADATA_INTERVAL = 1.0  # 写分段时每隔多少秒（按样本数）更新一次元数据中的样本数
+# iq_sink 的分段名：开始时间_iq.cf32，同一秒内开始的分段（如改频）加 _1、_2 后缀
+SEGMENT_NAME = re.compile(r'^\d{8}_\d{6}_iq(_\d+)?' + re.escape(IQ_EXTENSION) + '$')
+
+
+def metadata_path(path):
+    if path.endswith(PART_SUFFIX):
+        path = path[:-len(PART_SUFFIX)]
+    return os.path.splitext(path)[0] + '.json'
+
+
+def read_metadata(path):
+    with open(metadata_path(path), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def read_iq(path):
+    """以内存映射方式打开一个IQ分段，返回 (complex64数组, 元数据)"""
+    meta = read_metadata(path)
+    available = os.path.getsize(path) // np.dtype(IQ_DTYPE).itemsize
+    # 分段文件是预分配的，只有元数据中的样本数是有效数据；没有这一项的文件（如其他工具写的）以文件大小为准
+    samples = min(meta.get('samples', available), available)
+    if samples == 0:
+        return np.zeros(0, dtype=IQ_DTYPE), meta
+    return np.memmap(path, dtype=IQ_DTYPE, mode='r', shape=(samples,)), meta
+
+
+if gr is not None:
+
+    class iq_sink(gr.sync_block):
+        """把采集到的原始IQ写入预分配的内存映射分段文件
+
+        每个分段 segment_seconds 秒，创建时一次分配完整大小，work 中只做内存拷贝；
+        旁边的 .json 记录采样率、中心频率、开始时间和信道规划，供离线回放重新解调。
+        2 Msps 下每秒 16 MB，只保留最近 keep_segments 个分段。
+        """
+
+        def __init__(self, output_dir, sample_rate, center_freq, segment_seconds=60, keep_segments=10,
+                     channel_plan=None):
+            gr.sync_block.__init__(self, name='iq_sink', in_sig=[IQ_DTYPE], out_sig=None)
+            self.output_dir = output_dir
+            self.sample_rate = float(sample_rate)
+            self.center_freq = float(center_freq)
+            self.segment_samples = int(round(segment_seconds * self.sample_rate))
+            self.keep_segments = keep_segments
+            self.channel_plan = channel_plan
+
+            self._lock = threading.Lock()
+            self._map = None
+            self._path = None
+            self._started_at = None
+            self._written = 0
+            self._t0 = None
+            self._position = 0
+            self._segments = deque()
+            self._metadata_samples = max(int(METADATA_INTERVAL * self.sample_rate), 1)
+            self._metadata_written = 0
+            self._adopt_segments()
+
+        def work(self, input_items, output_items):
+            samples = input_items[0]
+            n = len(samples)
+            with self._lock:
+                if self._t0 is None:
+                    self._t0 = time.time()
+                offset = 0
+                while offset < n:
+                    if self._map is None:
+                        self._start_segment(self._position + offset)
+                    take = min(n - offset, self.segment_samples - self._written)
+                    self._map[self._written:self._written + take] = samples[offset:offset + take]
+                    self._written += take
+                    offset += take
+                    if self._written == self.segment_samples:
+                        self._finish_segment()
+                    elif self._written - self._metadata_written >= self._metadata_samples:
+                        # 进程被杀死时，.part 中有效的样本数以最近一次更新为准
+                        self._write_metadata()
+                self._position += n
+            return n
+
+        def stop(self):
+            with self._lock:
+                if self._map is not None:
+                    self._finish_segment()
+            return True
+
+        def set_center_freq(self, center_freq):
+            """改频：结束当前分段，下一次 work 以新的中心频率开始新分段
+
+            一个分段的元数据只有一个中心频率，改频前后的IQ不能放在同一个文件里。
+            调用时已在缓冲区中的少量样本（毫秒级）会记在新分段的开头。
+            """
+            with self._lock:
+                if self._map is not None:
+                    self._finish_segment()
+                self.center_freq = float(center_freq)
+
+        def _start_segment(self, position):
+            os.makedirs(self.output_dir, exist_ok=True)
+            self._started_at = self._t0 + position / self.sample_rate
+            stem = os.path.join(self.output_dir, datetime.fromtimestamp(self._started_at).strftime('%Y%m%d_%H%M%S_iq'))
+            self._path = stem + IQ_EXTENSION
+            number = 0
+            while os.path.exists(self._path) or os.path.exists(self._path + PART_SUFFIX):
+                number += 1
+                self._path = f'{stem}_{number}{IQ_EXTENSION}'
+            self._map = np.memmap(self._path + PART_SUFFIX, dtype=IQ_DTYPE, mode='w+', shape=(self.segment_samples,))
+            self._written = 0
+            self._write_metadata()
+
+        def _finish_segment(self):
+            self._map.flush()
+            self._map = None
+            if self._written < self.segment_samples:
+                # 最后一个分段不满：截掉预分配的空白部分
+                os.truncate(self._path + PART_SUFFIX, self._written * np.dtype(IQ_DTYPE).itemsize)
+            self._write_metadata()
+            os.replace(self._path + PART_SUFFIX, self._path)
+            self._segments.append(self._path)
+            self._prune()
+
+        def _adopt_segments(self):
+            """接管之前运行留下的分段，重启后仍然只保留最近 keep_segments 个
+
+            文件名以开始时间开头，按名字排序即按时间排序；上次被中断时正在写的 .part
+            截掉预分配的空白后改名为正常分段，元数据中没有样本的直接删除。
+            """
+            if not os.path.isdir(self.output_dir):
+                return
+            for name in sorted(os.listdir(self.output_dir)):
+                path = os.path.join(self.output_dir, name)
+                if name.endswith(PART_SUFFIX) and SEGMENT_NAME.match(name[:-len(PART_SUFFIX)]):
+                    try:
+                        samples = int(read_metadata(path).get('samples', 0))
+                    except (OSError, ValueError):
+                        samples = 0
+                    final = path[:-len(PART_SUFFIX)]
+                    if samples <= 0:
+                        for leftover in (path, metadata_path(final)):
+                            if os.path.exists(leftover):
+                                os.remove(leftover)
+                        continue
+                    os.truncate(path, min(samples * np.dtype(IQ_DTYPE).itemsize, os.path.getsize(path)))
+                    os.replace(path, final)
+                    self._segments.append(final)
+                elif SEGMENT_NAME.match(name):
+                    self._segments.append(path)
+            self._prune()
+
+        def _prune(self):
+            while self.keep_segments and len(self._segments) > self.keep_segments:
+                old = self._segments.popleft()
+                for path in (old, metadata_path(old)):
+                    if os.path.exists(path):
+                        os.remove(path)
+
+        def _write_metadata(self):
+            meta = {
+                'dtype': 'complex64',
+                'sample_rate': self.sample_rate,
+                'center_freq': self.center_freq,
+                'started_at': self._started_at,
+                'samples': self._written,
+            }
+            if self.channel_plan is not None:
+                meta['channel_plan'] = self.channel_plan.to_dict()
+            # 先写临时文件再替换，读取方不会看到写了一半的JSON
+            path = metadata_path(self._path)
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False, indent=2)
+            os.replace(path + '.tmp', path)
+            self._metadata_written = self._written
+
+
+    class iq_file_source(gr.sync_block):
+        """按顺序回放 iq_sink 写下的分段文件，读完后结束flowgraph
+
+        不限速：下游有多快就读多快，回填历史录音时CPU跑满即可；不需要SDR设备。
+        """
+
+        def __init__(self, paths):
+            gr.sync_block.__init__(self, name='iq_file_source', in_sig=None, out_sig=[IQ_DTYPE])
+            self.paths = sorted(paths)
+            if not self.paths:
+                raise ValueError("没有要回放的IQ文件")
+            metas = [read_metadata(path) for path in self.paths]
+            for key in ('sample_rate', 'center_freq'):
+                values = {meta[key] for meta in metas}
+                if len(values) > 1:
+                    raise ValueError(f"IQ文件的 {key} 不一致: {sorted(values)}")
+            self.sample_rate = metas[0]['sample_rate']
+            self.center_freq = metas[0]['center_freq']
+            self.started_at = metas[0]['started_at']
+            self._index = 0
+            self._samples = None
+            self._offset = 0
+
+        def work(self, input_items, output_items):
+            out = output_items[0]
+            produced = 0
+            while produced < len(out):
+                if self._samples is None:
+                    if self._index >= len(self.paths):
+                        break
+                    self._samples, _ = read_iq(self.paths[self._index])
+                    self._offset = 0
+                take = min(len(out) - produced, len(self._samples) - self._offset)
+                out[produced:produced + take] = self._samples[self._offset:self._offset + take]
+                produced += take
+                self._offset += take
+                if self._offset == len(self._samples):
+                    self._samples = None
+                    self._index += 1
+            if produced == 0:
+                return -1  # WORK_DONE：所有文件已读完
+            return produced
@@ -0,0 +1,190 @@
+# gunradio/recording_sink.py
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import soundfile as sf
+from gnuradio import gr
+
+
+class recording_sink(gr.sync_block):
+    """把float音频写成WAV（或libsndfile支持的FLAC/Ogg Opus）文件的sink
+
+    两种用法：
+    - open(path)/close()：与 blocks.wavfile_sink 相同，由外部控制每个文件的起止；
+    - segment_seconds > 0：连续模式，flowgraph不停，按样本数精确切分为固定时长的分段文件，
+      相邻分段首尾相接、不丢样本。分段写完后调用 on_segment(channel, path, started_at)，
+      回调在单独的上报线程中执行，不占用 work 的锁，也不阻塞flowgraph。
+
+    pre_roll_seconds > 0 时始终在固定大小的环形缓冲中保留最近N秒的音频，
+    open() 时先把它写入新文件，时段开头（台标、提要）不会因为触发时刻而丢失。
+
+    format/subtype 为libsndfile的格式名，extension 用于连续模式生成的分段文件名。
+    """
+
+    def __init__(self, channel, sample_rate=48000, output_dir='', segment_seconds=0,
+                 align=True, on_segment=None, clock=None, pre_roll_seconds=0,
+                 extension='.wav', format='WAV', subtype='PCM_16'):
+        gr.sync_block.__init__(self, name='recording_sink', in_sig=[np.float32], out_sig=None)
+        self.channel = channel
+        self.sample_rate = int(sample_rate)
+        self.output_dir = output_dir
+        self.segment_samples = int(round(segment_seconds * self.sample_rate))
+        self.align = align  # 分段边界对齐到本地时间的整数倍（如每个 :00/:30）
+        self.on_segment = on_segment
+        self.extension = extension
+        self.format = format
+        self.subtype = subtype
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._path = None
+        self._started_at = None
+        self._remaining = None  # 当前分段还需写入的样本数；None表示不限
+        # 第一个样本到达时的墙钟时间；同一信号源的各通道共用一个clock，分段文件名完全一致
+        self._clock = clock if clock is not None else {}
+        self._position = 0  # 已消费的样本总数，用于推算分段开始时间
+
+        # 预录环形缓冲一次分配，运行中只做切片拷贝
+        self._ring = np.zeros(int(round(pre_roll_seconds * self.sample_rate)), dtype=np.float32)
+        self._ring_pos = 0
+        self._ring_fill = 0
+        self.pre_roll_written = 0.0  # 最近一次 open() 写入的预录秒数（刚启动时不足N秒）
+
+        # 写完的分段由上报线程按顺序交给 on_segment
+        self._events = queue.Queue()
+        self._reporter = None
+        if on_segment is not None:
+            self._reporter = threading.Thread(target=self._report, name=f'recording_sink-{channel}', daemon=True)
+            self._reporter.start()
+
+    def open(self, path):
+        with self._lock:
+            self._close_file()
+            self._open_file(path)
+            self._remaining = None
+            self.pre_roll_written = self._flush_pre_roll() / self.sample_rate
+        return True
+
+    def close(self):
+        with self._lock:
+            self._close_file()
+
+    def stop(self):
+        # flowgraph停止时结束当前分段（不完整的分段同样上报）
+        with self._lock:
+            if self.segment_samples:
+                self._finish_segment()
+            else:
+                self._close_file()
+        # 等最后一个分段上报完，flowgraph停止后录制程序不会漏掉它
+        self._events.join()
+        return True
+
+    def work(self, input_items, output_items):
+        samples = input_items[0]
+        n = len(samples)
+        with self._lock:
+            self._clock.setdefault('t0', time.time())
+            offset = 0
+            while offset < n:
+                if self._file is None:
+                    if not self.segment_samples:
+                        break  # 未打开文件：丢弃样本
+                    self._start_segment(self._position + offset)
+
+                take = n - offset if self._remaining is None else min(n - offset, self._remaining)
+                self._write(samples[offset:offset + take])
+                offset += take
+                if self._remaining is not None:
+                    self._remaining -= take
+                    if self._remaining == 0:
+                        self._finish_segment()
+            self._position += n
+            if len(self._ring):
+                self._remember(samples)
+        return n
+
+    def _remember(self, samples):
+        size = len(self._ring)
+        n = len(samples)
+        if n >= size:
+            self._ring[:] = samples[n - size:]
+            self._ring_pos = 0
+        else:
+            end = self._ring_pos + n
+            if end <= size:
+                self._ring[self._ring_pos:end] = samples
+            else:
+                first = size - self._ring_pos
+                self._ring[self._ring_pos:] = samples[:first]
+                self._ring[:n - first] = samples[first:]
+            self._ring_pos = end % size
+        self._ring_fill = min(size, self._ring_fill + n)
+
+    def _flush_pre_roll(self):
+        """按时间顺序写出环形缓冲中的音频（最早的在前），返回写出的样本数"""
+        if not self._ring_fill:
+            return 0
+        if self._ring_fill < len(self._ring):
+            self._write(self._ring[self._ring_pos - self._ring_fill:self._ring_pos])
+        else:
+            self._write(self._ring[self._ring_pos:])
+            self._write(self._ring[:self._ring_pos])
+        return self._ring_fill
+
+    def _write(self, samples):
+        # libsndfile写整数格式时不会截断越界的浮点值，先限幅避免回绕
+        self._file.write(np.clip(samples, -1.0, 1.0))
+
+    def _start_segment(self, position):
+        started_at = self._clock['t0'] + position / self.sample_rate
+        length = self.segment_samples
+        if self.align and position == 0:
+            # 第一个分段只录到下一个对齐边界，之后的分段都从边界开始
+            local = datetime.fromtimestamp(started_at)
+            seconds = local.hour * 3600 + local.minute * 60 + local.second + local.microsecond / 1e6
+            period = self.segment_samples / self.sample_rate
+            length = int(round((period - seconds % period) * self.sample_rate))
+            if length < self.sample_rate:
+                length += self.segment_samples
+
+        name = datetime.fromtimestamp(started_at).strftime('%Y%m%d_%H%M%S_') + self.channel + self.extension
+        self._open_file(os.path.join(self.output_dir, name))
+        self._started_at = started_at
+        self._remaining = length
+
+    def _finish_segment(self):
+        path, started_at = self._path, self._started_at
+        self._close_file()
+        if path and self.on_segment:
+            self._events.put((self.channel, path, started_at))
+
+    def _report(self):
+        while True:
+            channel, path, started_at = self._events.get()
+            try:
+                self.on_segment(channel, path, started_at)
+            except Exception as e:
+                print(f'上报分段 {path} 出错: {e}', file=sys.stderr)
+            finally:
+                self._events.task_done()
+
+    def _open_file(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = sf.SoundFile(path, 'w', samplerate=self.sample_rate, channels=1,
+                                  format=self.format, subtype=self.subtype)
+        self._path = path
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+        self._file = None
+        self._path = None
+        self._started_at = None
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# gunradio/scanner.py
+"""中波频段扫描：从宽带IQ的平均功率谱中找出在播电台，直接写成信道规划
+
+对录下的IQ文件或现场采集的几秒IQ做Welch功率谱（分段加窗后批量FFT再平均），
+在 525~1605 kHz 的频道栅格上找高出噪声底的载波，不需要看瀑布图手工找频点：
+
+    python scanner.py --iq ../media/iq/*.cf32 --output channel_plan.json
+    python scanner.py --capture 2 --threshold-db 12        # 现场采集2秒（需要GNU Radio和SDR）
+"""
+import json
+import sys
+from argparse import ArgumentParser
+
+import numpy as np
+from scipy import fft, signal
+
+try:
+    from gunradio.channel_plan import Channel, ChannelPlan, load_plan
+    from gunradio.iq_capture import read_iq
+except ImportError:
+    # 在 gunradio 目录下作为脚本运行（与 sdr.py 相同的同级导入）
+    from channel_plan import Channel, ChannelPlan, load_plan
+    from iq_capture import read_iq
+
+AM_BAND = (525e3, 1605e3)  # 与 sdr.py 中频率滑块的范围相同
+USABLE_FRACTION = 0.9  # 采集带宽边缘受抗混叠滤波影响，只扫描中间这一部分
+SDRPLAY_ARGS = "if_mode=Zero-IF, agc_setpoint=-30, biasT_ctrl=false, rfnotch_ctrl=false, dabnotch_ctrl=false, driver=sdrplay"
+
+
+def fft_size(sample_rate, resolution):
+    """不低于所需频率分辨率的2的幂"""
+    return 1 << int(np.ceil(np.log2(sample_rate / resolution)))
+
+
+class WelchPSD:
+    """累加式Welch功率谱：50%重叠的Hann窗分段，每次取 batch 段一起做FFT
+
+    可以分多次 add（大文件按块、多个文件依次），最后 psd() 取平均。
+    功率按窗函数归一化，满幅单音的峰值为 0 dBFS。
+    """
+
+    def __init__(self, nfft, batch=256):
+        self.nfft = nfft
+        self.step = nfft // 2
+        self.batch = batch
+        self.window = signal.get_window('hann', nfft).astype(np.float32)
+        self.scale = 1.0 / float(self.window.sum()) ** 2
+        self.total = np.zeros(nfft, dtype=np.float64)
+        self.segments = 0
+
+    def add(self, iq):
+        if len(iq) < self.nfft:
+            return
+        frames = np.lib.stride_tricks.sliding_window_view(iq, self.nfft)[::self.step]
+        for start in range(0, len(frames), self.batch):
+            spectrum = fft.fft(frames[start:start + self.batch] * self.window, axis=1, workers=-1)
+            self.total += (spectrum.real ** 2 + spectrum.imag ** 2).sum(axis=0)
+            self.segments += len(spectrum)
+
+    def add_blocks(self, iq, block_samples):
+        """按块累加很长的IQ（可为np.memmap）；块之间重叠半段，分段位置与整段处理相同"""
+        block = max(block_samples // self.step, 2) * self.step
+        for start in range(0, max(len(iq) - self.step, 1), block):
+            self.add(np.asarray(iq[start:start + block + self.step]))
+
+    def psd(self):
+        """各bin的平均功率（线性），已fftshift，负频率在前"""
+        if not self.segments:
+            raise ValueError("IQ太短，不足一个FFT分段")
+        return np.fft.fftshift(self.total / self.segments * self.scale)
+
+
+def spectrum(iq_blocks, sample_rate, center_freq, resolution=250.0, block_seconds=1.0):
+    """对若干段IQ求平均功率谱，返回 (绝对频率Hz, 功率dBFS)"""
+    welch = WelchPSD(fft_size(sample_rate, resolution))
+    for iq in iq_blocks:
+        welch.add_blocks(iq, int(sample_rate * block_seconds))
+    freqs = center_freq + np.fft.fftshift(np.fft.fftfreq(welch.nfft, 1 / sample_rate))
+    return freqs, 10 * np.log10(np.maximum(welch.psd(), 1e-20))
+
+
+def spectrum_from_files(paths, resolution=250.0):
+    """iq_capture / synth 写出的IQ文件的平均功率谱，返回 (频率, 功率dBFS, 采样率, 中心频率)"""
+    captures = [read_iq(path) for path in sorted(paths)]
+    for key in ('sample_rate', 'center_freq'):
+        values = {meta[key] for _, meta in captures}
+        if len(values) > 1:
+            raise ValueError(f"IQ文件的 {key} 不一致: {sorted(values)}")
+    sample_rate = float(captures[0][1]['sample_rate'])
+    center_freq = float(captures[0][1]['center_freq'])
+    freqs, power = spectrum([iq for iq, _ in captures], sample_rate, center_freq, resolution)
+    return freqs, power, sample_rate, center_freq
+
+
+def find_carriers(freqs, power, sample_rate, center_freq, raster=9000.0, band=AM_BAND,
+                  threshold_db=10.0, tolerance=500.0):
+    """在频道栅格上找载波
+
+    每个栅格频点取 ±tolerance 内的最大功率作为载波电平，且必须是 ±半个栅格内的最高点
+    （否则只是邻台的边带）；噪声底取扫描范围内所有bin的中位数（载波只占极少数bin）。返回 (载波列表, 噪声底dBFS)，载波按频率排序，每个为
+    {"freq": 栅格频率, "peak_freq": 实测峰值频率, "level_db": 电平dBFS, "snr_db": 高出噪声底的dB数}。
+    """
+    half = sample_rate / 2 * USABLE_FRACTION
+    low = max(band[0], center_freq - half)
+    high = min(band[1], center_freq + half)
+    if low >= high:
+        raise ValueError(f"采集范围 {center_freq / 1e3:g} kHz ± {half / 1e3:g} kHz 与中波频段不重叠")
+    scanned = (freqs >= low - tolerance) & (freqs <= high + tolerance)
+    floor = float(np.median(power[scanned]))
+
+    carriers = []
+    for freq in np.arange(np.ceil(low / raster), np.floor(high / raster) + 1) * raster:
+        near = np.flatnonzero(np.abs(freqs - freq) <= tolerance)
+        if not len(near):
+            continue
+        peak = near[power[near].argmax()]
+        snr = float(power[peak]) - floor
+        channel = np.abs(freqs - freq) <= raster / 2
+        if snr >= threshold_db and power[peak] >= power[channel].max():
+            carriers.append({
+                "freq": float(freq),
+                "peak_freq": float(freqs[peak]),
+                "level_db": round(float(power[peak]), 1),
+                "snr_db": round(snr, 1),
+            })
+    return carriers, floor
+
+
+def build_plan(carriers, center_freq, sample_rate, template=None):
+    """把找到的载波写成信道规划
+
+    全局参数（增益、音频采样率、前端类型、栅格等）沿用模板规划；模板中已有的电台按频率匹配，
+    保留原来的通道名、带宽、增益和输出格式，新电台按 chN 顺序编号并使用默认参数。
+    """
+    known = {channel.freq: channel for channel in template.channels} if template is not None else {}
+    names = {channel.name for channel in known.values()}
+    channels = []
+    number = 1
+    for carrier in carriers:
+        channel = known.get(carrier["freq"])
+        if channel is None:
+            while f"ch{number}" in names:
+                number += 1
+            channel = Channel(f"ch{number}", carrier["freq"])
+            names.add(channel.name)
+        channels.append(channel)
+    options = {}
+    if template is not None:
+        options = {key: value for key, value in template.to_dict().items()
+                   if key not in ("center_freq", "sample_rate", "channels")}
+    return ChannelPlan(center_freq, sample_rate, channels, **options)
+
+
+def capture_iq(seconds, center_freq, sample_rate, gain):
+    """用SDR现场采集一段IQ（与 sdr.py 相同的SDRplay设置），返回complex64数组"""
+    from gnuradio import blocks, gr, soapy
+
+    tb = gr.top_block()
+    source = soapy.source('driver=sdrplay', "fc32", 1, SDRPLAY_ARGS, '', [''], [''])
+    source.set_sample_rate(0, sample_rate)
+    source.set_dc_offset_mode(0, True)
+    source.set_gain_mode(0, False)
+    source.set_frequency(0, center_freq)
+    source.set_antenna(0, 'RX')
+    source.set_gain(0, gain)
+    head = blocks.head(gr.sizeof_gr_complex*1, int(seconds * sample_rate))
+    sink = blocks.vector_sink_c()
+    tb.connect((source, 0), (head, 0))
+    tb.connect((head, 0), (sink, 0))
+    tb.run()
+    return np.array(sink.data(), dtype=np.complex64)
+
+
+def main(argv=None):
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--iq", nargs="+", help="iq_capture / synth 写出的 .cf32 文件")
+    source.add_argument("--capture", type=float, metavar="SECONDS", help="现场采集的秒数")
+    parser.add_argument("--channel-plan", default=None, help="模板规划：全局参数和已知电台的设置从这里沿用")
+    parser.add_argument("--center-freq", type=float, default=sum(AM_BAND) / 2, help="现场采集的中心频率")
+    parser.add_argument("--resolution", type=float, default=250, help="功率谱的频率分辨率（Hz）")
+    parser.add_argument("--threshold-db", type=float, default=10, help="载波高出噪声底多少dB算在播")
+    parser.add_argument("--output", default=None, help="写出信道规划JSON；默认打印到标准输出")
+    options = parser.parse_args(argv)
+
+    template = load_plan(options.channel_plan)
+    if options.iq:
+        freqs, power, sample_rate, center_freq = spectrum_from_files(options.iq, options.resolution)
+    else:
+        sample_rate, center_freq = template.sample_rate, options.center_freq
+        iq = capture_iq(options.capture, center_freq, sample_rate, template.rf_gain)
+        freqs, power = spectrum([iq], sample_rate, center_freq, options.resolution)
+
+    carriers, floor = find_carriers(freqs, power, sample_rate, center_freq, template.raster,
+                                    threshold_db=options.threshold_db)
+    print(f"噪声底 {floor:.1f} dBFS/bin，找到 {len(carriers)} 个电台", file=sys.stderr)
+    for carrier in carriers:
+        print(f"  {carrier['freq'] / 1e3:7.0f} kHz  {carrier['level_db']:6.1f} dBFS  SNR {carrier['snr_db']:5.1f} dB",
+              file=sys.stderr)
+    if not carriers:
+        return carriers
+
+    plan = build_plan(carriers, center_freq, sample_rate, template)
+    if options.output:
+        plan.save(options.output)
+    else:
+        json.dump(plan.to_dict(), sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    return carriers
+
+
+if __name__ == '__main__':
+    main()
@@ -11,10 +11,10 @@
 
 # 验证环境
 import os
+import json
+import threading
+import time
 
-from PyQt5 import Qt
-from gnuradio import qtgui
-from PyQt5 import QtCore
 from gnuradio import blocks
 from gnuradio import filter
 from gnuradio.filter import firdes
@@ -22,327 +22,536 @@ from gnuradio import gr
 from gnuradio.fft import window
 import sys
 import signal
-from PyQt5 import Qt
 from argparse import ArgumentParser
 from gnuradio.eng_arg import eng_float, intx
 from gnuradio import eng_notation
 from gnuradio import soapy
-import sip
 import platform
 
+from channel_plan import ASR_SUFFIX, load_plan
+from frontend import build_front_end, build_recording_outputs, build_telemetry, retune
+from iq_capture import iq_file_source, iq_sink, read_iq
+from recording_sink import recording_sink
 
+try:
+    from PyQt5 import Qt
+    from PyQt5 import QtCore
+    from gnuradio import qtgui
+    import sip
+except ImportError:
+    # 无界面的录制节点可以不安装PyQt5，只能以 --headless 运行
+    Qt = None
 
-class sdr(gr.top_block, Qt.QWidget):
 
-    def __init__(self):
+
+class sdr_headless(gr.top_block):
+    """无界面的flowgraph：与 sdr 完全相同的DSP链，只是没有Qt控件和qtgui显示
+
+    长期运行的录制节点使用它，不需要显示服务器，也没有频谱/瀑布图的渲染开销。
+    """
+
+    def __init__(self, file_prefix='', output_dir='../media/temp', start_closed=False,
+                 continuous=False, segment_seconds=1800, on_segment=None, pre_roll_seconds=0,
+                 channel_plan=None, iq_dir=None, iq_segment_seconds=60, iq_keep_segments=10, iq_replay=None,
+                 telemetry_dir=None):
         gr.top_block.__init__(self, "sdrtest", catch_exceptions=True)
-        Qt.QWidget.__init__(self)
-        self.setWindowTitle("sdrtest")
-        qtgui.util.check_set_qss()
-        try:
-            self.setWindowIcon(Qt.QIcon.fromTheme('gnuradio-grc'))
-        except BaseException as exc:
-            print(f"Qt GUI: Could not set Icon: {str(exc)}", file=sys.stderr)
-        self.top_scroll_layout = Qt.QVBoxLayout()
-        self.setLayout(self.top_scroll_layout)
-        self.top_scroll = Qt.QScrollArea()
-        self.top_scroll.setFrameStyle(Qt.QFrame.NoFrame)
-        self.top_scroll_layout.addWidget(self.top_scroll)
-        self.top_scroll.setWidgetResizable(True)
-        self.top_widget = Qt.QWidget()
-        self.top_scroll.setWidget(self.top_widget)
-        self.top_layout = Qt.QVBoxLayout(self.top_widget)
-        self.top_grid_layout = Qt.QGridLayout()
-        self.top_layout.addLayout(self.top_grid_layout)
-
-        self.settings = Qt.QSettings("GNU Radio", "sdr")
 
-        try:
-            geometry = self.settings.value("geometry")
-            if geometry:
-                self.restoreGeometry(geometry)
-        except BaseException as exc:
-            print(f"Qt GUI: Could not restore geometry: {str(exc)}", file=sys.stderr)
+        ##################################################
+        # Parameters
+        ##################################################
+        self.file_prefix = file_prefix
+        self.output_dir = output_dir
+        self.segment_seconds = segment_seconds
+        self.pre_roll_seconds = pre_roll_seconds
+        self.channel_plan = channel_plan or load_plan()
+        self.iq_replay = None
+        if iq_replay:
+            # 离线回放：以录制时的中心频率重新解调，信道规划可以与录制时不同
+            self.iq_replay = iq_file_source(iq_replay)
+            if self.iq_replay.sample_rate != self.channel_plan.sample_rate:
+                raise ValueError(f"IQ文件采样率 {self.iq_replay.sample_rate} 与信道规划不符")
+            self.channel_plan.center_freq = float(self.iq_replay.center_freq)
+            self.channel_plan.validate()
 
         ##################################################
         # Variables
         ##################################################
-        self.sample_rate = sample_rate = 2e6
-        self.gain = gain = 25
-        self.freq = freq = 603e3
+        self.sample_rate = sample_rate = self.channel_plan.sample_rate
+        self.gain = gain = self.channel_plan.rf_gain
+        self.freq = freq = self.channel_plan.center_freq
+        self.audio_rate = self.channel_plan.audio_rate
 
         ##################################################
         # Blocks
         ##################################################
 
-        self._gain_range = qtgui.Range(2, 39, 1, 25, 200)
-        self._gain_win = qtgui.RangeWidget(self._gain_range, self.set_gain, "'gain'", "counter_slider", float, QtCore.Qt.Horizontal)
-        self.top_layout.addWidget(self._gain_win)
-        self._freq_range = qtgui.Range(525e3, 1605e3, 1e3, 603e3, 200)
-        self._freq_win = qtgui.RangeWidget(self._freq_range, self.set_freq, "'freq'", "counter_slider", float, QtCore.Qt.Horizontal)
-        self.top_layout.addWidget(self._freq_win)
         self.soapy_source_0_0 = None
-        # Make sure that the gain mode is valid
-        if('Overall' not in ['Overall', 'Specific', 'Settings Field']):
-            raise ValueError("Wrong gain mode on channel 0. Allowed gain modes: "
-                  "['Overall', 'Specific', 'Settings Field']")
-
-        dev = 'driver=sdrplay'
-
-        # Stream arguments
-        stream_args = ''
-
-        # Tune arguments for every activated stream
-        tune_args = ['']
-        settings = ['']
-
-        # Setup the device arguments
-
-        dev_args = "if_mode=Zero-IF, agc_setpoint=-30, biasT_ctrl=false, rfnotch_ctrl=false, dabnotch_ctrl=false, driver=sdrplay"
-
-        self.soapy_source_0_0 = soapy.source(dev, "fc32", 1, dev_args,
-                                  stream_args, tune_args, settings)
-
-        self.soapy_source_0_0.set_sample_rate(0, sample_rate)
-
-
-
-        self.soapy_source_0_0.set_dc_offset_mode(0,True)
-
-        # Set up DC offset. If set to (0, 0) internally the source block
-        # will handle the case if no DC offset correction is supported
-        self.soapy_source_0_0.set_dc_offset(0,0)
-
-        # Setup IQ Balance. If set to (0, 0) internally the source block
-        # will handle the case if no IQ balance correction is supported
-        self.soapy_source_0_0.set_iq_balance(0,0)
-
-        self.soapy_source_0_0.set_gain_mode(0,False)
-
-        # generic frequency setting should be specified first
-        self.soapy_source_0_0.set_frequency(0, freq)
-
-        self.soapy_source_0_0.set_frequency(0,"BB",0)
-
-        # Setup Frequency correction. If set to 0 internally the source block
-        # will handle the case if no frequency correction is supported
-        self.soapy_source_0_0.set_frequency_correction(0,0)
-
-        self.soapy_source_0_0.set_antenna(0,'RX')
-
-        self.soapy_source_0_0.set_bandwidth(0,0)
-
-        if('Overall' != 'Settings Field'):
-            # pass is needed, in case the template does not evaluare anything
-            pass
-            self.soapy_source_0_0.set_gain(0,gain)
-        self.rational_resampler_xxx_0_2 = filter.rational_resampler_ccc(
-                interpolation=1,
-                decimation=43,
-                taps=[],
-                fractional_bw=0)
-        self.rational_resampler_xxx_0_1 = filter.rational_resampler_ccc(
-                interpolation=1,
-                decimation=43,
-                taps=[],
-                fractional_bw=0)
-        self.rational_resampler_xxx_0 = filter.rational_resampler_ccc(
-                interpolation=1,
-                decimation=43,
-                taps=[],
-                fractional_bw=0)
-        self.qtgui_sink_x_0_0_0_1 = qtgui.sink_f(
-            1024, #fftsize
-            window.WIN_BLACKMAN_hARRIS, #wintype
-            0, #fc
-            sample_rate, #bw
-            'AM03', #name
-            True, #plotfreq
-            True, #plotwaterfall
-            True, #plottime
-            True, #plotconst
-            None # parent
-        )
-        self.qtgui_sink_x_0_0_0_1.set_update_time(1.0/10)
-        self._qtgui_sink_x_0_0_0_1_win = sip.wrapinstance(self.qtgui_sink_x_0_0_0_1.qwidget(), Qt.QWidget)
-
-        self.qtgui_sink_x_0_0_0_1.enable_rf_freq(False)
-
-        self.top_layout.addWidget(self._qtgui_sink_x_0_0_0_1_win)
-        self.qtgui_sink_x_0_0_0_0 = qtgui.sink_f(
-            1024, #fftsize
-            window.WIN_BLACKMAN_hARRIS, #wintype
-            0, #fc
-            sample_rate, #bw
-            'AM03', #name
-            True, #plotfreq
-            True, #plotwaterfall
-            True, #plottime
-            True, #plotconst
-            None # parent
-        )
-        self.qtgui_sink_x_0_0_0_0.set_update_time(1.0/10)
-        self._qtgui_sink_x_0_0_0_0_win = sip.wrapinstance(self.qtgui_sink_x_0_0_0_0.qwidget(), Qt.QWidget)
-
-        self.qtgui_sink_x_0_0_0_0.enable_rf_freq(False)
-
-        self.top_layout.addWidget(self._qtgui_sink_x_0_0_0_0_win)
-        self.qtgui_sink_x_0_0_0 = qtgui.sink_f(
-            1024, #fftsize
-            window.WIN_BLACKMAN_hARRIS, #wintype
-            0, #fc
-            sample_rate, #bw
-            'AM03', #name
-            True, #plotfreq
-            True, #plotwaterfall
-            True, #plottime
-            True, #plotconst
-            None # parent
-        )
-        self.qtgui_sink_x_0_0_0.set_update_time(1.0/10)
-        self._qtgui_sink_x_0_0_0_win = sip.wrapinstance(self.qtgui_sink_x_0_0_0.qwidget(), Qt.QWidget)
-
-        self.qtgui_sink_x_0_0_0.enable_rf_freq(False)
-
-        self.top_layout.addWidget(self._qtgui_sink_x_0_0_0_win)
-        self.freq_xlating_fir_filter_xxx_0_1 = filter.freq_xlating_fir_filter_ccc(1, firdes.complex_band_pass(1, 2e6, -10e3, 10e3, 5e3), 954e3, 2e6)
-        self.freq_xlating_fir_filter_xxx_0 = filter.freq_xlating_fir_filter_ccc(1, firdes.complex_band_pass(1, 2e6, -5e3, 5e3, 3e3), 495e3, 2e6)
-        self.blocks_wavfile_sink_0_1 = blocks.wavfile_sink(
-            '../media/temp/ch3.wav',
-            1,
-            48000,
-            blocks.FORMAT_WAV,
-            blocks.FORMAT_PCM_16,
-            False
-            )
-        self.blocks_wavfile_sink_0_0 = blocks.wavfile_sink(
-            '../media/temp/ch2.wav',
-            1,
-            48000,
-            blocks.FORMAT_WAV,
-            blocks.FORMAT_PCM_16,
-            False
-            )
-        self.blocks_wavfile_sink_0 = blocks.wavfile_sink(
-            '../media/temp/ch1.wav',
-            1,
-            48000,
-            blocks.FORMAT_WAV,
-            blocks.FORMAT_PCM_16,
-            False
-            )
-        self.blocks_throttle2_0_1 = blocks.throttle( gr.sizeof_gr_complex*1, 48e3, True, 0 if "auto" == "auto" else max( int(float(0.1) * 48e3) if "auto" == "time" else int(0.1), 1) )
-        self.blocks_throttle2_0_0 = blocks.throttle( gr.sizeof_gr_complex*1, 48e3, True, 0 if "auto" == "auto" else max( int(float(0.1) * 48e3) if "auto" == "time" else int(0.1), 1) )
-        self.blocks_throttle2_0 = blocks.throttle( gr.sizeof_gr_complex*1, 48e3, True, 0 if "auto" == "auto" else max( int(float(0.1) * 48e3) if "auto" == "time" else int(0.1), 1) )
-        self.blocks_multiply_const_vxx_0_1 = blocks.multiply_const_ff(10.0)
-        self.blocks_multiply_const_vxx_0_0 = blocks.multiply_const_ff(2.0)
-        self.blocks_multiply_const_vxx_0 = blocks.multiply_const_ff(5.0)
-        self.blocks_complex_to_mag_0_1 = blocks.complex_to_mag(1)
-        self.blocks_complex_to_mag_0_0 = blocks.complex_to_mag(1)
-        self.blocks_complex_to_mag_0 = blocks.complex_to_mag(1)
-        self.band_pass_filter_0_1 = filter.interp_fir_filter_ccf(
-            1,
-            firdes.band_pass(
-                1,
-                48e3,
-                0.3e3,
-                2e3,
-                5e3,
-                window.WIN_HAMMING,
-                6.76))
-        self.band_pass_filter_0_0 = filter.interp_fir_filter_ccf(
-            1,
-            firdes.band_pass(
-                1,
-                48e3,
-                0.3e3,
-                2e3,
-                5e3,
-                window.WIN_HAMMING,
-                6.76))
-        self.band_pass_filter_0 = filter.interp_fir_filter_ccf(
-            1,
-            firdes.band_pass(
-                1,
-                48e3,
-                0.3e3,
-                2e3,
-                5e3,
-                window.WIN_HAMMING,
-                6.76))
+        if self.iq_replay is not None:
+            self.source = self.iq_replay
+        else:
+            # Make sure that the gain mode is valid
+            if('Overall' not in ['Overall', 'Specific', 'Settings Field']):
+                raise ValueError("Wrong gain mode on channel 0. Allowed gain modes: "
+                      "['Overall', 'Specific', 'Settings Field']")
+
+            dev = 'driver=sdrplay'
+
+            # Stream arguments
+            stream_args = ''
+
+            # Tune arguments for every activated stream
+            tune_args = ['']
+            settings = ['']
+
+            # Setup the device arguments
+
+            dev_args = "if_mode=Zero-IF, agc_setpoint=-30, biasT_ctrl=false, rfnotch_ctrl=false, dabnotch_ctrl=false, driver=sdrplay"
+
+            self.soapy_source_0_0 = soapy.source(dev, "fc32", 1, dev_args,
+                                      stream_args, tune_args, settings)
+
+            self.soapy_source_0_0.set_sample_rate(0, sample_rate)
+
+
+
+            self.soapy_source_0_0.set_dc_offset_mode(0,True)
+
+            # Set up DC offset. If set to (0, 0) internally the source block
+            # will handle the case if no DC offset correction is supported
+            self.soapy_source_0_0.set_dc_offset(0,0)
+
+            # Setup IQ Balance. If set to (0, 0) internally the source block
+            # will handle the case if no IQ balance correction is supported
+            self.soapy_source_0_0.set_iq_balance(0,0)
+
+            self.soapy_source_0_0.set_gain_mode(0,False)
+
+            # generic frequency setting should be specified first
+            self.soapy_source_0_0.set_frequency(0, freq)
+
+            self.soapy_source_0_0.set_frequency(0,"BB",0)
+
+            # Setup Frequency correction. If set to 0 internally the source block
+            # will handle the case if no frequency correction is supported
+            self.soapy_source_0_0.set_frequency_correction(0,0)
+
+            self.soapy_source_0_0.set_antenna(0,'RX')
+
+            self.soapy_source_0_0.set_bandwidth(0,0)
+
+            if('Overall' != 'Settings Field'):
+                # pass is needed, in case the template does not evaluare anything
+                pass
+                self.soapy_source_0_0.set_gain(0,gain)
+
+            self.source = self.soapy_source_0_0
+
+        # 各电台的信道链（逐电台频率搬移，或共用的多相信道化滤波器组）
+        self.chains = build_front_end(self, self.source, self.channel_plan)
+        self.audio_outputs = {name: chain['gain'] for name, chain in self.chains.items()}
+
+        # 写入文件的各路输出 {通道名: (block, 采样率)}，可能含16 kHz的转录专用输出
+        self.recording_outputs = build_recording_outputs(self, self.channel_plan, self.chains)
+
+        # 分段文件名和遥测记录的时间都按样本数从同一个起点推算；回放时从IQ文件的录制时间算起
+        self.segment_clock = {'t0': self.iq_replay.started_at} if self.iq_replay is not None else {}
+
+        self.wav_sinks = {}
+        if continuous:
+            # 连续模式：flowgraph不停，各通道按固定时长滚动写分段文件
+            if self.channel_plan.asr_output == "alongside":
+                on_segment = pair_asr_segments(on_segment)
+            for name, (_, rate) in self.recording_outputs.items():
+                self.wav_sinks[name] = recording_sink(name, rate, output_dir, segment_seconds,
+                                                      on_segment=on_segment, clock=self.segment_clock,
+                                                      **self.sink_format(name))
+        elif pre_roll_seconds > 0:
+            # 预录：各通道始终缓存最近N秒音频，open_recording 时先写入文件
+            for name, (_, rate) in self.recording_outputs.items():
+                self.wav_sinks[name] = recording_sink(name, rate, pre_roll_seconds=pre_roll_seconds,
+                                                      **self.sink_format(name))
+            if not start_closed:
+                self.open_recording(output_dir, file_prefix)
+        elif start_closed or any(self.channel_plan.extension(name) != '.wav' for name in self.recording_outputs):
+            # 压缩格式（FLAC/Opus）由libsndfile编码，open/close 与 wavfile_sink 相同；
+            # 控制模式启动时不录制，recording_sink 在 open_recording 之前不创建文件
+            for name, (_, rate) in self.recording_outputs.items():
+                self.wav_sinks[name] = recording_sink(name, rate, **self.sink_format(name))
+            if not start_closed:
+                self.open_recording(output_dir, file_prefix)
+        else:
+            for name, (_, rate) in self.recording_outputs.items():
+                self.wav_sinks[name] = blocks.wavfile_sink(
+                    os.path.join(output_dir, file_prefix + name + '.wav'),
+                    1,
+                    rate,
+                    blocks.FORMAT_WAV,
+                    blocks.FORMAT_PCM_16,
+                    False
+                    )
 
 
         ##################################################
         # Connections
         ##################################################
-        self.connect((self.band_pass_filter_0, 0), (self.blocks_complex_to_mag_0, 0))
-        self.connect((self.band_pass_filter_0_0, 0), (self.blocks_complex_to_mag_0_0, 0))
-        self.connect((self.band_pass_filter_0_1, 0), (self.blocks_complex_to_mag_0_1, 0))
-        self.connect((self.blocks_complex_to_mag_0, 0), (self.blocks_multiply_const_vxx_0, 0))
-        self.connect((self.blocks_complex_to_mag_0_0, 0), (self.blocks_multiply_const_vxx_0_0, 0))
-        self.connect((self.blocks_complex_to_mag_0_1, 0), (self.blocks_multiply_const_vxx_0_1, 0))
-        self.connect((self.blocks_multiply_const_vxx_0, 0), (self.blocks_wavfile_sink_0, 0))
-        self.connect((self.blocks_multiply_const_vxx_0, 0), (self.qtgui_sink_x_0_0_0, 0))
-        self.connect((self.blocks_multiply_const_vxx_0_0, 0), (self.blocks_wavfile_sink_0_0, 0))
-        self.connect((self.blocks_multiply_const_vxx_0_0, 0), (self.qtgui_sink_x_0_0_0_0, 0))
-        self.connect((self.blocks_multiply_const_vxx_0_1, 0), (self.blocks_wavfile_sink_0_1, 0))
-        self.connect((self.blocks_multiply_const_vxx_0_1, 0), (self.qtgui_sink_x_0_0_0_1, 0))
-        self.connect((self.blocks_throttle2_0, 0), (self.band_pass_filter_0_0, 0))
-        self.connect((self.blocks_throttle2_0_0, 0), (self.band_pass_filter_0_1, 0))
-        self.connect((self.blocks_throttle2_0_1, 0), (self.band_pass_filter_0, 0))
-        self.connect((self.freq_xlating_fir_filter_xxx_0, 0), (self.rational_resampler_xxx_0_1, 0))
-        self.connect((self.freq_xlating_fir_filter_xxx_0_1, 0), (self.rational_resampler_xxx_0_2, 0))
-        self.connect((self.rational_resampler_xxx_0, 0), (self.blocks_throttle2_0_1, 0))
-        self.connect((self.rational_resampler_xxx_0_1, 0), (self.blocks_throttle2_0, 0))
-        self.connect((self.rational_resampler_xxx_0_2, 0), (self.blocks_throttle2_0_0, 0))
-        self.connect((self.soapy_source_0_0, 0), (self.freq_xlating_fir_filter_xxx_0, 0))
-        self.connect((self.soapy_source_0_0, 0), (self.freq_xlating_fir_filter_xxx_0_1, 0))
-        self.connect((self.soapy_source_0_0, 0), (self.rational_resampler_xxx_0, 0))
-
-
-    def closeEvent(self, event):
-        self.settings = Qt.QSettings("GNU Radio", "sdr")
-        self.settings.setValue("geometry", self.saveGeometry())
-        self.stop()
-        self.wait()
-
-        event.accept()
+        for name, (output, _) in self.recording_outputs.items():
+            self.connect((output, 0), (self.wav_sinks[name], 0))
+        self.iq_sink = None
+        if iq_dir and self.iq_replay is None:
+            # 原始IQ另存一份，频率设错或新电台出现时可以离线重新解调
+            self.iq_sink = iq_sink(iq_dir, sample_rate, freq, iq_segment_seconds, iq_keep_segments,
+                                   channel_plan=self.channel_plan)
+            self.connect((self.source, 0), (self.iq_sink, 0))
+        self.probes = {}
+        if telemetry_dir:
+            # 每秒一条信号质量记录，录制程序据此跳过或推迟转录无信号的录音
+            self.probes = build_telemetry(self, self.channel_plan, self.chains, telemetry_dir, self.segment_clock)
+
+
+    def sink_format(self, name):
+        extension, format, subtype = self.channel_plan.audio_format(name)
+        return dict(extension=extension, format=format, subtype=subtype)
+
+    def open_recording(self, output_dir, file_prefix=''):
+        """打开一组新的输出文件，数据流不停止；返回各通道的文件路径"""
+        os.makedirs(output_dir, exist_ok=True)
+        paths = {}
+        for name, sink in self.wav_sinks.items():
+            path = os.path.join(output_dir, file_prefix + name + self.channel_plan.extension(name))
+            try:
+                opened = sink.open(path)
+            except (OSError, RuntimeError):
+                opened = False
+            if not opened:
+                # 不留下只打开了一部分通道的录音
+                for done in paths:
+                    self.wav_sinks[done].close()
+                raise RuntimeError(f"无法打开输出文件: {path}")
+            paths[name] = path
+        self.output_dir = output_dir
+        self.file_prefix = file_prefix
+        return paths
+
+    def pre_roll_written(self):
+        """最近一次 open_recording 在文件开头写入的预录秒数"""
+        return max((getattr(sink, 'pre_roll_written', 0.0) for sink in self.wav_sinks.values()), default=0.0)
+
+    def close_recording(self):
+        """关闭当前输出文件（写完WAV头），之后的样本被丢弃直到下一次 open_recording"""
+        for sink in self.wav_sinks.values():
+            sink.close()
+
+    def get_file_prefix(self):
+        return self.file_prefix
+
+    def get_output_dir(self):
+        return self.output_dir
 
     def get_sample_rate(self):
         return self.sample_rate
 
     def set_sample_rate(self, sample_rate):
         self.sample_rate = sample_rate
-        self.qtgui_sink_x_0_0_0.set_frequency_range(0, self.sample_rate)
-        self.qtgui_sink_x_0_0_0_0.set_frequency_range(0, self.sample_rate)
-        self.qtgui_sink_x_0_0_0_1.set_frequency_range(0, self.sample_rate)
 
     def get_gain(self):
         return self.gain
 
     def set_gain(self, gain):
         self.gain = gain
-        self.soapy_source_0_0.set_gain(0, self.gain)
+        if self.soapy_source_0_0 is not None:
+            self.soapy_source_0_0.set_gain(0, self.gain)
 
     def get_freq(self):
         return self.freq
 
     def set_freq(self, freq):
+        if self.channel_plan.front_end == "channelizer":
+            # 信道划分在构建时按中心频率确定，改变中心频率会使所有电台错位
+            print('信道化前端不支持运行中调整中心频率，请修改信道规划后重启', file=sys.stderr)
+            return
+        if self.soapy_source_0_0 is None:
+            print('回放IQ文件时中心频率由文件决定', file=sys.stderr)
+            return
         self.freq = freq
         self.soapy_source_0_0.set_frequency(0, self.freq)
+        if self.iq_sink is not None:
+            self.iq_sink.set_center_freq(self.freq)
+        # 电台的绝对频率不变，随中心频率调整各信道的搬移量
+        self.channel_plan.center_freq = float(freq)
+        for channel in self.channel_plan.channels:
+            retune(self.chains[channel.name], self.channel_plan, channel)
+
+
+if Qt is not None:
+
+    class sdr(sdr_headless, Qt.QWidget):
+
+        def __init__(self, file_prefix='', output_dir='../media/temp', start_closed=False,
+                     continuous=False, segment_seconds=1800, on_segment=None, pre_roll_seconds=0,
+                     channel_plan=None, **kwargs):
+            # IQ保存、遥测等其余参数原样交给 sdr_headless
+            sdr_headless.__init__(self, file_prefix=file_prefix, output_dir=output_dir, start_closed=start_closed,
+                                  continuous=continuous, segment_seconds=segment_seconds, on_segment=on_segment,
+                                  pre_roll_seconds=pre_roll_seconds, channel_plan=channel_plan, **kwargs)
+            Qt.QWidget.__init__(self)
+            self.setWindowTitle("sdrtest")
+            qtgui.util.check_set_qss()
+            try:
+                self.setWindowIcon(Qt.QIcon.fromTheme('gnuradio-grc'))
+            except BaseException as exc:
+                print(f"Qt GUI: Could not set Icon: {str(exc)}", file=sys.stderr)
+            self.top_scroll_layout = Qt.QVBoxLayout()
+            self.setLayout(self.top_scroll_layout)
+            self.top_scroll = Qt.QScrollArea()
+            self.top_scroll.setFrameStyle(Qt.QFrame.NoFrame)
+            self.top_scroll_layout.addWidget(self.top_scroll)
+            self.top_scroll.setWidgetResizable(True)
+            self.top_widget = Qt.QWidget()
+            self.top_scroll.setWidget(self.top_widget)
+            self.top_layout = Qt.QVBoxLayout(self.top_widget)
+            self.top_grid_layout = Qt.QGridLayout()
+            self.top_layout.addLayout(self.top_grid_layout)
+
+            self.settings = Qt.QSettings("GNU Radio", "sdr")
+
+            try:
+                geometry = self.settings.value("geometry")
+                if geometry:
+                    self.restoreGeometry(geometry)
+            except BaseException as exc:
+                print(f"Qt GUI: Could not restore geometry: {str(exc)}", file=sys.stderr)
+
+            ##################################################
+            # Blocks
+            ##################################################
+
+            self._gain_range = qtgui.Range(2, 39, 1, self.gain, 200)
+            self._gain_win = qtgui.RangeWidget(self._gain_range, self.set_gain, "'gain'", "counter_slider", float, QtCore.Qt.Horizontal)
+            self.top_layout.addWidget(self._gain_win)
+            self._freq_range = qtgui.Range(525e3, 1605e3, 1e3, self.freq, 200)
+            self._freq_win = qtgui.RangeWidget(self._freq_range, self.set_freq, "'freq'", "counter_slider", float, QtCore.Qt.Horizontal)
+            self.top_layout.addWidget(self._freq_win)
+            self.qtgui_sinks = {}
+            for name, output in self.audio_outputs.items():
+                sink = qtgui.sink_f(
+                    1024, #fftsize
+                    window.WIN_BLACKMAN_hARRIS, #wintype
+                    0, #fc
+                    self.sample_rate, #bw
+                    name, #name
+                    True, #plotfreq
+                    True, #plotwaterfall
+                    True, #plottime
+                    True, #plotconst
+                    None # parent
+                )
+                sink.set_update_time(1.0/10)
+                sink.enable_rf_freq(False)
+                self.top_layout.addWidget(sip.wrapinstance(sink.qwidget(), Qt.QWidget))
+                self.qtgui_sinks[name] = sink
+                self.connect((output, 0), (sink, 0))
+
+
+        def closeEvent(self, event):
+            self.settings = Qt.QSettings("GNU Radio", "sdr")
+            self.settings.setValue("geometry", self.saveGeometry())
+            self.stop()
+            self.wait()
+
+            event.accept()
+
+        def set_sample_rate(self, sample_rate):
+            sdr_headless.set_sample_rate(self, sample_rate)
+            for sink in self.qtgui_sinks.values():
+                sink.set_frequency_range(0, self.sample_rate)
+
+
+
+def control_reply(**message):
+    # 控制通道的应答以 @ 开头，与普通日志输出区分
+    print('@' + json.dumps(message, ensure_ascii=False), flush=True)
+
+
+def control_loop(tb):
+    """从stdin逐行读取JSON控制命令；stdin关闭（录制程序退出）时停止flowgraph"""
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            command = json.loads(line)
+            cmd = command.get('cmd')
+            if cmd == 'open':
+                paths = tb.open_recording(command['output_dir'], command.get('file_prefix', ''))
+                control_reply(ok=True, cmd=cmd, paths=paths, pre_roll=tb.pre_roll_written())
+            elif cmd == 'close':
+                tb.close_recording()
+                control_reply(ok=True, cmd=cmd)
+            elif cmd == 'ping':
+                control_reply(ok=True, cmd=cmd)
+            elif cmd == 'quit':
+                control_reply(ok=True, cmd=cmd)
+                break
+            else:
+                control_reply(ok=False, cmd=cmd, error=f"未知命令: {cmd}")
+        except Exception as exc:
+            control_reply(ok=False, error=str(exc))
+
+    signal.raise_signal(signal.SIGINT)
+
+
+def argument_parser():
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--file-prefix", dest="file_prefix", type=str, default='',
+        help="Set file_prefix [default=%(default)r]")
+    parser.add_argument(
+        "--output-dir", dest="output_dir", type=str, default='../media/temp',
+        help="Set output_dir [default=%(default)r]")
+    parser.add_argument(
+        "--control", dest="control", action="store_true",
+        help="Long-running mode: start with outputs closed and accept open/close commands on stdin")
+    parser.add_argument(
+        "--headless", dest="headless", action="store_true",
+        default=os.environ.get("SDR_HEADLESS", "").lower() in ("1", "true", "yes"),
+        help="Run without Qt widgets and GUI sinks (also enabled by SDR_HEADLESS=1)")
+    parser.add_argument(
+        "--continuous", dest="continuous", action="store_true",
+        help="Record without gaps into rolling segment files")
+    parser.add_argument(
+        "--segment-seconds", dest="segment_seconds", type=float, default=1800,
+        help="Set segment length for --continuous [default=%(default)r]")
+    parser.add_argument(
+        "--pre-roll", dest="pre_roll", type=float, default=0,
+        help="Seconds of audio kept in memory and written at the start of each file [default=%(default)r]")
+    parser.add_argument(
+        "--channel-plan", dest="channel_plan", type=str, default=None,
+        help="Channel plan JSON file [default: channel_plan.json next to this script]")
+    parser.add_argument(
+        "--iq-dir", dest="iq_dir", type=str, default=None,
+        help="Also record raw complex64 IQ into rolling segment files in this directory")
+    parser.add_argument(
+        "--iq-segment-seconds", dest="iq_segment_seconds", type=float, default=60,
+        help="Set IQ segment length [default=%(default)r]")
+    parser.add_argument(
+        "--iq-keep", dest="iq_keep", type=int, default=10,
+        help="Number of IQ segments kept on disk, 0 keeps all [default=%(default)r]")
+    parser.add_argument(
+        "--replay", dest="replay", nargs="+", default=None,
+        help="Demodulate recorded IQ segment files instead of the SDR, as fast as the CPU allows")
+    parser.add_argument(
+        "--telemetry-dir", dest="telemetry_dir", type=str, default=None,
+        help="Write per-channel signal quality records (one per second) into this directory")
+    return parser
+
+
+def segment_event(channel, path, started_at):
+    # 连续模式下每写完一个分段上报一次，录制程序据此登记后处理任务
+    control_reply(event='segment', channel=channel, path=os.path.abspath(path), started_at=started_at)
+
+
+def pair_asr_segments(on_segment):
+    """连续模式下同一电台的收听分段和 _asr 分段都写完后才上报一次
+
+    两个sink在各自的work中结束分段，先后顺序不定；转录分段改名为 <收听分段>_asr.wav，
+    录制程序收到事件时两个文件都已关闭。
+    """
+    pending = {}
+    lock = threading.Lock()
+
+    def handler(channel, path, started_at):
+        is_asr = channel.endswith(ASR_SUFFIX)
+        base = channel[:-len(ASR_SUFFIX)] if is_asr else channel
+        with lock:
+            queues = pending.setdefault(base, ([], []))
+            queues[is_asr].append((path, started_at))
+            if not (queues[0] and queues[1]):
+                return
+            main_path, main_started = queues[0].pop(0)
+            asr_path, _ = queues[1].pop(0)
+        root, ext = os.path.splitext(main_path)
+        if asr_path != root + ASR_SUFFIX + ext:
+            # 对齐边界的取整可能让两个分段名相差一秒
+            os.replace(asr_path, root + ASR_SUFFIX + ext)
+        on_segment(base, main_path, main_started)
+
+    return handler
+
+
+def top_block_kwargs(options):
+    return dict(
+        file_prefix=options.file_prefix,
+        output_dir=options.output_dir,
+        start_closed=options.control and not options.continuous,
+        continuous=options.continuous,
+        segment_seconds=options.segment_seconds,
+        on_segment=segment_event,
+        pre_roll_seconds=options.pre_roll,
+        channel_plan=load_plan(options.channel_plan),
+        iq_dir=options.iq_dir,
+        iq_segment_seconds=options.iq_segment_seconds,
+        iq_keep_segments=options.iq_keep,
+        iq_replay=options.replay,
+        telemetry_dir=options.telemetry_dir,
+    )
+
+
+def bind_signals(sig_handler):
+    signal.signal(signal.SIGINT, sig_handler)
+    signal.signal(signal.SIGTERM, sig_handler)
+    if platform.system() == "Windows":
+        signal.signal(signal.SIGBREAK, sig_handler)
 
 
+def run_headless(options):
+    """无界面运行：不创建QApplication，主线程只等待停止信号"""
+    tb = sdr_headless(**top_block_kwargs(options))
+    stop_event = threading.Event()
 
+    def sig_handler(sig=None, frame=None):
+        print('接收到停止信号，正在停止 Flowgraph...')
+        stop_event.set()
 
-def main(top_block_cls=sdr, options=None):
+    bind_signals(sig_handler)
+    tb.start()
 
-    qapp = Qt.QApplication(sys.argv)
+    if options.control:
+        threading.Thread(target=control_loop, args=(tb,), daemon=True).start()
+        control_reply(ok=True, cmd='ready')
 
-    tb = top_block_cls()
+    # 带超时等待，让主线程能及时处理信号
+    while not stop_event.wait(0.5):
+        pass
+    tb.stop()
+    tb.wait()
+    print('Flowgraph 已停止，退出程序。')
 
-    tb.start()
 
-    tb.show()
+def run_replay(options):
+    """回放IQ文件：不限速地跑完全部样本后退出，输出文件与实时录制相同"""
+    tb = sdr_headless(**top_block_kwargs(options))
+    duration = sum(read_iq(path)[0].shape[0] for path in tb.iq_replay.paths) / tb.sample_rate
+    wall_start = time.perf_counter()
+    tb.run()
+    tb.close_recording()
+    wall = time.perf_counter() - wall_start
+    print(f'回放完成: {duration:.1f} 秒IQ, 用时 {wall:.1f} 秒 ({duration / max(wall, 1e-9):.1f}x 实时)')
+
+
+def main(top_block_cls=None, options=None):
+    if options is None:
+        options = argument_parser().parse_args()
+
+    os.makedirs(options.output_dir, exist_ok=True)
+
+    if options.replay:
+        return run_replay(options)
+    if options.headless or Qt is None:
+        return run_headless(options)
+
+    qapp = Qt.QApplication(sys.argv)
+
+    tb = (top_block_cls or sdr)(**top_block_kwargs(options))
 
     def sig_handler(sig=None, frame=None):
         print('接收到停止信号，正在停止 Flowgraph...')
@@ -352,10 +561,15 @@ def main(top_block_cls=sdr, options=None):
         Qt.QApplication.quit()
 
     # 绑定信号
-    signal.signal(signal.SIGINT, sig_handler)
-    signal.signal(signal.SIGTERM, sig_handler)
-    if platform.system() == "Windows":
-        signal.signal(signal.SIGBREAK, sig_handler)
+    bind_signals(sig_handler)
+
+    tb.start()
+
+    if options.control:
+        threading.Thread(target=control_loop, args=(tb,), daemon=True).start()
+        control_reply(ok=True, cmd='ready')
+
+    tb.show()
 
     timer = Qt.QTimer()
     timer.start(500)
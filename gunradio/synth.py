@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# gunradio/synth.py
+"""合成中波AM广播的宽带IQ（complex64），不需要SDR设备和真实电台
+
+任意个载波（WAV音频或单音调制），可加白噪声、慢衰落和邻频干扰。
+写出的 .cf32 + .json 与 iq_capture 录下的分段格式相同，sdr.py --replay 和 bench.py --iq 可以直接使用：
+
+    python synth.py --output ../media/iq/synth.cf32 --seconds 60 --noise-db -50 --adjacent-db -15
+    python synth.py --audio news.wav --freqs 603e3 1098e3 --output -   # 裸IQ写到标准输出
+"""
+import json
+import os
+import sys
+import time
+from argparse import ArgumentParser
+from fractions import Fraction
+
+import numpy as np
+import soundfile as sf
+from scipy import signal
+
+DEFAULT_PLAN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "channel_plan.json")
+AUDIO_RATE = 80000  # WAV音频先重采样到这里，再线性插值到IQ采样率（插值镜像在 ±75 kHz 以外，约 -47 dB）
+
+
+def oscillator(freq, sample_rate, start, n, row=1024):
+    """复正弦 exp(j2π·f·k/fs)，k = start ~ start+n-1
+
+    按行首相位 × 行内相位的外积生成，每个样本只需一次complex64乘法，三角函数只算 n/row + row 次；
+    行首相位在float64下按整周期取模，长时间生成不会积累相位误差。
+    """
+    step = freq / sample_rate
+    rows = -(-n // row)
+    first = start + np.arange(rows, dtype=np.int64) * row
+    coarse = np.exp(2j * np.pi * ((first * step) % 1.0)).astype(np.complex64)
+    fine = np.exp(2j * np.pi * step * np.arange(row)).astype(np.complex64)
+    return (coarse[:, None] * fine[None, :]).ravel()[:n]
+
+
+def load_audio(path):
+    """读取WAV并转为单声道、峰值归一化到 ±1、采样率 AUDIO_RATE 的float32数组"""
+    audio, rate = sf.read(path, dtype='float32', always_2d=True)
+    audio = audio.mean(axis=1)
+    ratio = Fraction(AUDIO_RATE, int(rate))
+    audio = signal.resample_poly(audio, ratio.numerator, ratio.denominator).astype(np.float32)
+    audio -= audio.mean()
+    peak = np.abs(audio).max()
+    return audio / peak if peak > 0 else audio
+
+
+class Station:
+    """一个AM电台：载波频率、电平（dBFS）、调制度、调制音频（WAV或单音）和慢衰落"""
+
+    def __init__(self, freq, level_db=-20.0, depth=0.8, tones=(400.0, 1000.0), audio=None,
+                 fade_depth_db=0.0, fade_rate=0.1, name=None, seed=0):
+        self.freq = float(freq)
+        self.amplitude = 10 ** (level_db / 20)
+        self.level_db = level_db
+        self.depth = depth
+        self.tones = tuple(tones)
+        self.audio = load_audio(audio) if isinstance(audio, str) else audio
+        self.audio_path = audio if isinstance(audio, str) else None
+        self.fade_depth_db = fade_depth_db
+        self.fade_rate = fade_rate
+        self.name = name or f"{self.freq / 1e3:g}kHz"
+        rng = np.random.default_rng(seed)
+        self._tone_phases = rng.uniform(0, 2 * np.pi, len(self.tones))
+        self._fade_phases = rng.uniform(0, 2 * np.pi, 3)
+
+    def modulation(self, start, n, sample_rate):
+        """第 start ~ start+n 个IQ样本时刻的调制信号（-1 ~ 1）"""
+        if self.audio is not None:
+            # 循环播放：按IQ时刻在 AUDIO_RATE 的音频上线性插值
+            position = ((start + np.arange(n, dtype=np.int64)) * (AUDIO_RATE / sample_rate)) % len(self.audio)
+            index = position.astype(np.int64)
+            frac = (position - index).astype(np.float32)
+            return self.audio[index] * (1 - frac) + self.audio[(index + 1) % len(self.audio)] * frac
+        total = np.zeros(n, dtype=np.float32)
+        for tone, phase in zip(self.tones, self._tone_phases):
+            total += (oscillator(tone, sample_rate, start, n) * np.complex64(np.exp(1j * phase))).imag
+        return total / max(len(self.tones), 1)
+
+    FADE_STEP = 256  # 衰落只有零点几Hz，每256个样本算一次增益
+
+    def fading(self, start, n, sample_rate):
+        """慢衰落增益：三个不相关的低频正弦叠加成 0~1 的衰落深度，最深衰减 fade_depth_db"""
+        if not self.fade_depth_db:
+            return np.float32(1.0)
+        coarse = (start + np.arange(0, n, self.FADE_STEP)) / sample_rate
+        rates = self.fade_rate * np.array([1.0, 1.618, 2.718])
+        x = sum(np.sin(2 * np.pi * r * coarse + p) for r, p in zip(rates, self._fade_phases)) / 3
+        gain = (10 ** (-self.fade_depth_db * (0.5 + 0.5 * x) / 20)).astype(np.float32)
+        return np.repeat(gain, self.FADE_STEP)[:n]
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "freq": self.freq,
+            "level_db": self.level_db,
+            "depth": self.depth,
+            "tones": list(self.tones) if self.audio is None else None,
+            "audio": self.audio_path,
+            "fade_depth_db": self.fade_depth_db,
+        }
+
+
+def adjacent_interferers(stations, raster=9000.0, level_db=-15.0, seed=100):
+    """每个电台上方一个栅格处加一个比它低 level_db 的干扰台（不同的调制音）"""
+    rng = np.random.default_rng(seed)
+    return [
+        Station(station.freq + raster, station.level_db + level_db, depth=0.9,
+                tones=tuple(rng.uniform(300, 3000, 3).round()), name=f"{station.name}+adj", seed=seed + i)
+        for i, station in enumerate(stations)
+    ]
+
+
+class AMSynth:
+    """按块生成宽带IQ：各电台的 载波×(1+m·音频)×衰落 搬到各自的频偏后求和，再加复高斯白噪声"""
+
+    def __init__(self, stations, sample_rate=2e6, center_freq=603e3, noise_db=-60.0, seed=0):
+        self.stations = list(stations)
+        self.sample_rate = float(sample_rate)
+        self.center_freq = float(center_freq)
+        self.noise_db = noise_db  # 整个采集带宽内的噪声功率（dBFS）
+        self.rng = np.random.default_rng(seed)
+        nyquist = self.sample_rate / 2
+        for station in self.stations:
+            if abs(station.freq - self.center_freq) >= nyquist:
+                raise ValueError(f"{station.name} 超出采集带宽")
+
+    def generate(self, start, n):
+        """第 start ~ start+n 个样本"""
+        iq = np.zeros(n, dtype=np.complex64)
+        for station in self.stations:
+            envelope = station.modulation(start, n, self.sample_rate)
+            envelope *= np.float32(station.depth)
+            envelope += np.float32(1)
+            envelope *= np.float32(station.amplitude) * station.fading(start, n, self.sample_rate)
+            carrier = oscillator(station.freq - self.center_freq, self.sample_rate, start, n)
+            carrier *= envelope
+            iq += carrier
+        if self.noise_db is not None:
+            sigma = np.float32(np.sqrt(10 ** (self.noise_db / 10) / 2))
+            iq += self.rng.standard_normal((n, 2), dtype=np.float32).view(np.complex64)[:, 0] * sigma
+        return iq
+
+    def blocks(self, seconds=None, block_seconds=0.5):
+        """逐块产生IQ；seconds 为 None 时无限生成"""
+        block = int(self.sample_rate * block_seconds)
+        total = None if seconds is None else int(round(self.sample_rate * seconds))
+        start = 0
+        while total is None or start < total:
+            n = block if total is None else min(block, total - start)
+            yield self.generate(start, n)
+            start += n
+
+    def metadata(self, samples, started_at=None):
+        # 与 iq_capture 的分段元数据字段相同
+        return {
+            "dtype": "complex64",
+            "sample_rate": self.sample_rate,
+            "center_freq": self.center_freq,
+            "started_at": started_at if started_at is not None else time.time(),
+            "samples": samples,
+            "synthetic": {
+                "noise_db": self.noise_db,
+                "stations": [station.to_dict() for station in self.stations],
+            },
+        }
+
+
+def write_iq(path, synth, seconds, block_seconds=0.5, started_at=None):
+    """写 .cf32 和同名 .json，返回样本数"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    samples = 0
+    with open(path, 'wb') as f:
+        for block in synth.blocks(seconds, block_seconds):
+            block.tofile(f)
+            samples += len(block)
+    with open(os.path.splitext(path)[0] + '.json', 'w', encoding='utf-8') as f:
+        json.dump(synth.metadata(samples, started_at), f, ensure_ascii=False, indent=2)
+    return samples
+
+
+def plan_frequencies(path=None):
+    """信道规划中启用的电台频率和中心频率（直接读JSON，不依赖flowgraph模块）"""
+    with open(path or DEFAULT_PLAN, encoding='utf-8') as f:
+        plan = json.load(f)
+    freqs = [channel["freq"] for channel in plan["channels"] if channel.get("enabled", True)]
+    return freqs, plan["center_freq"], plan["sample_rate"]
+
+
+def main(argv=None):
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--freqs", type=float, nargs="+", default=None, help="载波频率（Hz），默认取信道规划中的电台")
+    parser.add_argument("--channel-plan", default=None, help="取电台频率、中心频率和采样率的信道规划")
+    parser.add_argument("--center-freq", type=float, default=None)
+    parser.add_argument("--sample-rate", type=float, default=None)
+    parser.add_argument("--audio", nargs="+", default=None, help="调制音频WAV，按电台顺序循环分配；默认单音")
+    parser.add_argument("--level-db", type=float, default=-20, help="每个载波的电平（dBFS）")
+    parser.add_argument("--depth", type=float, default=0.8, help="调制度")
+    parser.add_argument("--noise-db", type=float, default=-60, help="全带宽白噪声功率（dBFS）")
+    parser.add_argument("--fade-db", type=float, default=0, help="慢衰落的最深衰减（dB）")
+    parser.add_argument("--fade-rate", type=float, default=0.1, help="慢衰落速率（Hz）")
+    parser.add_argument("--adjacent-db", type=float, default=None, help="在每个电台的上邻频道加干扰台（相对电平dB）")
+    parser.add_argument("--raster", type=float, default=9000, help="邻频干扰的频道间隔")
+    parser.add_argument("--seconds", type=float, default=10, help="生成时长；输出到标准输出时0表示不停止")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", required=True, help=".cf32文件（同时写 .json 元数据），或 - 表示标准输出")
+    options = parser.parse_args(argv)
+
+    freqs, center, rate = plan_frequencies(options.channel_plan)
+    freqs = options.freqs or freqs
+    center = options.center_freq or center
+    rate = options.sample_rate or rate
+    stations = [
+        Station(freq, options.level_db, options.depth,
+                audio=options.audio[i % len(options.audio)] if options.audio else None,
+                tones=(400.0 + 100 * i, 1000.0 + 150 * i),
+                fade_depth_db=options.fade_db, fade_rate=options.fade_rate, seed=options.seed + i)
+        for i, freq in enumerate(freqs)
+    ]
+    if options.adjacent_db is not None:
+        stations += adjacent_interferers(stations, options.raster, options.adjacent_db, seed=options.seed + 100)
+    synth = AMSynth(stations, rate, center, options.noise_db, seed=options.seed)
+
+    if options.output == '-':
+        seconds = options.seconds or None
+        for block in synth.blocks(seconds):
+            sys.stdout.buffer.write(block.tobytes())
+        return
+
+    wall_start = time.perf_counter()
+    samples = write_iq(options.output, synth, options.seconds)
+    wall = time.perf_counter() - wall_start
+    print(f"已生成 {options.output}: {len(stations)} 个载波, {samples / rate:.1f} 秒, "
+          f"用时 {wall:.1f} 秒 ({samples / rate / max(wall, 1e-9):.1f}x 实时)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
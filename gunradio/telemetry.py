@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# gunradio/telemetry.py
+"""各电台的信号质量遥测：flowgraph中每秒一条记录，录制程序和界面只读文件，不必打开音频
+
+每条记录为定长的结构化数组元素（时间、载波电平、音频RMS、载噪比估计、削波比例），
+按 <目录>/<YYYY-mm-dd>/<通道名>.tlm 追加写入，一个通道一天约 2 MB，可直接 np.fromfile 读取：
+
+    python telemetry.py ../media/telemetry --day 2026-10-18
+    python telemetry.py ../media/telemetry --day 2026-10-18 --channel ch1 --plot
+"""
+import os
+import sys
+import threading
+import time
+from argparse import ArgumentParser
+from datetime import datetime, timedelta
+
+import numpy as np
+
+try:
+    from gnuradio import gr
+except ImportError:
+    # 录制程序和界面只读取遥测文件，不需要GNU Radio
+    gr = None
+
+TELEMETRY_DTYPE = np.dtype([
+    ('time', '<f8'),  # 统计周期开始的时间戳（time.time()）
+    ('carrier_db', '<f4'),  # 信道内载波电平（dBFS）
+    ('rms_db', '<f4'),  # 检波后音频的交流RMS（dBFS，已乘通道增益，即写入文件的电平）
+    ('snr_db', '<f4'),  # 载噪比估计（dB）
+    ('clip_ratio', '<f4'),  # 音频达到 ±1 被削波的样本比例
+])
+TELEMETRY_EXTENSION = '.tlm'
+DAY_FORMAT = '%Y-%m-%d'  # 与录音归档的日期目录相同
+FLOOR_DB = -150.0
+
+
+def telemetry_path(directory, channel, when):
+    """某通道某一天的遥测文件"""
+    day = datetime.fromtimestamp(when) if isinstance(when, (int, float)) else when
+    return os.path.join(directory, day.strftime(DAY_FORMAT), channel + TELEMETRY_EXTENSION)
+
+
+def _db(power):
+    return float(10 * np.log10(max(float(power), 10 ** (FLOOR_DB / 10))))
+
+
+def measure(baseband, audio, sub_block):
+    """一个统计周期的 (载波dB, 音频RMS dB, 载噪比dB, 削波比例)
+
+    baseband 为音频带通之前的信道复基带，载波就是其中的直流分量。每 sub_block 个样本（约1 ms）
+    估计一次载波的幅度和相位，先按相邻子块的相位差去掉电台的频偏；AM的调制只在与载波同相的分量上，
+    正交分量中只有噪声（噪声功率在I/Q上各占一半），由此估计信道内的噪声功率。
+    """
+    n = len(baseband) // sub_block * sub_block
+    blocks = np.asarray(baseband[:n]).reshape(-1, sub_block)
+    carrier = blocks.mean(axis=1)
+    drift = np.angle(np.sum(carrier[1:] * np.conj(carrier[:-1]))) / sub_block
+    blocks = blocks * np.exp(-1j * drift * np.arange(n)).astype(np.complex64).reshape(-1, sub_block)
+    carrier = blocks.mean(axis=1)
+    magnitude = np.abs(carrier)
+    phase = carrier / np.maximum(magnitude, 1e-20)
+    quadrature = (blocks * np.conj(phase)[:, None]).imag
+    carrier_power = np.mean(magnitude ** 2)
+    noise_power = 2 * np.mean(quadrature ** 2)
+
+    audio = np.asarray(audio)
+    ac = audio - audio.mean()
+    return (
+        _db(carrier_power),
+        _db(np.mean(ac * ac)),
+        _db(carrier_power) - _db(noise_power),
+        float(np.mean(np.abs(audio) >= 1.0)),
+    )
+
+
+class TelemetryLog:
+    """一个通道的遥测文件：记录只追加，跨过零点时换到新一天的文件"""
+
+    def __init__(self, directory, channel):
+        self.directory = directory
+        self.channel = channel
+        self._file = None
+        self._path = None
+
+    def append(self, record):
+        record = np.array(record, dtype=TELEMETRY_DTYPE)
+        path = telemetry_path(self.directory, self.channel, float(record['time']))
+        if path != self._path:
+            self.close()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._file = open(path, 'ab')
+            self._path = path
+        self._file.write(record.tobytes())
+        # 每秒一条，立即落盘，录制程序在分段结束时就能读到
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._path = None
+
+
+def read_file(path):
+    """读取一个遥测文件；进程中断时末尾可能有半条记录，丢弃"""
+    if not os.path.exists(path):
+        return np.zeros(0, dtype=TELEMETRY_DTYPE)
+    count = os.path.getsize(path) // TELEMETRY_DTYPE.itemsize
+    return np.fromfile(path, dtype=TELEMETRY_DTYPE, count=count)
+
+
+def read_telemetry(directory, channel, start, end):
+    """某通道在 [start, end) 时间段内的记录（start/end 为时间戳），按时间排序"""
+    day = datetime.fromtimestamp(start).replace(hour=0, minute=0, second=0, microsecond=0)
+    parts = []
+    while day.timestamp() < end:
+        parts.append(read_file(telemetry_path(directory, channel, day)))
+        day += timedelta(days=1)
+    records = np.concatenate(parts) if parts else np.zeros(0, dtype=TELEMETRY_DTYPE)
+    records = records[(records['time'] >= start) & (records['time'] < end)]
+    return records[np.argsort(records['time'], kind='stable')]
+
+
+def channels_for_day(directory, day):
+    """某天有遥测记录的通道名"""
+    folder = os.path.join(directory, day.strftime(DAY_FORMAT))
+    if not os.path.isdir(folder):
+        return []
+    return sorted(os.path.splitext(name)[0] for name in os.listdir(folder) if name.endswith(TELEMETRY_EXTENSION))
+
+
+def summarize(records, min_snr_db=6.0):
+    """一段记录的汇总；good_fraction 为载噪比不低于 min_snr_db 的秒数占比，没有记录时返回None"""
+    if not len(records):
+        return None
+    return {
+        "seconds": int(len(records)),
+        "carrier_db": round(float(np.median(records['carrier_db'])), 1),
+        "rms_db": round(float(np.median(records['rms_db'])), 1),
+        "snr_db": round(float(np.median(records['snr_db'])), 1),
+        "clip_ratio": round(float(np.mean(records['clip_ratio'])), 4),
+        "good_fraction": round(float(np.mean(records['snr_db'] >= min_snr_db)), 3),
+    }
+
+
+def hourly(records, min_snr_db=6.0):
+    """按小时汇总：[(小时开始的datetime, 汇总)]，界面显示一天的信号历史用"""
+    hours = np.array([datetime.fromtimestamp(t).replace(minute=0, second=0, microsecond=0).timestamp()
+                      for t in records['time']])
+    return [
+        (datetime.fromtimestamp(hour), summarize(records[hours == hour], min_snr_db))
+        for hour in np.unique(hours)
+    ]
+
+
+if gr is not None:
+
+    class channel_probe(gr.sync_block):
+        """挂在一条信道链上的遥测探针
+
+        输入0为音频带通之前的信道复基带，输入1为写入文件的音频（两者采样率相同），
+        每 interval 秒算一次 measure 并追加到遥测文件。时间按样本数推算，
+        与 recording_sink 共用 clock 时回放IQ也能得到录制时的时间。
+        """
+
+        def __init__(self, channel, sample_rate, directory, interval=1.0, clock=None):
+            gr.sync_block.__init__(self, name='channel_probe', in_sig=[np.complex64, np.float32], out_sig=None)
+            self.channel = channel
+            self.sample_rate = float(sample_rate)
+            self.period = int(round(interval * self.sample_rate))
+            self.sub_block = max(int(self.sample_rate / 1000), 1)
+            self.log = TelemetryLog(directory, channel)
+            self._clock = clock if clock is not None else {}
+            self._lock = threading.Lock()
+            self._baseband = np.zeros(self.period, dtype=np.complex64)
+            self._audio = np.zeros(self.period, dtype=np.float32)
+            self._filled = 0
+            self._position = 0  # 已完成的统计周期的样本数
+
+        def work(self, input_items, output_items):
+            baseband, audio = input_items
+            n = len(baseband)
+            with self._lock:
+                self._clock.setdefault('t0', time.time())
+                offset = 0
+                while offset < n:
+                    take = min(n - offset, self.period - self._filled)
+                    self._baseband[self._filled:self._filled + take] = baseband[offset:offset + take]
+                    self._audio[self._filled:self._filled + take] = audio[offset:offset + take]
+                    self._filled += take
+                    offset += take
+                    if self._filled == self.period:
+                        self._emit()
+            return n
+
+        def stop(self):
+            with self._lock:
+                self.log.close()
+            return True
+
+        def _emit(self):
+            carrier_db, rms_db, snr_db, clip_ratio = measure(self._baseband, self._audio, self.sub_block)
+            started_at = self._clock['t0'] + self._position / self.sample_rate
+            self.log.append((started_at, carrier_db, rms_db, snr_db, clip_ratio))
+            self._position += self.period
+            self._filled = 0
+
+
+def main(argv=None):
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory", help="遥测目录（录制程序的 TELEMETRY_DIR）")
+    parser.add_argument("--day", default=None, help="YYYY-mm-dd，默认今天")
+    parser.add_argument("--channel", nargs="+", default=None, help="默认当天所有通道")
+    parser.add_argument("--min-snr-db", type=float, default=6.0)
+    parser.add_argument("--plot", action="store_true", help="用matplotlib画出载波电平和载噪比")
+    options = parser.parse_args(argv)
+
+    day = datetime.strptime(options.day, DAY_FORMAT) if options.day else datetime.now()
+    day = day.replace(hour=0, minute=0, second=0, microsecond=0)
+    channels = options.channel or channels_for_day(options.directory, day)
+    start, end = day.timestamp(), (day + timedelta(days=1)).timestamp()
+    history = {channel: read_telemetry(options.directory, channel, start, end) for channel in channels}
+
+    for channel, records in history.items():
+        print(f"{channel}: {summarize(records, options.min_snr_db)}")
+        for hour, summary in hourly(records, options.min_snr_db):
+            print(f"  {hour:%H:%M}  载波 {summary['carrier_db']:6.1f} dBFS  载噪比 {summary['snr_db']:5.1f} dB  "
+                  f"RMS {summary['rms_db']:6.1f} dBFS  削波 {summary['clip_ratio']:.2%}  "
+                  f"可用 {summary['good_fraction']:.0%}")
+
+    if options.plot:
+        try:
+            import matplotlib.pyplot as plt
+        except ImportError:
+            print("--plot 需要安装 matplotlib", file=sys.stderr)
+            return history
+        fig, (carrier_ax, snr_ax) = plt.subplots(2, 1, sharex=True)
+        for channel, records in history.items():
+            times = [datetime.fromtimestamp(t) for t in records['time']]
+            carrier_ax.plot(times, records['carrier_db'], label=channel)
+            snr_ax.plot(times, records['snr_db'], label=channel)
+        carrier_ax.set_ylabel("carrier dBFS")
+        snr_ax.set_ylabel("SNR dB")
+        carrier_ax.legend()
+        plt.show()
+    return history
+
+
+if __name__ == '__main__':
+    main()
@@ -176,6 +176,10 @@ class MainWindow(QMainWindow):
         self.text_tab = self.create_content_tab("文本管理", ".txt", ["名称", "字数", "日期"], with_editor=True)
         self.tabs.addTab(self.text_tab, "文本管理")
 
+        # 信号质量页
+        self.telemetry_tab = self.create_telemetry_tab()
+        self.tabs.addTab(self.telemetry_tab, "信号质量")
+
         # 底部播放器
         self.player_widget = self.create_player_widget()
         main_layout.addWidget(self.player_widget)
@@ -282,6 +286,51 @@ class MainWindow(QMainWindow):
 
         return tab
 
+    def create_telemetry_tab(self):
+        """各电台每小时的载波电平、载噪比等（来自flowgraph的遥测文件，不读取音频）"""
+        tab = QWidget()
+        layout = QVBoxLayout(tab)
+
+        toolbar = QHBoxLayout()
+        self.telemetry_date_edit = QDateEdit()
+        self.telemetry_date_edit.setDisplayFormat("yyyy-MM-dd")
+        self.telemetry_date_edit.setCalendarPopup(True)
+        self.telemetry_date_edit.setDate(QDate.currentDate())
+        refresh_btn = QPushButton("刷新")
+        refresh_btn.clicked.connect(self.refresh_telemetry)
+        toolbar.addWidget(QLabel("日期:"))
+        toolbar.addWidget(self.telemetry_date_edit)
+        toolbar.addWidget(refresh_btn)
+        toolbar.addStretch()
+
+        self.telemetry_tree = QTreeWidget()
+        self.telemetry_tree.setHeaderLabels(["通道/时间", "载波(dBFS)", "载噪比(dB)", "音频RMS(dBFS)", "削波", "有信号"])
+
+        layout.addLayout(toolbar)
+        layout.addWidget(self.telemetry_tree)
+        return tab
+
+    def refresh_telemetry(self):
+        """按日期读取遥测：每个通道一行全天汇总，展开为逐小时的记录"""
+        self.telemetry_tree.clear()
+        day = self.telemetry_date_edit.date().toPyDate()
+        try:
+            history = self.api.get_telemetry(day)
+        except Exception as e:
+            QMessageBox.warning(self, "错误", f"读取遥测失败: {e}")
+            return
+
+        def columns(label, summary):
+            return [label, f"{summary['carrier_db']:.1f}", f"{summary['snr_db']:.1f}", f"{summary['rms_db']:.1f}",
+                    f"{summary['clip_ratio']:.2%}", f"{summary['good_fraction']:.0%}"]
+
+        for channel, (summary, hours) in history.items():
+            if summary is None:
+                continue
+            item = QTreeWidgetItem(self.telemetry_tree, columns(channel, summary))
+            for hour, hour_summary in hours:
+                QTreeWidgetItem(item, columns(hour.strftime("%H:%M"), hour_summary))
+
     def apply_styles(self):
         """应用统一的样式"""
         tree_style = """
@@ -0,0 +1,66 @@
+# test/test_audio_gate.py
+
+import struct
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from app.audio_gate import AudioGate, open_wav_memmap
+
+RATE = 16000
+
+
+def write_wav(path, samples, extra_chunk=False):
+    """写16位单声道WAV，可在fmt和data之间插入一个LIST chunk"""
+    pcm = (np.clip(samples, -1, 1) * 32767).astype('<i2').tobytes()
+    fmt = struct.pack('<HHIIHH', 1, 1, RATE, RATE * 2, 2, 16)
+    chunks = b'fmt ' + struct.pack('<I', len(fmt)) + fmt
+    if extra_chunk:
+        chunks += b'LIST' + struct.pack('<I', 5) + b'abcde\0'
+    chunks += b'data' + struct.pack('<I', len(pcm)) + pcm
+    path.write_bytes(b'RIFF' + struct.pack('<I', 4 + len(chunks)) + b'WAVE' + chunks)
+    return str(path)
+
+
+def speech_like(seconds):
+    # 基频缓慢变化的谐波 + 音节包络，接近包络检波后的语音
+    t = np.arange(int(seconds * RATE)) / RATE
+    phase = 2 * np.pi * np.cumsum(150 + 30 * np.sin(2 * np.pi * 0.5 * t)) / RATE
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 12))
+    return 0.5 + 0.2 * voiced * (np.sin(2 * np.pi * 3 * t) > 0)
+
+
+def test_memmap_skips_extra_chunks(tmp_path):
+    audio = np.linspace(-0.5, 0.5, 1000)
+    samples, rate = open_wav_memmap(write_wav(tmp_path / "a.wav", audio, extra_chunk=True))
+    assert rate == RATE
+    assert samples.shape == (1000, 1)
+    np.testing.assert_allclose(samples[:, 0] / 32767, audio, atol=1e-4)
+
+
+@pytest.mark.parametrize("name, audio, passed", [
+    ("speech", speech_like(10), True),
+    ("static", 0.5 + 0.1 * np.random.default_rng(0).normal(size=10 * RATE), False),
+    ("dead_air", np.full(10 * RATE, 0.5), False),
+])
+def test_gate_separates_speech_from_noise_and_silence(tmp_path, name, audio, passed):
+    gate = AudioGate(flatness_band=(300, 3400))
+    path = write_wav(tmp_path / f"{name}.wav", audio)
+    stats = gate.analyze(path)
+    assert stats["passed"] is passed, stats
+    assert gate.save_stats(path, stats).endswith(f"{name}.gate.json")
+    assert gate.load_stats(path)["passed"] is passed
+    assert gate.load_stats(str(tmp_path / "missing.wav")) is None
+
+
+@pytest.mark.parametrize("ext, format, subtype", [(".flac", "FLAC", "PCM_16"), (".ogg", "OGG", "OPUS")])
+def test_compressed_recordings_are_analyzed_without_conversion(tmp_path, ext, format, subtype):
+    gate = AudioGate(flatness_band=(300, 3400))
+    audio = speech_like(10)
+    reference = gate.analyze(write_wav(tmp_path / "speech.wav", audio))
+    path = str(tmp_path / f"speech{ext}")
+    sf.write(path, audio * 0.9, RATE, format=format, subtype=subtype)
+    stats = gate.analyze(path)
+    assert stats["passed"], stats
+    assert stats["duration"] == pytest.approx(reference["duration"], abs=0.1)
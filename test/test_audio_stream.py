@@ -0,0 +1,86 @@
+# test/test_audio_stream.py
+import io
+import os
+import sys
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+torch = pytest.importorskip("torch")
+torchaudio = pytest.importorskip("torchaudio")
+
+# 服务端脚本使用同级导入（from audio_stream import ...）
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api4sensevoice"))
+
+from audio_stream import StreamingResampler, WavStreamDecoder  # noqa: E402
+
+
+def wav_bytes(samples, rate, subtype="PCM_16"):
+    buffer = io.BytesIO()
+    sf.write(buffer, samples, rate, format="WAV", subtype=subtype)
+    return buffer.getvalue()
+
+
+def pcm16(seconds, rate):
+    rng = np.random.default_rng(0)
+    return (rng.uniform(-0.5, 0.5, int(seconds * rate)) * 32767).astype(np.int16)
+
+
+def feed_in_random_chunks(data, decoder, resampler):
+    rng = np.random.default_rng(1)
+    decoded, resampled = [], []
+    offset = 0
+    while offset < len(data):
+        n = int(rng.integers(1, 5000))
+        samples = decoder.feed(data[offset:offset + n])
+        decoded.append(samples)
+        resampled.append(resampler.process(samples))
+        offset += n
+    decoder.finish()
+    resampled.append(resampler.flush())
+    return np.concatenate(decoded), np.concatenate(resampled)
+
+
+def test_chunked_decode_and_resample_match_one_shot():
+    samples = pcm16(2.3, 48000)
+    decoder = WavStreamDecoder()
+    decoded, resampled = feed_in_random_chunks(wav_bytes(samples, 48000), decoder, StreamingResampler(48000))
+
+    assert decoder.sample_rate == 48000 and decoder.channels == 1
+    np.testing.assert_allclose(decoded, samples.astype(np.float32) / 32767, atol=1e-7)
+
+    expected = torchaudio.transforms.Resample(48000, 16000)(torch.from_numpy(decoded)[None, :])[0].numpy()
+    assert len(resampled) == len(expected)
+    np.testing.assert_allclose(resampled, expected, atol=1e-5)
+
+
+def test_stereo_is_mixed_down():
+    left, right = pcm16(0.1, 16000), pcm16(0.1, 16000)[::-1]
+    stereo = np.stack([left, right], axis=1)
+    decoder = WavStreamDecoder()
+    decoded = decoder.feed(wav_bytes(stereo, 16000))
+    expected = (left.astype(np.float32) + right.astype(np.float32)) / 2 / 32767
+    np.testing.assert_allclose(decoded, expected, atol=1e-6)
+
+
+def test_truncated_header_is_rejected():
+    data = wav_bytes(pcm16(0.1, 16000), 16000)
+    decoder = WavStreamDecoder()
+    assert len(decoder.feed(data[:30])) == 0
+    with pytest.raises(ValueError):
+        decoder.finish()
+
+    with pytest.raises(ValueError):
+        WavStreamDecoder().feed(b"OggS" + data[4:64])
+
+
+def test_16khz_input_passes_through():
+    samples = pcm16(0.5, 16000)
+    decoder = WavStreamDecoder()
+    resampler = StreamingResampler(16000)
+    decoded, resampled = feed_in_random_chunks(wav_bytes(samples, 16000), decoder, resampler)
+
+    assert resampler.passthrough
+    np.testing.assert_array_equal(resampled, decoded)
+    assert len(resampled) == len(samples)
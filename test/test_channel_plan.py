@@ -0,0 +1,90 @@
+# test/test_channel_plan.py
+
+import pytest
+
+from gunradio.channel_plan import Channel, ChannelPlan, load_plan
+
+
+def test_default_plan_matches_flowgraph_stations():
+    plan = load_plan()
+    assert plan.names() == ["ch1", "ch2", "ch3"]
+    assert [plan.offset(channel) for channel in plan.channels] == [0, 495e3, 954e3]
+
+
+def test_disabled_channels_are_dropped_and_plan_round_trips(tmp_path):
+    plan = ChannelPlan(1000e3, 2e6, [
+        Channel("a", 603e3),
+        Channel("b", 1098e3, bandwidth=9000, gain=2),
+        Channel("c", 1557e3, enabled=False),
+    ], fft_threshold=64)
+    assert plan.names() == ["a", "b"]
+
+    path = str(tmp_path / "plan.json")
+    plan.save(path)
+    reloaded = load_plan(path)
+    assert reloaded.names() == ["a", "b"]
+    assert reloaded.channels[1].bandwidth == 9000
+    assert reloaded.channels[1].transition == pytest.approx(2700)
+    assert reloaded.fft_threshold == 64
+
+
+def test_minimal_plan_file_uses_defaults(tmp_path):
+    path = tmp_path / "plan.json"
+    path.write_text(
+        '{"center_freq": 603000, "sample_rate": 2000000,'
+        ' "channels": [{"name": "ch1", "freq": 603000}]}', encoding="utf-8")
+    plan = load_plan(str(path))
+    assert plan.audio_rate == 48000
+    assert plan.fft_threshold is None
+
+
+@pytest.mark.parametrize("channels", [
+    [Channel("a", 603e3), Channel("a", 702e3)],
+    [Channel("far", 1700e3)],
+    [],
+])
+def test_invalid_plans_are_rejected(channels):
+    with pytest.raises(ValueError):
+        ChannelPlan(603e3, 2e6, channels)
+
+
+def test_asr_output_mode_is_validated():
+    assert load_plan().asr_output == "alongside"
+    with pytest.raises(ValueError):
+        ChannelPlan(603e3, 2e6, [Channel("a", 603e3)], asr_output="instead")
+
+
+def test_per_channel_output_formats():
+    plan = ChannelPlan(603e3, 2e6, [Channel("a", 603e3, format="flac"), Channel("b", 702e3, format="opus")])
+    assert plan.extension("a") == ".flac"
+    assert plan.extension("b_asr") == ".ogg"
+    with pytest.raises(ValueError):
+        ChannelPlan(603e3, 2e6, [Channel("a", 603e3, format="opus")], audio_rate=44100)
+    with pytest.raises(ValueError):
+        ChannelPlan(603e3, 2e6, [Channel("a", 603e3, format="mp3")])
+
+
+def test_channelizer_layout_on_10khz_raster_is_exact():
+    plan = ChannelPlan(1000e3, 2e6, [Channel("a", 990e3), Channel("b", 1530e3)],
+                       front_end="channelizer", raster=10000)
+    layout = plan.channelizer_layout()
+    assert (layout.numchans, layout.spacing, layout.output_rate) == (200, 10000, 20000)
+    assert layout.bins == {"a": 199, "b": 53}
+    assert layout.residuals == {"a": 0, "b": 0}
+    assert plan.resample_ratio(layout.output_rate) == (12, 5)
+
+
+def test_channelizer_layout_on_9khz_raster_keeps_small_residuals():
+    plan = load_plan()
+    plan.front_end = "channelizer"
+    plan.validate()
+    layout = plan.channelizer_layout()
+    assert layout.numchans == 222
+    assert layout.bins == {"ch1": 0, "ch2": 55, "ch3": 106}
+    assert all(abs(residual) < 1000 for residual in layout.residuals.values())
+    # 18018.018 Hz → 48 kHz
+    assert plan.resample_ratio(layout.output_rate) == (333, 125)
+
+    plan.channels[1].freq += 4000  # 偏离栅格
+    with pytest.raises(ValueError):
+        plan.validate()
@@ -0,0 +1,46 @@
+# test/test_decimation.py
+from fractions import Fraction
+
+import pytest
+
+from gunradio.decimation import Stage, plan_decimation, total_macs
+
+
+def test_2msps_to_48k_is_rate_exact():
+    stages = plan_decimation(2e6, 48000, 5000, 3000)
+    assert [(s.interpolation, s.decimation) for s in stages] == [(1, 5), (1, 5), (3, 5)]
+    assert stages[-1].output_rate == 48000
+    rate = Fraction(2_000_000)
+    for stage in stages:
+        assert stage.input_rate == rate
+        rate = rate * stage.interpolation / stage.decimation
+    assert rate == 48000
+
+
+def test_early_stages_only_protect_final_passband():
+    stages = plan_decimation(2e6, 16000, 5000, 3000)
+    assert [s.decimation for s in stages] == [5, 5, 5]
+    # 中间级：混叠只需避开最终通带，过渡带很宽
+    assert stages[0].stopband == 400e3 - 5000
+    assert stages[1].stopband == 80e3 - 5000
+    # 信道选择性在最后一级
+    assert stages[-1].stopband == 8000
+    assert all(s.estimated_taps < 100 for s in stages)
+
+
+def test_multistage_is_far_cheaper_than_single_full_rate_filter():
+    stages = plan_decimation(2e6, 48000, 5000, 3000)
+    single = Stage(2e6, 1, 1, 5000, 8000, 60)
+    assert total_macs(stages) * 100 < single.macs_per_second
+
+
+def test_small_factors_are_merged():
+    stages = plan_decimation(2e6, 250e3, 5000, 3000)
+    assert [s.decimation for s in stages] == [8]
+
+
+def test_invalid_requests_raise():
+    with pytest.raises(ValueError):
+        plan_decimation(48000, 96000, 5000, 3000)
+    with pytest.raises(ValueError):
+        plan_decimation(2e6, 16000, 10000, 5000)
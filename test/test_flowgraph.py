@@ -0,0 +1,59 @@
+# test/test_flowgraph.py
+
+import pytest
+
+from app.flowgraph import FlowgraphError, FlowgraphService
+
+# 按 sdr.py --control 协议应答的最小替身，不需要GNU Radio
+FAKE_SCRIPT = r'''
+import json, os, sys
+assert "--control" in sys.argv
+print("普通日志输出", flush=True)
+print("@" + json.dumps({"ok": True, "cmd": "ready"}), flush=True)
+for line in sys.stdin:
+    cmd = json.loads(line)
+    if cmd["cmd"] == "open":
+        path = os.path.join(cmd["output_dir"], cmd["file_prefix"] + "ch1.wav")
+        open(path, "wb").close()
+        print("@" + json.dumps({"event": "opened", "path": path}), flush=True)
+        print("@" + json.dumps({"ok": True, "cmd": "open", "paths": {"ch1": path}, "pre_roll": 2.5}), flush=True)
+    elif cmd["cmd"] == "close":
+        print("@" + json.dumps({"ok": True, "cmd": "close"}), flush=True)
+    else:
+        print("@" + json.dumps({"ok": False, "cmd": cmd["cmd"], "error": "unknown"}), flush=True)
+'''
+
+
+@pytest.fixture
+def service(tmp_path):
+    script = tmp_path / "fake_sdr.py"
+    script.write_text(FAKE_SCRIPT, encoding="utf-8")
+    events = []
+    service = FlowgraphService(str(script), on_event=events.append)
+    service.events = events
+    service.start()
+    yield service
+    service.stop()
+
+
+def test_open_close_keeps_process_running(service, tmp_path):
+    pid = service.process.pid
+    for prefix in ("20250601_100000_", "20250601_103000_"):
+        paths, pre_roll = service.open(str(tmp_path), prefix)
+        assert paths == {"ch1": str(tmp_path / f"{prefix}ch1.wav")}
+        assert pre_roll == 2.5
+        service.close()
+
+    assert service.alive
+    assert service.process.pid == pid
+    assert [event["event"] for event in service.events] == ["opened", "opened"]
+
+
+def test_command_error_and_exit(service):
+    with pytest.raises(FlowgraphError):
+        service.command({"cmd": "bogus"})
+
+    service.stop()
+    assert not service.alive
+    with pytest.raises(FlowgraphError):
+        service.close()
@@ -0,0 +1,123 @@
+# test/test_iq_capture.py
+import os
+import time
+
+import numpy as np
+import pytest
+
+pytest.importorskip("gnuradio")
+
+from gunradio.iq_capture import PART_SUFFIX, iq_file_source, iq_sink, read_iq, read_metadata  # noqa: E402
+
+
+def capture(tmp_path, samples, keep_segments=0):
+    sink = iq_sink(str(tmp_path), 1000, 603e3, segment_seconds=1.0, keep_segments=keep_segments)
+    rng = np.random.default_rng(0)
+    offset = 0
+    while offset < len(samples):
+        n = int(rng.integers(1, 700))
+        sink.work([samples[offset:offset + n]], None)
+        offset += n
+    sink.stop()
+    return sorted(os.path.join(tmp_path, name) for name in os.listdir(tmp_path) if name.endswith(".cf32"))
+
+
+def random_iq(n):
+    rng = np.random.default_rng(1)
+    return (rng.normal(size=n) + 1j * rng.normal(size=n)).astype(np.complex64)
+
+
+def test_segments_are_preallocated_and_trimmed(tmp_path):
+    iq = random_iq(2500)
+    sink = iq_sink(str(tmp_path), 1000, 603e3, segment_seconds=1.0)
+    sink.work([iq], None)
+    sink.stop()
+    paths = sorted(os.path.join(tmp_path, name) for name in os.listdir(tmp_path) if name.endswith(".cf32"))
+    assert len(paths) == 3
+    assert [os.path.getsize(path) for path in paths] == [8000, 8000, 4000]
+    meta = read_metadata(paths[0])
+    assert meta["sample_rate"] == 1000 and meta["center_freq"] == 603e3 and meta["samples"] == 1000
+    np.testing.assert_array_equal(np.concatenate([read_iq(path)[0] for path in paths]), iq)
+
+
+def test_only_latest_segments_are_kept(tmp_path):
+    assert len(capture(tmp_path, random_iq(5500), keep_segments=2)) == 2
+    assert len([name for name in os.listdir(tmp_path) if name.endswith(".json")]) == 2
+
+
+def test_replay_source_reproduces_capture_and_finishes(tmp_path):
+    iq = random_iq(3200)
+    source = iq_file_source(capture(tmp_path, iq))
+    assert source.sample_rate == 1000 and source.center_freq == 603e3
+
+    out, chunks = np.zeros(1024, dtype=np.complex64), []
+    while True:
+        n = source.work(None, [out])
+        if n == -1:
+            break
+        chunks.append(out[:n].copy())
+    np.testing.assert_array_equal(np.concatenate(chunks), iq)
+
+
+def test_open_segment_is_hidden_and_interrupted_segment_reads_only_written_samples(tmp_path):
+    iq = random_iq(2500)
+    sink = iq_sink(str(tmp_path), 1000, 603e3, segment_seconds=5.0)
+    for start in range(0, len(iq), 100):
+        sink.work([iq[start:start + 100]], None)
+    # 进程在这里被杀死，没有 stop()
+
+    names = os.listdir(tmp_path)
+    assert not [name for name in names if name.endswith(".cf32")]
+    part = [os.path.join(tmp_path, name) for name in names if name.endswith(PART_SUFFIX)]
+    assert len(part) == 1 and os.path.getsize(part[0]) == 5000 * 8
+
+    # 元数据每秒更新一次：只读出最近一次更新前写入的样本，不会读到预分配的空白
+    samples, meta = read_iq(part[0])
+    assert meta["samples"] == 2000
+    np.testing.assert_array_equal(samples, iq[:2000])
+
+
+def test_segment_with_zero_samples_reads_empty(tmp_path):
+    sink = iq_sink(str(tmp_path), 1000, 603e3, segment_seconds=5.0)
+    sink.work([random_iq(10)], None)
+    part = [os.path.join(tmp_path, name) for name in os.listdir(tmp_path) if name.endswith(PART_SUFFIX)][0]
+    assert len(read_iq(part)[0]) == 0
+
+
+def test_restarted_sink_adopts_and_prunes_earlier_segments(tmp_path):
+    for second in range(3):
+        path = tmp_path / f"20260101_00000{second}_iq.cf32"
+        random_iq(1000).tofile(path)
+        (tmp_path / f"20260101_00000{second}_iq.json").write_text('{"samples": 1000}')
+    iq = random_iq(2500)
+    interrupted = iq_sink(str(tmp_path), 1000, 603e3, segment_seconds=5.0)
+    for start in range(0, len(iq), 100):
+        interrupted.work([iq[start:start + 100]], None)
+    # 上一次运行在这里被杀死，留下只写了一部分的 .part
+
+    iq_sink(str(tmp_path), 1000, 603e3, segment_seconds=5.0, keep_segments=2)
+
+    names = sorted(os.listdir(tmp_path))
+    assert not [name for name in names if name.endswith(PART_SUFFIX)]
+    segments = [os.path.join(tmp_path, name) for name in names if name.endswith(".cf32")]
+    assert len(segments) == 2 and os.path.basename(segments[0]) == "20260101_000002_iq.cf32"
+    assert len([name for name in names if name.endswith(".json")]) == 2
+    samples, _ = read_iq(segments[1])
+    np.testing.assert_array_equal(samples, iq[:2000])
+
+
+def test_retune_starts_a_new_segment_with_the_new_center_freq(tmp_path, monkeypatch):
+    monkeypatch.setattr(time, "time", lambda: 1_700_000_000.0)
+    iq = random_iq(1500)
+    sink = iq_sink(str(tmp_path), 1000, 603e3, segment_seconds=60.0)
+    sink.work([iq[:500]], None)
+    sink.set_center_freq(981e3)
+    sink.work([iq[500:]], None)
+    sink.stop()
+
+    # 两个分段在同一秒内开始，第二个加序号后缀而不覆盖第一个
+    paths = sorted(os.path.join(tmp_path, name) for name in os.listdir(tmp_path) if name.endswith(".cf32"))
+    assert len(paths) == 2 and paths[1].endswith("_iq_1.cf32")
+    (first, first_meta), (second, second_meta) = read_iq(paths[0]), read_iq(paths[1])
+    assert (first_meta["center_freq"], second_meta["center_freq"]) == (603e3, 981e3)
+    np.testing.assert_array_equal(np.concatenate([first, second]), iq)
@@ -0,0 +1,124 @@
+# test/test_jobs.py
+
+import sqlite3
+import time
+from datetime import datetime
+
+from app.jobs import DONE, FAILED, QUEUED, RUNNING, SKIPPED, JobStore
+from app.pipeline import PostProcessor, Recording, Skipped
+
+
+def make_store(tmp_path, **kwargs):
+    return JobStore(str(tmp_path / "jobs.sqlite3"), **kwargs)
+
+
+def test_enqueue_is_idempotent_and_claim_marks_running(tmp_path):
+    store = make_store(tmp_path)
+    started_at = datetime(2025, 6, 1, 10, 0)
+    first = store.enqueue(Recording("/tmp/a_ch1.wav", "ch1", started_at))
+    again = store.enqueue(Recording("/tmp/a_ch1.wav", "ch1", started_at))
+    assert first == again
+
+    job = store.claim()
+    assert job.job_id == first
+    assert job.channel == "ch1"
+    assert job.started_at == started_at
+    assert job.attempts == 1
+    assert store.claim() is None
+    assert store.counts() == {RUNNING: 1}
+
+    store.complete(job.job_id)
+    assert store.counts() == {DONE: 1}
+
+
+def test_failures_back_off_then_give_up(tmp_path):
+    store = make_store(tmp_path, max_attempts=2, retry_delay=0)
+    store.enqueue(Recording("/tmp/b_ch2.wav", "ch2", None))
+
+    job = store.claim()
+    store.fail(job.job_id, "timeout")
+    assert store.counts() == {QUEUED: 1}
+
+    job = store.claim()
+    assert job.attempts == 2
+    store.fail(job.job_id, "timeout")
+    assert store.counts() == {FAILED: 1}
+
+    assert store.requeue_failed("/tmp/b_ch2.wav")
+    assert store.claim().attempts == 1
+
+
+def test_running_jobs_survive_restart(tmp_path):
+    store = make_store(tmp_path)
+    store.enqueue(Recording("/tmp/c_ch3.wav", "ch3", None))
+    assert store.claim() is not None
+    store.close()
+
+    reopened = make_store(tmp_path)
+    assert reopened.recover() == 1
+    job = reopened.claim()
+    assert job.path == "/tmp/c_ch3.wav"
+    assert job.attempts == 2
+
+
+def test_skipped_jobs_are_not_retried(tmp_path):
+    store = make_store(tmp_path, retry_delay=0)
+    store.enqueue(Recording("/tmp/d_ch1.wav", "ch1", None))
+
+    def handler(recording):
+        raise Skipped("几乎无声")
+
+    processor = PostProcessor(handler, store, workers=1)
+    processor.start()
+    deadline = time.time() + 5
+    while store.counts() != {SKIPPED: 1} and time.time() < deadline:
+        time.sleep(0.05)
+    processor.stop(timeout=5)
+    assert store.counts() == {SKIPPED: 1}
+    # 回放积压时据此不再把没有转录文本的已跳过录音重新登记
+    assert store.state_of("/tmp/d_ch1.wav") == SKIPPED
+    assert store.state_of("/tmp/other.wav") is None
+
+
+def test_higher_priority_is_claimed_first(tmp_path):
+    store = make_store(tmp_path)
+    weak = Recording("/tmp/d_ch1.wav", "ch1", None)
+    strong = Recording("/tmp/d_ch2.wav", "ch2", None)
+    strong.priority = 0.9
+    store.enqueue_many([weak, strong])
+
+    assert store.claim().path == "/tmp/d_ch2.wav"
+    job = store.claim()
+    assert job.path == "/tmp/d_ch1.wav" and job.priority == 0
+
+
+def test_old_database_gets_priority_column(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "jobs.sqlite3"))
+    conn.execute("CREATE TABLE jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, path TEXT NOT NULL UNIQUE, channel TEXT, "
+                 "started_at TEXT, slot_name TEXT, state TEXT NOT NULL DEFAULT 'queued', "
+                 "attempts INTEGER NOT NULL DEFAULT 0, last_error TEXT, not_before REAL NOT NULL DEFAULT 0, "
+                 "created_at REAL NOT NULL, updated_at REAL NOT NULL)")
+    conn.execute("INSERT INTO jobs (path, channel, created_at, updated_at) VALUES ('/tmp/e_ch1.wav', 'ch1', 0, 0)")
+    conn.commit()
+    conn.close()
+
+    job = make_store(tmp_path).claim()
+    assert job.path == "/tmp/e_ch1.wav" and job.priority == 0
+
+
+def test_low_priority_job_ages_past_newer_high_priority_jobs(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: clock[0])
+    store = make_store(tmp_path, priority_aging=60)
+    store.enqueue(Recording("/tmp/f_old.wav", "ch1", None))
+
+    claimed = []
+    for i in range(10):
+        # 信号好的新录音持续到来，每30秒一个，队列里始终有更高优先级的任务
+        fresh = Recording(f"/tmp/f_{i}.wav", "ch2", None)
+        fresh.priority = 1.0
+        store.enqueue(fresh)
+        clock[0] += 30
+        claimed.append(store.claim().path)
+
+    assert "/tmp/f_old.wav" in claimed
@@ -0,0 +1,68 @@
+# test/test_pipeline.py
+
+import threading
+from datetime import datetime
+
+from app.jobs import DONE, JobStore
+from app.pipeline import CaptureRing, PostProcessor, Recording
+
+
+def test_capture_ring_is_exhausted_until_a_buffer_is_released(tmp_path):
+    ring = CaptureRing(str(tmp_path), size=2)
+    first = ring.acquire("a_")
+    second = ring.acquire("b_")
+    assert first is not second
+    assert ring.acquire("c_") is None
+    assert ring.in_flight() == 2
+
+    # 采集结束但录音还在后处理：槽位仍被占用
+    ring.hold(first)
+    ring.seal(first)
+    assert ring.acquire("c_") is None
+
+    ring.release(first)
+    third = ring.acquire("c_")
+    assert third is first and third.prefix == "c_"
+    assert third.path_for("ch1") == str(tmp_path / "ring0" / "c_ch1.wav")
+
+
+def test_capture_ring_hands_out_buffers_in_turn(tmp_path):
+    ring = CaptureRing(str(tmp_path), size=3)
+    seen = []
+    for prefix in ("a_", "b_", "c_", "d_"):
+        buffer = ring.acquire(prefix)
+        seen.append(buffer.directory)
+        ring.seal(buffer)
+    # 空闲的槽位也按顺序轮换，刚写完的文件不会马上被下一时段覆盖
+    assert seen == [str(tmp_path / f"ring{i}") for i in (0, 1, 2, 0)]
+
+
+class BrokenStore:
+    def enqueue_many(self, recordings):
+        raise OSError("database is locked")
+
+
+def test_submit_reports_failure_when_job_store_rejects_it(tmp_path):
+    processor = PostProcessor(lambda recording: None, BrokenStore(), workers=1)
+    assert processor.submit(Recording(str(tmp_path / "a_ch1.wav"), "ch1", None)) is False
+
+
+def test_submitted_recordings_are_processed_by_workers(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    done = threading.Event()
+    handled = []
+
+    def handler(recording):
+        handled.append(recording.channel)
+        if len(handled) == 2:
+            done.set()
+
+    processor = PostProcessor(handler, store, workers=2)
+    processor.start()
+    started_at = datetime(2025, 6, 1, 10, 0)
+    assert processor.submit_many([Recording(str(tmp_path / f"a_{name}.wav"), name, started_at)
+                                  for name in ("ch1", "ch2")])
+    assert done.wait(5)
+    processor.stop(timeout=5)
+    assert sorted(handled) == ["ch1", "ch2"]
+    assert store.counts() == {DONE: 2}
@@ -0,0 +1,107 @@
+# test/test_recording_sink.py
+
+import threading
+
+import numpy as np
+import pytest
+
+pytest.importorskip("gnuradio")
+sf = pytest.importorskip("soundfile")
+
+from gunradio.recording_sink import recording_sink  # noqa: E402
+
+
+def test_segments_are_gapless_and_sample_exact(tmp_path):
+    segments = []
+    sink = recording_sink("ch1", 8000, str(tmp_path), segment_seconds=1.0, align=False,
+                          on_segment=lambda channel, path, started_at: segments.append(path))
+
+    audio = np.random.default_rng(0).uniform(-1, 1, 8000 * 3 + 500).astype(np.float32)
+    rng = np.random.default_rng(1)
+    offset = 0
+    while offset < len(audio):
+        n = int(rng.integers(1, 3000))
+        sink.work([audio[offset:offset + n]], None)
+        offset += n
+    sink.stop()
+
+    assert [sf.info(path).frames for path in segments] == [8000, 8000, 8000, 500]
+    written = np.concatenate([sf.read(path, dtype="float32")[0] for path in segments])
+    np.testing.assert_allclose(written, audio, atol=1.0 / 32767)
+
+
+def test_gated_mode_drops_samples_while_closed(tmp_path):
+    sink = recording_sink("ch2", 8000)
+    sink.work([np.ones(100, dtype=np.float32) * 0.5], None)
+    path = str(tmp_path / "slot_ch2.wav")
+    sink.open(path)
+    sink.work([np.ones(300, dtype=np.float32) * 0.5], None)
+    sink.close()
+    sink.work([np.ones(100, dtype=np.float32) * 0.5], None)
+
+    assert sf.info(path).frames == 300
+
+
+def test_pre_roll_is_written_first_in_order(tmp_path):
+    sink = recording_sink("ch3", 1000, pre_roll_seconds=0.5)
+    audio = (np.arange(2300, dtype=np.float32) / 4000.0)
+    for start in range(0, 2300, 700):
+        sink.work([audio[start:start + 700]], None)
+
+    path = str(tmp_path / "slot_ch3.wav")
+    sink.open(path)
+    sink.work([np.full(200, 0.9, dtype=np.float32)], None)
+    sink.close()
+
+    written = sf.read(path, dtype="float32")[0]
+    # 最近0.5秒（500个样本）在前，随后是打开后收到的音频
+    np.testing.assert_allclose(written[:500], audio[-500:], atol=1.0 / 32767)
+    np.testing.assert_allclose(written[500:], 0.9, atol=1.0 / 32767)
+    assert sink.pre_roll_written == 0.5
+
+
+def test_pre_roll_reports_what_was_buffered_after_start(tmp_path):
+    # flowgraph刚启动不到N秒时，文件开头只有已收到的音频
+    sink = recording_sink("ch3", 1000, pre_roll_seconds=0.5)
+    sink.work([np.full(200, 0.1, dtype=np.float32)], None)
+    path = str(tmp_path / "slot_ch3.wav")
+    sink.open(path)
+    sink.close()
+
+    assert sf.info(path).frames == 200
+    assert sink.pre_roll_written == 0.2
+
+
+def test_flac_segments_round_trip(tmp_path):
+    segments = []
+    sink = recording_sink("ch3", 8000, str(tmp_path), segment_seconds=1.0, align=False,
+                          on_segment=lambda channel, path, started_at: segments.append(path),
+                          extension=".flac", format="FLAC", subtype="PCM_16")
+    audio = np.random.default_rng(2).uniform(-0.5, 0.5, 12000).astype(np.float32)
+    sink.work([audio], None)
+    sink.stop()
+
+    assert [path[-5:] for path in segments] == [".flac", ".flac"]
+    written = np.concatenate([sf.read(path, dtype="float32")[0] for path in segments])
+    np.testing.assert_allclose(written, audio, atol=1.0 / 32767)
+
+
+def test_slow_segment_callback_does_not_block_work(tmp_path):
+    release = threading.Event()
+    reported = []
+
+    def on_segment(channel, path, started_at):
+        release.wait(5)
+        reported.append((path, threading.current_thread()))
+
+    sink = recording_sink("ch1", 8000, str(tmp_path), segment_seconds=1.0, align=False, on_segment=on_segment)
+    audio = np.zeros(8000 * 3, dtype=np.float32)
+    # 回调卡住时分段照样切换，work 不等待
+    for start in range(0, len(audio), 1000):
+        sink.work([audio[start:start + 1000]], None)
+    assert reported == []
+
+    release.set()
+    sink.stop()
+    assert len(reported) == 3
+    assert all(thread is not threading.current_thread() for _, thread in reported)
@@ -0,0 +1,53 @@
+# test/test_scanner.py
+import numpy as np
+
+from gunradio.channel_plan import Channel, ChannelPlan
+from gunradio.scanner import WelchPSD, build_plan, find_carriers, spectrum, spectrum_from_files
+from gunradio.synth import AMSynth, Station, write_iq
+
+RATE = 2e6
+CENTER = 1065e3
+
+
+def test_blockwise_welch_matches_single_pass():
+    iq = AMSynth([Station(900e3)], RATE, CENTER, noise_db=-40).generate(0, 300_000)
+    whole, blocked = WelchPSD(4096), WelchPSD(4096)
+    whole.add(iq)
+    blocked.add_blocks(iq, 10_000)
+    assert blocked.segments == whole.segments
+    np.testing.assert_allclose(blocked.psd(), whole.psd(), rtol=1e-4)
+
+
+def test_full_scale_tone_reads_zero_dbfs():
+    n = np.arange(200_000)
+    iq = np.exp(2j * np.pi * 250e3 * n / RATE).astype(np.complex64)
+    freqs, power = spectrum([iq], RATE, CENTER, resolution=500)
+    assert abs(freqs[power.argmax()] - (CENTER + 250e3)) < 500
+    assert abs(power.max()) < 0.5
+
+
+def test_scan_finds_stations_on_the_raster(tmp_path):
+    stations = [Station(603e3), Station(801e3 + 120, level_db=-45), Station(1557e3, level_db=-30)]
+    path = str(tmp_path / "scan.cf32")
+    write_iq(path, AMSynth(stations, RATE, CENTER, noise_db=-50), seconds=0.5)
+
+    freqs, power, rate, center = spectrum_from_files([path])
+    carriers, floor = find_carriers(freqs, power, rate, center)
+
+    assert [carrier["freq"] for carrier in carriers] == [603e3, 801e3, 1557e3]
+    assert abs(carriers[0]["level_db"] + 20) < 2
+    assert all(carrier["snr_db"] > 10 for carrier in carriers)
+    # 只是噪声的栅格频点不报告
+    assert floor < carriers[1]["level_db"] - 10
+
+
+def test_plan_keeps_known_station_settings():
+    template = ChannelPlan(603e3, RATE, [Channel("news", 603e3, gain=5.0, format="flac"), Channel("ch1", 702e3)],
+                           asr_output="alongside")
+    carriers = [{"freq": 603e3}, {"freq": 1098e3}]
+
+    plan = build_plan(carriers, CENTER, RATE, template)
+
+    assert plan.center_freq == CENTER and plan.asr_output == "alongside"
+    assert [(channel.name, channel.freq) for channel in plan.channels] == [("news", 603e3), ("ch2", 1098e3)]
+    assert plan.channels[0].gain == 5.0 and plan.channels[0].format == "flac"
@@ -0,0 +1,44 @@
+# test/test_scheduler.py
+
+import threading
+import time
+from datetime import datetime
+
+from app.scheduler import CronSpec, SlotScheduler
+
+
+def test_half_hour_slots():
+    spec = CronSpec("0,30 * * * *")
+    assert spec.next_after(datetime(2025, 6, 1, 10, 12, 5)) == datetime(2025, 6, 1, 10, 30)
+    assert spec.next_after(datetime(2025, 6, 1, 10, 30, 0)) == datetime(2025, 6, 1, 11, 0)
+    assert spec.next_after(datetime(2025, 12, 31, 23, 59, 59)) == datetime(2026, 1, 1, 0, 0)
+
+
+def test_ranges_steps_and_weekdays():
+    spec = CronSpec("*/15 6-8 * * 1-5")
+    # 2025-06-07 是周六，下一次应为周一 06:00
+    assert spec.next_after(datetime(2025, 6, 7, 9, 0)) == datetime(2025, 6, 9, 6, 0)
+    assert spec.next_after(datetime(2025, 6, 9, 6, 0)) == datetime(2025, 6, 9, 6, 15)
+    assert spec.next_after(datetime(2025, 6, 9, 8, 45)) == datetime(2025, 6, 10, 6, 0)
+
+    sunday = CronSpec("0 12 * * 7")
+    assert sunday.next_after(datetime(2025, 6, 7, 13, 0)) == datetime(2025, 6, 8, 12, 0)
+
+
+def test_call_later_fires_in_deadline_order():
+    scheduler = SlotScheduler()
+    fired = []
+    scheduler.call_later(0.2, fired.append, "b")
+    scheduler.call_later(0.05, fired.append, "a")
+    cancelled = scheduler.call_later(0.1, fired.append, "x")
+    scheduler.cancel(cancelled)
+    scheduler.call_later(0.3, scheduler.stop)
+
+    thread = threading.Thread(target=scheduler.run, daemon=True)
+    start = time.monotonic()
+    thread.start()
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert fired == ["a", "b"]
+    assert time.monotonic() - start < 2
@@ -0,0 +1,40 @@
+# test/test_storage.py
+
+import errno
+import os
+
+from app import storage
+
+
+def test_atomic_move_same_device(tmp_path):
+    src = tmp_path / "temp" / "ch1.wav"
+    src.parent.mkdir()
+    src.write_bytes(b"RIFF" + b"\0" * 2048)
+
+    dest = tmp_path / "recordings" / "2025-06-01" / "20250601_100000_ch1.wav"
+    result = storage.atomic_move(str(src), str(dest))
+
+    assert result == str(dest)
+    assert not src.exists()
+    assert dest.read_bytes() == b"RIFF" + b"\0" * 2048
+
+
+def test_atomic_move_falls_back_to_copy_across_devices(tmp_path, monkeypatch):
+    src = tmp_path / "ch2.wav"
+    src.write_bytes(b"data" * 1000)
+    dest = tmp_path / "archive" / "ch2.wav"
+
+    real_replace = os.replace
+
+    def replace(a, b):
+        # 模拟跨设备rename失败，只允许临时文件的最终替换
+        if not a.endswith(".part"):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+        return real_replace(a, b)
+
+    monkeypatch.setattr(storage.os, "replace", replace)
+    storage.atomic_move(str(src), str(dest))
+
+    assert not src.exists()
+    assert dest.read_bytes() == b"data" * 1000
+    assert not os.path.exists(str(dest) + ".part")
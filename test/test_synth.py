@@ -0,0 +1,66 @@
+# test/test_synth.py
+import json
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from gunradio.synth import AMSynth, Station, adjacent_interferers, oscillator, write_iq
+
+RATE = 2e6
+
+
+def envelope_peak(iq, rate=RATE):
+    envelope = np.abs(iq) - np.abs(iq).mean()
+    spectrum = np.abs(np.fft.rfft(envelope))
+    return np.fft.rfftfreq(len(envelope), 1 / rate)[spectrum.argmax()]
+
+
+def test_oscillator_phase_is_exact_far_into_the_stream():
+    start = 10 ** 10 + 3
+    k = start + np.arange(5000)
+    expected = np.exp(2j * np.pi * ((495000 * k) % 2000000) / 2e6)
+    np.testing.assert_allclose(oscillator(495000, RATE, start, 5000), expected, atol=1e-5)
+
+
+def test_carriers_land_at_their_offsets():
+    synth = AMSynth([Station(603e3, tones=(1000,)), Station(1098e3, level_db=-30, tones=(1000,))],
+                    RATE, 603e3, noise_db=None)
+    iq = synth.generate(0, 200000)
+    spectrum = np.abs(np.fft.fft(iq)) / len(iq)
+    freqs = np.fft.fftfreq(len(iq), 1 / RATE)
+    assert spectrum[np.argmin(np.abs(freqs - 0))] == pytest.approx(0.1, rel=1e-3)
+    assert spectrum[np.argmin(np.abs(freqs - 495e3))] == pytest.approx(10 ** (-30 / 20), rel=1e-3)
+    # 调制度0.8的单音：两个边带各为载波幅度的0.4
+    assert spectrum[np.argmin(np.abs(freqs - 1000))] == pytest.approx(0.1 * 0.4, rel=1e-2)
+
+
+def test_wav_audio_modulates_the_carrier(tmp_path):
+    path = str(tmp_path / "tone.wav")
+    t = np.arange(16000) / 16000
+    sf.write(path, 0.5 * np.sin(2 * np.pi * 700 * t), 16000)
+    synth = AMSynth([Station(603e3, audio=path)], RATE, 603e3, noise_db=None)
+    assert envelope_peak(synth.generate(0, 400000)) == pytest.approx(700, abs=10)
+
+
+def test_adjacent_interferer_is_one_raster_up_and_weaker():
+    station = Station(603e3)
+    interferer, = adjacent_interferers([station], raster=9000, level_db=-15)
+    assert interferer.freq == 612e3
+    assert interferer.level_db == station.level_db - 15
+
+
+def test_written_file_is_reproducible_and_replayable(tmp_path):
+    def make():
+        return AMSynth([Station(603e3, fade_depth_db=10, fade_rate=2)], RATE, 603e3, noise_db=-50, seed=3)
+
+    path = str(tmp_path / "synth.cf32")
+    samples = write_iq(path, make(), 0.3, block_seconds=0.1)
+    assert samples == 600000
+    meta = json.load(open(str(tmp_path / "synth.json"), encoding="utf-8"))
+    assert meta["sample_rate"] == RATE and meta["center_freq"] == 603e3 and meta["samples"] == samples
+    written = np.fromfile(path, dtype=np.complex64)
+    np.testing.assert_array_equal(written, np.concatenate(list(make().blocks(0.3, 0.1))))
+    # 衰落：最强和最弱的包络之间有明显差距
+    levels = np.abs(written[:600000].reshape(60, -1)).mean(axis=1)
+    assert 20 * np.log10(levels.max() / levels.min()) > 3
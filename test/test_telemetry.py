@@ -0,0 +1,75 @@
+# test/test_telemetry.py
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from gunradio.telemetry import (TELEMETRY_DTYPE, TelemetryLog, hourly, measure, read_telemetry, summarize,
+                                telemetry_path)
+
+RATE = 48000
+
+
+def am_baseband(carrier, noise_db, offset=30.0, seconds=1.0, seed=0):
+    """载波 carrier（线性幅度）、1 kHz 80% 调制、频偏 offset Hz，加复高斯噪声（总功率 noise_db）"""
+    t = np.arange(int(RATE * seconds)) / RATE
+    rng = np.random.default_rng(seed)
+    sigma = np.sqrt(10 ** (noise_db / 10) / 2)
+    noise = (rng.normal(size=len(t)) + 1j * rng.normal(size=len(t))) * sigma
+    signal = carrier * (1 + 0.8 * np.cos(2 * np.pi * 1000 * t)) * np.exp(2j * np.pi * offset * t + 0.7j)
+    return (signal + noise).astype(np.complex64)
+
+
+def test_measure_estimates_carrier_and_snr_despite_modulation():
+    baseband = am_baseband(0.1, -40)
+    audio = np.full(RATE, 0.5, dtype=np.float32)
+    audio[:480] = 1.0
+    carrier_db, rms_db, snr_db, clip_ratio = measure(baseband, audio, RATE // 1000)
+    assert abs(carrier_db + 20) < 0.5
+    # 调制功率全部在同相分量上，不计入噪声
+    assert abs(snr_db - 20) < 1
+    assert clip_ratio == pytest.approx(0.01)
+    assert rms_db < -10
+
+
+def test_measure_reports_noise_as_low_snr():
+    carrier_db, _, snr_db, _ = measure(am_baseband(0.0, -40), np.zeros(RATE, dtype=np.float32), RATE // 1000)
+    assert snr_db < 0
+    assert carrier_db < -50
+
+
+def test_log_splits_days_and_reader_drops_partial_record(tmp_path):
+    midnight = datetime(2026, 3, 1).timestamp()
+    log = TelemetryLog(str(tmp_path), "ch1")
+    for t in range(-3, 3):
+        log.append((midnight + t, -20.0, -30.0, 25.0 if t < 0 else 2.0, 0.0))
+    log.close()
+    with open(telemetry_path(str(tmp_path), "ch1", midnight), "ab") as f:
+        f.write(b"\x00" * 7)  # 进程中断时写了半条记录
+
+    records = read_telemetry(str(tmp_path), "ch1", midnight - 10, midnight + 10)
+    assert records.dtype == TELEMETRY_DTYPE
+    assert list(records["time"] - midnight) == [-3, -2, -1, 0, 1, 2]
+    assert len(read_telemetry(str(tmp_path), "ch1", midnight, midnight + 2)) == 2
+
+    summary = summarize(records, min_snr_db=6)
+    assert summary["seconds"] == 6 and summary["good_fraction"] == 0.5
+    assert summarize(records[:0]) is None
+    assert [hour.hour for hour, _ in hourly(records)] == [23, 0]
+
+
+def test_probe_writes_one_record_per_second(tmp_path):
+    pytest.importorskip("gnuradio")
+    from gunradio.telemetry import channel_probe
+
+    probe = channel_probe("ch2", RATE, str(tmp_path), clock={"t0": datetime(2026, 3, 1, 8).timestamp()})
+    baseband = np.concatenate([am_baseband(0.1, -40, seed=1), am_baseband(0.0, -40, seed=2)])
+    audio = np.zeros(len(baseband), dtype=np.float32)
+    for start in range(0, len(baseband), 5000):
+        probe.work([baseband[start:start + 5000], audio[start:start + 5000]], None)
+    probe.stop()
+
+    start = datetime(2026, 3, 1, 8).timestamp()
+    records = read_telemetry(str(tmp_path), "ch2", start, start + 60)
+    assert list(records["time"] - start) == [0, 1]
+    assert records["snr_db"][0] > 15 > records["snr_db"][1]
@@ -0,0 +1,119 @@
+# test/test_transcription_client.py
+
+import pytest
+import requests
+
+from app import transcription_client
+from app.transcription_client import TranscriptionClient, TranscriptionError
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self._body = body if body is not None else {"code": 0, "msg": "ok", "data": "你好"}
+
+    def json(self):
+        return self._body
+
+
+@pytest.fixture
+def audio(tmp_path):
+    path = tmp_path / "ch1.wav"
+    path.write_bytes(b"RIFF" + b"\0" * 40)
+    return str(path)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(transcription_client.time, "sleep", delays.append)
+    return delays
+
+
+def make_client(monkeypatch, outcomes, **kwargs):
+    """session.post 依次返回 outcomes 中的响应（异常则抛出），记录调用次数"""
+    client = TranscriptionClient("http://asr.invalid/transcribe", **kwargs)
+    calls = []
+
+    def post(url, **_):
+        outcome = outcomes[len(calls)]
+        calls.append(url)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(client.session, "post", post)
+    return client, calls
+
+
+@pytest.mark.parametrize("failure", [
+    FakeResponse(503),
+    FakeResponse(429),
+    requests.ConnectionError("connection refused"),
+    requests.ConnectTimeout("connect timed out"),
+])
+def test_transient_failures_are_retried(monkeypatch, audio, sleeps, failure):
+    client, calls = make_client(monkeypatch, [failure, failure, FakeResponse(200)], max_retries=3)
+
+    assert client.transcribe(audio) == "你好"
+    assert len(calls) == 3 and len(sleeps) == 2
+    assert client.stats["requests"] == 1
+    assert client.stats["attempts"] == 3
+    assert client.stats["failures"] == 0
+
+
+def test_retries_stop_at_the_limit(monkeypatch, audio, sleeps):
+    client, calls = make_client(monkeypatch, [FakeResponse(502)] * 3, max_retries=2)
+
+    with pytest.raises(TranscriptionError, match="502"):
+        client.transcribe(audio)
+    # 最后一次失败后不再等待
+    assert len(calls) == 3 and len(sleeps) == 2
+    assert (client.stats["requests"], client.stats["attempts"], client.stats["failures"]) == (1, 3, 1)
+
+
+def test_read_timeout_is_not_reuploaded(monkeypatch, audio, sleeps):
+    client, calls = make_client(monkeypatch, [requests.ReadTimeout("read timed out"), FakeResponse(200)])
+
+    with pytest.raises(TranscriptionError, match="read timed out"):
+        client.transcribe(audio)
+    # 服务端可能还在转录，留给任务表稍后重试
+    assert len(calls) == 1 and sleeps == []
+    assert client.stats["failures"] == 1
+
+
+def test_client_errors_are_not_retried(monkeypatch, audio, sleeps):
+    client, calls = make_client(monkeypatch, [FakeResponse(400)], max_retries=3)
+
+    with pytest.raises(TranscriptionError, match="400"):
+        client.transcribe(audio)
+    assert len(calls) == 1 and sleeps == []
+    assert client.stats["failures"] == 1
+
+
+def test_business_error_is_raised_without_retry(monkeypatch, audio, sleeps):
+    client, calls = make_client(monkeypatch, [FakeResponse(200, {"code": 1, "msg": "模型未加载"})])
+
+    with pytest.raises(TranscriptionError, match="模型未加载"):
+        client.transcribe(audio)
+    assert len(calls) == 1 and sleeps == []
+
+
+def test_backoff_is_jittered_and_capped(monkeypatch, audio, sleeps):
+    bounds = []
+    monkeypatch.setattr(transcription_client.random, "uniform", lambda low, high: bounds.append((low, high)) or high)
+    client, _ = make_client(monkeypatch, [FakeResponse(500)] * 5, max_retries=4, backoff_base=2.0, backoff_max=10.0)
+
+    with pytest.raises(TranscriptionError):
+        client.transcribe(audio)
+    # 全抖动：每次在 [0, min(上限, 基数*2^attempt)] 内取值
+    assert bounds == [(0, 2.0), (0, 4.0), (0, 8.0), (0, 10.0)]
+    assert sleeps == [2.0, 4.0, 8.0, 10.0]
+
+
+def test_backoff_delay_stays_within_bounds():
+    client = TranscriptionClient("http://asr.invalid/transcribe", backoff_base=1.0, backoff_max=5.0)
+    for attempt in range(6):
+        delays = [client._backoff_delay(attempt) for _ in range(200)]
+        assert 0 <= min(delays) and max(delays) <= min(5.0, 2 ** attempt)
+        assert len(set(delays)) > 1